@@ -0,0 +1,93 @@
+"""Parse time per BOOTH order page: legacy full html.parser parse vs. the current extractor.
+
+Usage: python benchmarks/bench_parse.py [products] [downloadables] [iterations]
+"""
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'booth_checker'))
+import booth  # noqa: E402
+
+SELECTORS = {
+    'product_div_tag': 'div',
+    'product_div_class': 'sheet sheet--p400 mobile:pt-[13px] mobile:px-16 mobile:pb-8',
+    'product_info_selector': 'a',
+    'product_info_index': 1,
+    'thumb_selector': 'img',
+    'download_item_selector': 'div.legacy-list-item__center, div[data-test="downloadable"]',
+    'download_link_selector': 'a.nav-reverse, div.js-download-button',
+    'filename_selector': 'div.flex-\\[1\\] b'
+}
+
+
+def make_order_page(products, downloadables):
+    parts = ['<html><head><meta charset="utf-8"><title>注文詳細</title>']
+    parts.append('<script>' + 'var x = 1;' * 2000 + '</script></head><body>')
+    # 실제 주문 페이지처럼 상품 영역 앞뒤에 헤더/내비게이션 마크업을 둔다
+    parts.append('<header>' + '<div class="nav"><a href="/ja/items">カテゴリ</a></div>' * 400 + '</header><main>')
+    for p in range(products):
+        parts.append(f'<div class="{SELECTORS["product_div_class"]}">')
+        parts.append(f'<a href="https://booth.pm/ja/items/{1000 + p}"><img src="https://booth.pximg.net/{p}.png"></a>')
+        parts.append(f'<a href="https://booth.pm/ja/items/{1000 + p}">アバター {p}</a>')
+        for d in range(downloadables):
+            parts.append(
+                '<div data-test="downloadable"><div class="flex-[1]">'
+                f'<b>Avatar_{p}_v{d}.zip</b></div>'
+                f'<div class="js-download-button" data-href="https://booth.pm/downloadables/{p * 1000 + d}"></div></div>'
+            )
+        parts.append('</div>')
+    parts.append('</main><footer>' + '<a href="/help">ヘルプ</a>' * 300 + '</footer></body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def legacy_parse(html):
+    soup = BeautifulSoup(html, "html.parser")
+    result = []
+    for product_div in soup.find_all(SELECTORS['product_div_tag'], class_=SELECTORS['product_div_class']):
+        product_info = product_div.select(SELECTORS['product_info_selector'])[SELECTORS['product_info_index']]
+        product_div.select_one(SELECTORS['thumb_selector'])
+        for div in product_div.select(SELECTORS['download_item_selector']):
+            link = div.select_one(SELECTORS['download_link_selector'])
+            name = div.select_one(SELECTORS['filename_selector'])
+            result.append((link.get('data-href'), name.get_text(), product_info.get_text()))
+    return result
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    downloadables = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    html = make_order_page(products, downloadables)
+
+    expected = len(legacy_parse(html))
+    parsed = booth._parse_products(html, SELECTORS)
+    assert sum(len(p['downloads']) for p in parsed) == expected
+
+    print(f'page: {len(html) / 1024:.0f} KiB, {products} products x {downloadables} downloadables')
+    print(f'legacy html.parser (full page) : {timed(lambda: legacy_parse(html), iterations):8.2f} ms/page')
+    for backend in ('html.parser', 'lxml'):
+        try:
+            booth.set_parser_backend(backend)
+            ms = timed(lambda: booth._parse_products(html, SELECTORS), iterations)
+        except Exception as exc:  # lxml 미설치
+            print(f'{backend:<31}: unavailable ({exc})')
+            continue
+        print(f'{backend + " (product region)":<31}: {ms:8.2f} ms/page')
+
+    booth._parse_products(html, SELECTORS, cache_key='bench')
+    ms = timed(lambda: booth._parse_products(html, SELECTORS, cache_key='bench'), iterations)
+    print(f'{"unchanged region (fingerprint)":<31}: {ms:8.2f} ms/page')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Startup cost of the checker: time and peak RSS to import booth_checker/__main__.py in a fresh interpreter.
+
+Compares the current lazy imports with importing the optional dependencies up front
+(as the checker did when S3, Gemini and unitypackage extraction were always loaded).
+
+Usage: python benchmarks/bench_startup.py [iterations]
+"""
+import json
+import os
+import subprocess
+import sys
+
+CHECKER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'booth_checker'))
+
+# 각 측정은 새 인터프리터에서 실행해 import 캐시의 영향을 받지 않게 한다
+PROBE = '''
+import importlib, importlib.util, json, resource, sys, time
+start = time.perf_counter()
+sys.path[:0] = [{checker!r}, {root!r}]
+for name in {eager!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+spec = importlib.util.spec_from_file_location('booth_checker_main', {main!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+HEAVY = ('boto3', 'google.genai', 'unitypackage_extractor', 'jinja2', 'aiohttp')
+EAGER = ('cloudflare', 'llm_summary', 'unitypackage_extractor.extractor', 'jinja2')
+
+
+def probe(eager):
+    code = PROBE.format(
+        checker=CHECKER, root=os.path.dirname(CHECKER), main=os.path.join(CHECKER, '__main__.py'),
+        eager=eager, heavy=HEAVY,
+    )
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=CHECKER)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, eager in (('lazy (current)', ()), ('eager optional deps', EAGER)):
+        runs = [probe(eager) for _ in range(iterations)]
+        seconds = sorted(run['seconds'] for run in runs)[len(runs) // 2]
+        rss = max(run['max_rss_kib'] for run in runs) / 1024
+        loaded = ', '.join(runs[-1]['loaded']) or '-'
+        print(f'{label:<20}: {seconds * 1000:8.1f} ms import (median), {rss:7.1f} MiB peak RSS, loaded: {loaded}')
+
+
+if __name__ == '__main__':
+    main()
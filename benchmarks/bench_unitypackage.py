@@ -0,0 +1,110 @@
+"""Hashing a .unitypackage: legacy extractPackage + hash from disk vs. the streaming reader.
+
+Reports wall time and the process's write I/O from /proc/self/io (wchar: bytes passed to
+write(), write_bytes: bytes that reached the block layer).
+
+Usage: python benchmarks/bench_unitypackage.py [assets] [asset_kib] [work_dir]
+"""
+import contextlib
+import gzip
+import hashlib
+import io
+import os
+import random
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'booth_checker'))
+import archive_walker  # noqa: E402
+import hashing  # noqa: E402
+from unitypackage_extractor.extractor import extractPackage  # noqa: E402
+
+
+def make_package(path, assets, asset_kib):
+    rnd = random.Random(0)
+    with gzip.GzipFile(path, 'wb', mtime=0, compresslevel=1) as gz, tarfile.open(fileobj=gz, mode='w') as tar:
+        def add(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+        for i in range(assets):
+            guid = hashlib.md5(str(i).encode()).hexdigest()
+            # Unity처럼 asset, asset.meta, pathname 순서로 기록
+            add(f'{guid}/asset', rnd.randbytes(asset_kib * 1024))
+            add(f'{guid}/asset.meta', b'fileFormatVersion: 2\nguid: ' + guid.encode() + b'\n')
+            add(f'{guid}/pathname', f'Assets/Avatar/Textures/{i // 50}/tex_{i}.png'.encode())
+
+
+def legacy_walk(path, encoding):
+    """What process_file_tree did: extract everything, then hash the files from disk."""
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(path)) as output_path:
+        with contextlib.redirect_stdout(io.StringIO()):
+            extractPackage(path, outputPath=output_path)
+        hashes = {}
+        for root, _, files in os.walk(output_path):
+            for name in files:
+                full = os.path.join(root, name)
+                hashes[os.path.relpath(full, output_path)] = hashing.hash_file(full, ('md5',))[0]
+        return hashes
+
+
+def streaming_walk(path, encoding):
+    node, _ = archive_walker.walk_file(path, 'bench.unitypackage', encoding, algorithms=('md5',))
+    hashes = {}
+
+    def collect(prefix, files):
+        for name, child in files.items():
+            if child['hash'] == archive_walker.DIRECTORY_HASH:
+                collect(prefix + name + '/', child.get('files', {}))
+            else:
+                hashes[prefix + name] = child['hash']
+
+    collect('', node.get('files', {}))
+    return hashes
+
+
+def io_counters():
+    try:
+        with open('/proc/self/io') as f:
+            return {key: int(value) for key, value in (line.split(':') for line in f)}
+    except OSError:
+        return None
+
+
+def measure(fn, *args):
+    before = io_counters()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    after = io_counters()
+    written = None
+    if before is not None and after is not None:
+        written = (after['wchar'] - before['wchar'], after['write_bytes'] - before['write_bytes'])
+    return result, elapsed, written
+
+
+def main():
+    assets = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    asset_kib = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    work_dir = sys.argv[3] if len(sys.argv) > 3 else None
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.unitypackage')
+        make_package(path, assets, asset_kib)
+        print(f'package: {os.path.getsize(path) / 1024 / 1024:.1f} MiB, {assets} assets x {asset_kib} KiB')
+
+        results = {}
+        for label, fn in (('legacy extractPackage', legacy_walk), ('streaming reader', streaming_walk)):
+            results[label], elapsed, written = measure(fn, path, 'utf-8')
+            io_text = 'n/a' if written is None else f'{written[0] / 1024 / 1024:8.1f} MiB written, {written[1] / 1024 / 1024:8.1f} MiB to disk'
+            print(f'{label:<22}: {elapsed:6.2f} s, {io_text}')
+
+        legacy, streaming = results.values()
+        assert legacy == streaming, 'hash trees differ'
+
+
+if __name__ == '__main__':
+    main()
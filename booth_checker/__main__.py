@@ -1,36 +1,65 @@
+from time import perf_counter
+# 시작 시간 측정을 위해 다른 import보다 먼저 기록한다
+STARTED_AT = perf_counter()
+
+import asyncio
+import contextvars
+import functools
+import gzip
+import hashlib
 import shutil
+import tarfile
+import tempfile
 import zipfile
-import hashlib
 import traceback
 import os
 import requests
-import re
-import uuid
+import simdjson
 import logging
 import threading
 from datetime import datetime, timedelta
 from time import sleep
-from concurrent.futures import ThreadPoolExecutor
-from jinja2 import Environment, FileSystemLoader
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from operator import length_hint
-from unitypackage_extractor.extractor import extractPackage
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 from shared import *
 import booth
 import booth_sql
-import cloudflare
-import llm_summary
+import http_session
+import rate_limit
+import product_cache
+import tree_cache as tree_cache_module
+import version_index
+import version_store as version_store_module
+import hashing
+import archive_walker
+import archive_budget
+import path_filter
+import diff_tree
+import archive_pool as archive_pool_module
+import workspace as workspace_module
+import upload_queue as upload_queue_module
 from logging_setup import attach_syslog_handler
 
+# boto3(cloudflare), google-genai(llm_summary), unitypackage_extractor, jinja2, aiohttp(async_engine)는
+# 처음 쓸 때 import한다
+IMPORTED_AT = perf_counter()
+
 DRY_RUN = None
 
 # Setup robust logger
 thread_local = threading.local()
+# asyncio 엔진에서는 한 스레드에서 여러 주문을 처리하므로 thread_local 대신 사용
+order_context = contextvars.ContextVar('order_num', default=None)
 
 class ContextFilter(logging.Filter):
     def filter(self, record):
-        record.order_num = getattr(thread_local, 'order_num', 'main')
+        order_num = order_context.get()
+        record.order_num = order_num if order_num is not None else getattr(thread_local, 'order_num', 'main')
         return True
 
 LOG_FORMAT = '[%(asctime)s] - [%(levelname)s] - [%(order_num)s] - %(message)s'
@@ -57,6 +86,14 @@ class BoothCrawlError(Exception):
 #   - 1: Added
 #   - 2: Deleted
 #   - 3: Changed
+# 이번에 기록하지 않은 이전 노드는 mark_deleted()가 2로 표시한다.
+# 하위 트리가 이전과 같으면 루트에만 0과 UNCHANGED_SUBTREE를 남기고 그 아래는 표시하지 않는다.
+UNCHANGED_SUBTREE = diff_tree.UNCHANGED_SUBTREE
+
+# changelog.precompress 값과 미리 압축한 사본의 확장자
+CHANGELOG_ENCODINGS = {'gzip': '.gz', 'br': '.br'}
+# changelog.keep_local이 꺼져 있을 때 업로드할 페이지를 메모리에 두는 최대 크기
+CHANGELOG_SPOOL_MAX_SIZE = 16 * 1024 * 1024
 
 # download_short_list 
 #   - [download_number]
@@ -78,15 +115,52 @@ def prepare_item_data(item):
         "fbx_only": bool(item[9]),
         "booth_cookie": {"_plaza_session_nktz7u": item[10]},
         "discord_user_id": item[11],
-        "discord_channel_id": item[12]
+        "discord_channel_id": item[12],
+        "file_filter": path_filter.item_filter(item[13], item[14], bool(item[9])),
     }
 
-def fetch_booth_data(item_data):
+def prefetch_library_data(booth_items, executor):
+    """Crawls each account's order library once and returns {order_num: crawl result} for unambiguous items."""
+    accounts = {}
+    for item in booth_items:
+        item_data = prepare_item_data(item)
+        if item_data["gift_item"]:
+            continue
+        accounts.setdefault(item[10], []).append(item_data)
+
+    def _crawl_account(account_items):
+        thread_local.order_num = 'library'
+        try:
+            item_numbers = [item_data["item_number"] for item_data in account_items]
+            library = booth.crawling_library(account_items[0]["booth_cookie"], item_numbers, library_max_pages)
+        except Exception:
+            logger.exception('Failed to crawl order library; falling back to order pages.')
+            return {}
+        finally:
+            del thread_local.order_num
+        return {
+            item_data["order_num"]: library[item_data["item_number"]]
+            for item_data in account_items
+            if item_data["item_number"] in library
+        }
+
+    prefetched = {}
+    for result in executor.map(_crawl_account, accounts.values()):
+        prefetched.update(result)
+    logger.info(f"Order library resolved {len(prefetched)} items from {len(accounts)} accounts.")
+    return prefetched
+
+def fetch_booth_data(item_data, prefetched=None):
     """Crawls booth.pm and returns download and product info."""
     download_short_list = []
     thumblist = []
     
-    if item_data["gift_item"]:
+    if prefetched is not None and item_data["order_num"] in prefetched:
+        download_url_list, product_info_list, library_thumbs = prefetched[item_data["order_num"]]
+        download_url_list = [list(info) for info in download_url_list]
+        download_short_list.extend(info[0] for info in download_url_list)
+        thumblist.extend(library_thumbs)
+    elif item_data["gift_item"]:
         download_url_list, product_info_list = booth.crawling_gift(
             item_data["order_num"], item_data["booth_cookie"], download_short_list, thumblist
         )
@@ -103,35 +177,43 @@ def fetch_booth_data(item_data):
 
     return download_url_list, product_info_list, download_short_list, thumblist
 
+async def fetch_booth_data_async(item_data, client, prefetched=None):
+    """Async fetch_booth_data; the page is fetched on the event loop and parsed on the executor."""
+    if prefetched is not None and item_data["order_num"] in prefetched:
+        return fetch_booth_data(item_data, prefetched)
+
+    download_short_list = []
+    thumblist = []
+    url, selectors = booth.order_page(item_data["order_num"], item_data["gift_item"])
+    product_only = None if item_data["gift_item"] else [item_data["item_number"]]
+
+    _, _, html = await client.get_bytes(url, cookies=item_data["booth_cookie"])
+    download_url_list, product_info_list = await run_blocking(
+        booth.parse_order_page, html, url, item_data["booth_cookie"], selectors, download_short_list, thumblist, product_only
+    )
+
+    if not download_url_list or not product_info_list:
+        error_msg = f'Failed to crawl BOOTH page. The page structure might have changed or the session is invalid.'
+        logger.error(error_msg)
+        await send_error_message_async(client, item_data["discord_channel_id"], item_data["discord_user_id"])
+        raise BoothCrawlError(error_msg)
+
+    return download_url_list, product_info_list, download_short_list, thumblist
+
 def load_and_compare_version(order_num, download_short_list, fbx_only):
-    """Loads version file, ensures structure, and reports whether the download list changed."""
-    version_file_path = f'./version/json/{order_num}.json'
-    
-    # In dry run, if the file doesn't exist, simulate a new item by creating an empty version_json.
-    if DRY_RUN and not os.path.exists(version_file_path):
-        logger.info('Dry run: version file not found, simulating new item.')
-        version_json = {'short-list': [], 'name-list': [], 'files': {}, 'fbx-files': {}}
-    else:
-        # Original logic for non-dry-run or if file exists in dry run.
-        if not os.path.exists(version_file_path):
-            logger.info('version file not found, creating one.')
-            createVersionFile(version_file_path)
+    """Loads the order's version from version_store, ensures structure, and reports whether the download list changed.
 
-        def _load_json(path):
-            with open(path, 'r') as f:
-                return simdjson.load(f)
+    The version is only loaded when the order's fingerprint in version_index differs
+    from the crawled download list. Returns (version_json, has_changed); version_json is
+    None when there is nothing to do.
+    """
+    current_fingerprint = version_index.fingerprint(download_short_list)
 
-        try:
-            version_json = _load_json(version_file_path)
-        except ValueError:
-            logger.warning('version file corrupted, recreating.')
-            if not DRY_RUN:
-                createVersionFile(version_file_path)
-                version_json = _load_json(version_file_path)
-            else:
-                # If file is corrupted in dry run, also simulate a new item.
-                logger.info('Dry run: version file corrupted, simulating new item.')
-                version_json = {'short-list': [], 'name-list': [], 'files': {}, 'fbx-files': {}}
+    if order_index and order_index.get(order_num) == current_fingerprint and version_store.exists(order_num):
+        logger.info('nothing has changed.')
+        return None, False
+
+    version_json = version_store.load(order_num)
 
     if 'fbx-files' not in version_json:
         version_json['fbx-files'] = {}
@@ -143,131 +225,238 @@ def load_and_compare_version(order_num, download_short_list, fbx_only):
         version_json['short-list'] = []
 
     local_list = version_json.get('short-list', [])
-    
-    has_changed = not (
-        length_hint(local_list) == length_hint(download_short_list) and
-        ((not local_list and not download_short_list) or
-         (local_list and download_short_list and local_list[0] == download_short_list[0] and local_list[-1] == download_short_list[-1]))
-    )
+    has_changed = version_index.fingerprint(local_list) != current_fingerprint
 
     if not has_changed:
         logger.info('nothing has changed.')
-        return None, None, False
+        if order_index and not DRY_RUN:
+            # 인덱스가 없던 주문은 여기서 채워 다음 주기부터 버전을 읽지 않는다
+            order_index.put(order_num, current_fingerprint)
+        return None, False
 
     if not download_short_list:
         logger.error('BOOTH no responding, but change was detected.')
-        return None, None, False
+        return None, False
         
     if has_changed:
         logger.info('something has changed.')
 
-    return version_file_path, version_json, has_changed
+    return version_json, has_changed
+
+def tree_cache_variant(item_data):
+    """Key part describing how a download was processed; cached trees are only reused for the same variant."""
+    mode = 'fbx' if item_data["fbx_only"] else 'tree'
+    variant = f'{mode}:{item_data["encoding"]}:{hashing.ALGORITHM}'
+    file_filter = item_data["file_filter"]
+    if file_filter.include or file_filter.exclude:
+        variant += f':{file_filter.key()}'
+    return variant
 
-def process_files_for_changelog(item_data, download_url_list, local_list):
-    """Downloads new files and archives them if configured."""
+def hash_algorithms(version_json):
+    """Algorithms to hash with: the configured one, plus the version file's own while it still uses another.
+
+    The second hash is only used to compare against the stored tree; everything is saved with the first.
+    """
+    stored = version_json.get('hash-algorithm')
+    if stored is None:
+        has_hashes = version_json.get('files') or version_json.get('fbx-files')
+        stored = hashing.LEGACY_ALGORITHM if has_hashes else hashing.ALGORITHM
+    if stored == hashing.ALGORITHM:
+        return (hashing.ALGORITHM,)
+    return (hashing.ALGORITHM, stored)
+
+def plan_downloads(item_data, download_url_list, local_list, algorithms=None):
+    """Decides which files have to be downloaded and archived.
+
+    Download numbers whose parsed tree is already cached are not downloaded again, unless
+    the item's version file still has to be compared with another hash algorithm.
+
+    Returns:
+        tuple: (item_name_list, cached_trees, jobs) where cached_trees maps download number to its
+        cached entry and jobs lists (download_number, filename, should_download, should_archive)
+    """
     item_name_list = []
-    archive_folder = f'./archive/{strftime_now()}'
+    cached_trees = {}
+    jobs = []
+    needs_tree = item_data["changelog_show"] or item_data["fbx_only"]
+    use_cache = tree_cache and needs_tree and len(algorithms or ()) <= 1
 
     for download_number, filename in download_url_list:
-        download_path = f'./download/{filename}'
         item_name_list.append(filename)
 
         should_download = item_data["changelog_show"] or item_data["archive_this"] or item_data["fbx_only"]
+        should_archive = item_data["archive_this"] and download_number not in local_list
+
+        if use_cache and not should_archive:
+            cached = tree_cache.get(download_number, tree_cache_variant(item_data))
+            if cached is not None:
+                logger.info(f'using cached tree for {download_number} ({filename})')
+                cached_trees[download_number] = cached
+                continue
+
+        jobs.append((download_number, filename, should_download, should_archive))
 
+    return item_name_list, cached_trees, jobs
+
+def archive_download(archive_folder, download_path, filename):
+    os.makedirs(archive_folder, exist_ok=True)
+    shutil.copyfile(download_path, os.path.join(archive_folder, filename))
+
+def process_files_for_changelog(item_data, download_url_list, local_list, workspace, algorithms=None):
+    """Downloads new files into the job's workspace and archives them if configured.
+
+    Returns:
+        tuple: (item_name_list, download_hashes, cached_trees) where download_hashes maps filename
+        to the hash computed while downloading and cached_trees maps download number to its cached entry
+    """
+    item_name_list, cached_trees, jobs = plan_downloads(item_data, download_url_list, local_list, algorithms)
+    download_hashes = {}
+    archive_folder = f'./archive/{strftime_now()}'
+
+    for download_number, filename, should_download, should_archive in jobs:
+        download_path = workspace.download_path(filename)
         if should_download:
             logger.info(f'downloading {download_number} to {download_path}')
-            booth.download_item(download_number, download_path, item_data["booth_cookie"])
+            download_hashes[filename] = booth.download_item(
+                download_number, download_path, item_data["booth_cookie"],
+                retries=download_retries, backoff_factor=download_backoff,
+            )
 
-        if item_data["archive_this"] and download_number not in local_list:
-            os.makedirs(archive_folder, exist_ok=True)
-            archive_path = os.path.join(archive_folder, filename)
-            shutil.copyfile(download_path, archive_path)
+        if should_archive:
+            archive_download(archive_folder, download_path, filename)
     
-    return item_name_list
+    return item_name_list, download_hashes, cached_trees
+
+async def process_files_for_changelog_async(item_data, download_url_list, local_list, client, workspace, algorithms=None):
+    """Async process_files_for_changelog; downloads stream on the event loop."""
+    item_name_list, cached_trees, jobs = await run_blocking(plan_downloads, item_data, download_url_list, local_list, algorithms)
+    download_hashes = {}
+    archive_folder = f'./archive/{strftime_now()}'
+
+    for download_number, filename, should_download, should_archive in jobs:
+        download_path = workspace.download_path(filename)
+        if should_download:
+            logger.info(f'downloading {download_number} to {download_path}')
+            download_hashes[filename] = await client.download_item(
+                download_number, download_path, item_data["booth_cookie"],
+                retries=download_retries, backoff_factor=download_backoff, run_blocking=run_blocking,
+            )
+
+        if should_archive:
+            await run_blocking(archive_download, archive_folder, download_path, filename)
+
+    return item_name_list, download_hashes, cached_trees
 
-def generate_changelog_and_summary(item_data, download_url_list, version_json):
+def generate_changelog_and_summary(item_data, download_url_list, version_json, download_hashes, cached_trees, workspace):
     """Generates changelog content and returns metadata.
 
     Returns:
-        tuple: (changelog_html_path, s3_object_url, summary_result, diff_found, new_fbx_records)
+        tuple: (changelog_html_path, s3_upload, summary_result, diff_found, new_fbx_records)
     """
     if item_data["fbx_only"]:
-        return generate_fbx_changelog_and_summary(item_data, download_url_list, version_json)
+        return generate_fbx_changelog_and_summary(item_data, download_url_list, version_json, download_hashes, cached_trees, workspace)
+
+    algorithms = hash_algorithms(version_json)
+    budget = item_budget()
+    truncated = []
+    walks = start_walks(item_data, download_url_list, download_hashes, cached_trees, workspace, algorithms, version_json, budget)
+    for download_number, filename in download_url_list:
+        if download_number in cached_trees:
+            apply_cached_tree(version_json, filename, cached_trees[download_number]['tree'], [])
+            continue
 
-    saved_prehash = {}
-    for local_file in version_json['files'].keys():
-        element_mark(version_json['files'][local_file], 2, local_file, saved_prehash)
-        
-    for _, filename in download_url_list:
-        download_path = f'./download/{filename}'
         logger.info(f'parsing {filename} structure')
         try:
-            process_file_tree(download_path, filename, version_json, item_data["encoding"], [])
+            complete = process_download(
+                workspace, filename, version_json, item_data["encoding"], filehash=download_hashes.get(filename),
+                pending=walks.get(download_number), algorithms=algorithms, previous=previous_trees(version_json, filename),
+                budget=budget, truncated=truncated, file_filter=item_data["file_filter"],
+            )
         except Exception as e:
             logger.error(f'An error occurred while parsing {filename}: {e}')
             logger.debug(traceback.format_exc())
+            continue
+
+        if tree_cache and complete:
+            tree_cache.put(download_number, tree_cache_variant(item_data), {'tree': snapshot_tree(version_json['files'][filename])})
+
+    if truncated:
+        logger.warning(f'Archive budget exceeded in {", ".join(truncated)}; the changelog only covers what was read.')
+        for path in truncated:
+            keep_unvisited(version_json, path)
 
-    path_list = generate_path_info(version_json, saved_prehash)
-    diff_found = bool(path_list)
+    saved_prehash = {}
+    mark_deleted(version_json, saved_prehash)
+    diff = diff_tree.from_version_tree(version_json, saved_prehash)
+    diff_found = bool(diff.children)
     if not diff_found:
         logger.info('No structural changes detected; skipping changelog generation.')
         return None, None, None, False, None
     
-    tree = build_tree(path_list)
-    html_list_items = tree_to_html(tree)
-    
-    file_loader = FileSystemLoader('./templates')
-    env = Environment(loader=file_loader)
-    changelog_html = env.get_template('changelog.html')
-
-    data = {
-        'html_list_items': html_list_items
-    }
-    output = changelog_html.render(data)
-
-    changelog_filename = uuid.uuid4()
-
-    changelog_html_path = f"changelog/{changelog_filename}.html"
-
-    with open(changelog_html_path, 'w', encoding='utf-8') as html_file:
-        html_file.write(output)
-    
     summary_result = None
-    summary_data = files_list(tree)
+    # 요약은 compact로 줄이기 전의 전체 diff로 만든다
+    summary_data = diff_tree.to_text(diff)
+    changelog_html_path, s3_upload = publish_changelog(diff, truncated)
+    
     if item_data["summary_this"] and gemini_api_key and summary_data and not DRY_RUN:
         logger.info('Generating summary')
         summary_result = f"{summary.chat(summary_data)}"
         logger.debug(summary_result)
     elif item_data["summary_this"] and gemini_api_key and summary_data and DRY_RUN:
         logger.info('Dry run: Skipping summary generation.')
-    
-    s3_object_url = None
-    if s3_uploader and not DRY_RUN:
-        try:
-            s3_uploader.upload(changelog_html_path, s3['bucket_name'], changelog_html_path)
-            logger.info('Changelog uploaded to S3')
-            s3_object_url = f"https://{s3['bucket_access_url']}/{changelog_html_path}"
-        except Exception as e:
-            logger.error(f'Error occurred while uploading changelog to S3: {e}')
-    elif s3_uploader and DRY_RUN:
-        logger.info('Dry run: Skipping changelog upload to S3.')
 
-    return changelog_html_path, s3_object_url, summary_result, diff_found, None
+    return changelog_html_path, s3_upload, summary_result, diff_found, None
 
 
-def generate_fbx_changelog_and_summary(item_data, download_url_list, version_json):
+def generate_fbx_changelog_and_summary(item_data, download_url_list, version_json, download_hashes, cached_trees, workspace):
     """Generates changelog information for FBX-only tracking."""
+    algorithms = hash_algorithms(version_json)
     previous_fbx = version_json.get('fbx-files', {}) or {}
-    current_fbx = {}
+    previous_root = fbx_tree(version_json)
+    budget = item_budget()
+    truncated = []
+    # path -> file node ('legacy-hash' while migrating, 'size'/'crc' for zip members)
+    current_nodes = {}
+
+    walks = start_walks(item_data, download_url_list, download_hashes, cached_trees, workspace, algorithms, previous_root, budget)
+    for download_number, filename in download_url_list:
+        if download_number in cached_trees:
+            for relative_path, cached_node in cached_trees[download_number]['fbx'].items():
+                current_nodes[filename + relative_path] = cached_node if isinstance(cached_node, dict) else {'hash': cached_node}
+            continue
 
-    for _, filename in download_url_list:
-        download_path = f'./download/{filename}'
         logger.info(f'parsing {filename} structure (FBX only)')
+        file_fbx = {}
         try:
-            process_file_tree(download_path, filename, None, item_data["encoding"], [], fbx_only=True, fbx_records=current_fbx)
+            complete = process_download(
+                workspace, filename, None, item_data["encoding"], fbx_records=file_fbx, filehash=download_hashes.get(filename),
+                pending=walks.get(download_number), algorithms=algorithms, previous=previous_trees(previous_root, filename),
+                budget=budget, truncated=truncated, file_filter=item_data["file_filter"],
+            )
         except Exception as e:
             logger.error(f'An error occurred while parsing {filename}: {e}')
             logger.debug(traceback.format_exc())
+            continue
+        current_nodes.update(file_fbx)
+
+        if tree_cache and complete:
+            # 파일명이 바뀌어도 재사용할 수 있도록 최상위 파일명을 뺀 경로로 저장
+            relative_fbx = {path[len(filename):]: snapshot_tree(node) for path, node in file_fbx.items()}
+            tree_cache.put(download_number, tree_cache_variant(item_data), {'fbx': relative_fbx})
+
+    if truncated:
+        logger.warning(f'Archive budget exceeded in {", ".join(truncated)}; the changelog only covers what was read.')
+        # 잘린 압축 파일 안에서 다시 읽지 못한 FBX는 삭제된 것이 아니라 이전 그대로 둔다
+        previous_zip_info = version_json.get('fbx-zip-info', {}) or {}
+        for path, file_hash in previous_fbx.items():
+            if path not in current_nodes and any(path.startswith(prefix + '/') for prefix in truncated):
+                node = current_nodes[path] = {'hash': file_hash}
+                if path in previous_zip_info:
+                    node['size'], node['crc'] = previous_zip_info[path]
+
+    # 저장은 설정된 알고리즘으로, 비교는 이전 버전 파일과 같은 알고리즘으로 한다
+    new_fbx = {path: snapshot_tree(node) for path, node in current_nodes.items()}
+    current_fbx = {path: node.get('legacy-hash', node['hash']) for path, node in current_nodes.items()}
 
     previous_hashes = {file_hash for file_hash in previous_fbx.values()}
     current_hashes = {file_hash for file_hash in current_fbx.values()}
@@ -299,22 +488,17 @@ def generate_fbx_changelog_and_summary(item_data, download_url_list, version_jso
 
     if not added and not changed and not deleted:
         logger.info('No FBX hash differences detected; skipping changelog generation.')
-        return None, None, None, False, current_fbx
-
-    path_list = []
-    for name in sorted(added):
-        path_list.append({'line_str': name, 'status': 1})
-    for name in sorted(changed):
-        path_list.append({'line_str': name, 'status': 3})
-    for name in sorted(deleted):
-        path_list.append({'line_str': name, 'status': 2})
+        return None, None, None, False, new_fbx
 
-    tree = build_tree(path_list)
-    html_list_items = tree_to_html(tree) if item_data["changelog_show"] else ''
-    summary_data = files_list(tree)
+    diff = diff_tree.from_paths(
+        [(name, diff_tree.ADDED) for name in sorted(added)]
+        + [(name, diff_tree.CHANGED) for name in sorted(changed)]
+        + [(name, diff_tree.DELETED) for name in sorted(deleted)]
+    )
+    summary_data = diff_tree.to_text(diff)
 
     changelog_html_path = None
-    s3_object_url = None
+    s3_upload = None
     summary_result = None
 
     if item_data["summary_this"] and gemini_api_key and summary_data and not DRY_RUN:
@@ -325,44 +509,207 @@ def generate_fbx_changelog_and_summary(item_data, download_url_list, version_jso
         logger.info('Dry run: Skipping summary generation.')
 
     if item_data["changelog_show"]:
-        file_loader = FileSystemLoader('./templates')
-        env = Environment(loader=file_loader)
-        changelog_html = env.get_template('changelog.html')
+        changelog_html_path, s3_upload = publish_changelog(diff, truncated)
 
-        data = {
-            'html_list_items': html_list_items
-        }
-        output = changelog_html.render(data)
+    return changelog_html_path, s3_upload, summary_result, True, new_fbx
 
-        changelog_filename = uuid.uuid4()
-        changelog_html_path = f"changelog/{changelog_filename}.html"
+@functools.lru_cache(maxsize=None)
+def changelog_template():
+    """changelog.html, compiled once per process; the bytecode is also cached on disk across restarts."""
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
-        with open(changelog_html_path, 'w', encoding='utf-8') as html_file:
-            html_file.write(output)
+    os.makedirs('./version/db/templates', exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader('./templates'),
+        bytecode_cache=FileSystemBytecodeCache('./version/db/templates'),
+        auto_reload=False,
+    )
+    return env.get_template('changelog.html')
 
-        if s3_uploader and not DRY_RUN:
-            try:
-                s3_uploader.upload(changelog_html_path, s3['bucket_name'], changelog_html_path)
-                logger.info('Changelog uploaded to S3')
-                s3_object_url = f"https://{s3['bucket_access_url']}/{changelog_html_path}"
-            except Exception as e:
-                logger.error(f'Error occurred while uploading changelog to S3: {e}')
-        elif s3_uploader and DRY_RUN:
-            logger.info('Dry run: Skipping changelog upload to S3.')
+def write_changelog(diff, truncated):
+    """Streams the changelog page of diff into changelog/ and returns its path.
 
-    return changelog_html_path, s3_object_url, summary_result, True, current_fbx
+    The page is named after its SHA-256 (see render_changelog). With changelog.precompress
+    a compressed copy (path + CHANGELOG_ENCODINGS suffix) is written in the same pass.
+    """
+    page_file = tempfile.NamedTemporaryFile(dir='changelog', suffix='.tmp', delete=False)
+    compressed_file = tempfile.NamedTemporaryFile(dir='changelog', suffix='.tmp', delete=False) if changelog_encoding else None
+    try:
+        with page_file:
+            sha = render_changelog(diff, truncated, page_file, compressed_file)
+            if compressed_file is not None:
+                compressed_file.close()
+    except BaseException:
+        for temp_file in (page_file, compressed_file):
+            if temp_file is not None:
+                temp_file.close()
+                os.remove(temp_file.name)
+        raise
+
+    changelog_path = f"changelog/{sha}.html"
+    os.replace(page_file.name, changelog_path)
+    if compressed_file is not None:
+        os.replace(compressed_file.name, changelog_path + CHANGELOG_ENCODINGS[changelog_encoding])
+    return changelog_path
+
+def spool_changelog(diff, truncated):
+    """Streams the changelog page of diff into a spooled temporary file instead of changelog/.
+
+    Returns (changelog_path, body): the S3 key write_changelog would have used and the page,
+    or its compressed copy with changelog.precompress, to upload. The caller closes body.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=CHANGELOG_SPOOL_MAX_SIZE)
+    try:
+        if changelog_encoding:
+            # 압축한 사본만 올리므로 원본은 해시만 계산한다
+            sha = render_changelog(diff, truncated, None, body)
+        else:
+            sha = render_changelog(diff, truncated, body)
+    except BaseException:
+        body.close()
+        raise
+    return f"changelog/{sha}.html", body
+
+def render_changelog(diff, truncated, page_file, compressed_file=None):
+    """Streams the changelog page of diff into page_file and returns its SHA-256 hex digest.
+
+    The digest is computed while the template output is written, so the page is never held
+    in memory as a whole. With compressed_file a copy compressed with changelog.precompress
+    is written in the same pass; page_file may be None when only that copy is needed. In
+    compact mode diff is shrunk first (see diff_tree.compact).
+    """
+    omitted = diff_tree.compact(diff, changelog_node_budget) if changelog_compact else 0
+    if omitted:
+        logger.info(f'Changelog node budget reached; {omitted} entries left out.')
+
+    stream = changelog_template().stream(html_list_items=diff_tree.iter_html(diff), truncated=truncated, omitted=omitted)
+    # 템플릿이 내보내는 작은 조각을 모아서 쓴다
+    stream.enable_buffering(64)
+    digest = hashlib.sha256()
+    compressor = precompressor(compressed_file, changelog_encoding) if compressed_file is not None else None
+    for chunk in stream:
+        data = chunk.encode('utf-8')
+        digest.update(data)
+        if page_file is not None:
+            page_file.write(data)
+        if compressor is not None:
+            compressor.write(data)
+    if compressor is not None:
+        compressor.close()
+    return digest.hexdigest()
+
+class _BrotliWriter:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT)
+
+    def write(self, data):
+        self.fileobj.write(self.compressor.process(data))
+
+    def close(self):
+        self.fileobj.write(self.compressor.finish())
+
+def precompressor(fileobj, encoding):
+    """A writer compressing into fileobj with gzip or brotli ('br'); close() it to finish the stream."""
+    if encoding == 'br':
+        return _BrotliWriter(fileobj)
+    # 같은 페이지는 같은 바이트로 압축되도록 파일 이름과 mtime을 비운다
+    return gzip.GzipFile(filename='', mode='wb', fileobj=fileobj, mtime=0)
+
+def publish_changelog(diff, truncated):
+    """Writes the changelog of diff and queues its upload to S3 without waiting for it.
+
+    Returns (changelog_html_path, s3_upload). The page is named after its SHA-256, so
+    identical changelogs share one file and one S3 object. It is written to changelog/
+    unless S3 is used with changelog.keep_local off, in which case it is uploaded from a
+    spooled temporary file and the path is None. s3_upload is None without an upload,
+    otherwise a future that resolves to the page's URL once the upload succeeded, or to
+    None if it failed, so a notification never links to a page that is not there (see
+    notify_after_upload).
+    """
+    if not upload_queue:
+        return write_changelog(diff, truncated), None
+
+    if changelog_keep_local:
+        changelog_html_path = changelog_path = write_changelog(diff, truncated)
+        body = changelog_path + CHANGELOG_ENCODINGS.get(changelog_encoding, '')
+    else:
+        changelog_html_path = None
+        changelog_path, body = spool_changelog(diff, truncated)
 
-def send_discord_notification(item_data, product_info, thumb, local_list_name, item_name_list, changelog_html_path, s3_object_url, summary_result):
-    """Sends update notification to Discord."""
     if DRY_RUN:
-        logger.info('Dry run: Skipping Discord notification.')
+        logger.info('Dry run: Skipping changelog upload to S3.')
+        if changelog_html_path is None:
+            body.close()
+        return changelog_html_path, None
+
+    s3_object_url = f"https://{s3['bucket_access_url']}/{changelog_path}"
+    s3_upload = Future()
+
+    def uploaded(future):
+        if changelog_html_path is None:
+            body.close()
+        # 업로드 큐가 이미 오류를 기록했다
+        s3_upload.set_result(s3_object_url if future.exception() is None else None)
+
+    # 같은 페이지를 다른 아이템이 올리는 중이면 그 업로드가 끝날 때 함께 끝난다
+    upload_queue.submit(changelog_path, body, content_encoding=changelog_encoding).add_done_callback(uploaded)
+    return changelog_html_path, s3_upload
+
+def notify_after_upload(s3_upload, notify):
+    """Calls notify(s3_object_url) once the changelog upload is done, without making the caller wait for it.
+
+    Without an upload (s3_upload is None) notify is called right away with None. Otherwise
+    it runs on the upload thread, in the caller's log context.
+    """
+    if s3_upload is None:
+        notify(None)
         return
 
-    api_url = f'{discord_api_url}/send_message'
-    product_name, product_url = product_info
-    author_info = booth.crawling_product(product_url)
+    order_num = getattr(thread_local, 'order_num', None)
 
-    data = {
+    def send(future):
+        order_context.set(order_num)
+        try:
+            notify(future.result())
+        except Exception:
+            logger.exception('Failed to send the Discord notification after the changelog upload.')
+
+    s3_upload.add_done_callback(lambda future: contextvars.copy_context().run(send, future))
+
+async def notify_after_upload_async(s3_upload, notify):
+    """Async notify_after_upload: awaits the changelog upload, if any, then notify(s3_object_url)."""
+    s3_object_url = await asyncio.wrap_future(s3_upload) if s3_upload is not None else None
+    try:
+        await notify(s3_object_url)
+    except Exception:
+        logger.exception('Failed to send the Discord notification after the changelog upload.')
+
+def compute_changes(item_data, download_url_list, version_json, download_hashes, cached_trees, download_list_changed, workspace):
+    """Builds the changelog if the item wants one and decides whether anything changed.
+
+    Returns:
+        tuple: (changelog_html_path, s3_upload, summary_result, diff_found, new_fbx_records)
+    """
+    changelog_html_path, s3_upload, summary_result = None, None, None
+    diff_found = download_list_changed
+    new_fbx_records = None
+
+    if item_data["changelog_show"] or item_data["fbx_only"]:
+        changelog_html_path, s3_upload, summary_result, calc_diff_found, new_fbx_records = generate_changelog_and_summary(
+            item_data, download_url_list, version_json, download_hashes, cached_trees, workspace
+        )
+        if item_data["fbx_only"]:
+            diff_found = calc_diff_found
+        elif item_data["changelog_show"]:
+            diff_found = calc_diff_found or diff_found
+
+    return changelog_html_path, s3_upload, summary_result, diff_found, new_fbx_records
+
+def build_notification(item_data, product_info, thumb, local_list_name, item_name_list, s3_object_url, summary_result, author_info):
+    """Returns the send_message payload."""
+    product_name, product_url = product_info
+    return {
         'name': item_data["name"] or product_name,
         'url': product_url,
         'thumb': thumb,
@@ -377,26 +724,47 @@ def send_discord_notification(item_data, product_info, thumb, local_list_name, i
         'summary': summary_result,
     }
 
-    response = requests.post(api_url, json=data)
-    
-    if response.status_code == 200:
-        logger.info('send_message API 요청 성공')
+def log_api_response(endpoint, status, text):
+    if status == 200:
+        logger.info(f'{endpoint} API 요청 성공')
     else:
-        logger.error(f'send_message API 요청 실패: {response.text}')
+        logger.error(f'{endpoint} API 요청 실패: {text}')
+
+def send_discord_notification(item_data, product_info, thumb, local_list_name, item_name_list, changelog_html_path, s3_object_url, summary_result):
+    """Sends update notification to Discord."""
+    if DRY_RUN:
+        logger.info('Dry run: Skipping Discord notification.')
+        return
+
+    author_info = author_cache.get(product_info[1])
+    data = build_notification(item_data, product_info, thumb, local_list_name, item_name_list, s3_object_url, summary_result, author_info)
+    response = requests.post(f'{discord_api_url}/send_message', json=data)
+    log_api_response('send_message', response.status_code, response.text)
     
     if item_data["changelog_show"] and changelog_html_path and not s3:
-        api_url = f'{discord_api_url}/send_changelog'
         data = {'file': changelog_html_path, 'channel_id': item_data["discord_channel_id"]}
-        response = requests.post(api_url, json=data)
-        if response.status_code == 200:
-            logger.info('send_changelog API 요청 성공')
-        else:
-            logger.error(f'send_changelog API 요청 실패: {response.text}')
+        response = requests.post(f'{discord_api_url}/send_changelog', json=data)
+        log_api_response('send_changelog', response.status_code, response.text)
 
-def update_version_file(version_file_path, version_json, item_name_list, download_short_list, fbx_only=False, new_fbx_records=None):
-    """Cleans up and saves the updated version file."""
+async def send_discord_notification_async(client, item_data, product_info, thumb, local_list_name, item_name_list, changelog_html_path, s3_object_url, summary_result):
+    """Async send_discord_notification."""
     if DRY_RUN:
-        logger.info(f'Dry run: Skipping version file update for {version_file_path}.')
+        logger.info('Dry run: Skipping Discord notification.')
+        return
+
+    fetch = functools.partial(client.fetch_product, run_blocking=run_blocking)
+    author_info = await author_cache.get_async(product_info[1], fetch)
+    data = build_notification(item_data, product_info, thumb, local_list_name, item_name_list, s3_object_url, summary_result, author_info)
+    log_api_response('send_message', *await client.post_json(f'{discord_api_url}/send_message', data))
+
+    if item_data["changelog_show"] and changelog_html_path and not s3:
+        data = {'file': changelog_html_path, 'channel_id': item_data["discord_channel_id"]}
+        log_api_response('send_changelog', *await client.post_json(f'{discord_api_url}/send_changelog', data))
+
+def update_version_file(order_num, version_json, item_name_list, download_short_list, fbx_only=False, new_fbx_records=None):
+    """Cleans up and saves the updated version to version_store."""
+    if DRY_RUN:
+        logger.info(f'Dry run: Skipping version update for {order_num}.')
         return
         
     if not fbx_only:
@@ -406,20 +774,26 @@ def update_version_file(version_file_path, version_json, item_name_list, downloa
 
     version_json['name-list'] = item_name_list
     version_json['short-list'] = download_short_list
+    version_json['hash-algorithm'] = hashing.ALGORITHM
     if new_fbx_records is not None:
-        version_json['fbx-files'] = new_fbx_records
+        version_json['fbx-files'] = {path: node['hash'] for path, node in new_fbx_records.items()}
+        version_json['fbx-zip-info'] = {path: [node['size'], node['crc']] for path, node in new_fbx_records.items() if 'crc' in node}
     elif 'fbx-files' not in version_json:
         version_json['fbx-files'] = {}
     
-    with open(version_file_path, 'w') as f:
-        simdjson.dump(version_json, fp=f, indent=4)
+    version_store.save(order_num, version_json)
+
+    if order_index:
+        order_index.put(order_num, version_index.fingerprint(download_short_list))
 
-def init_update_check(item): # This is the main orchestrator function
+THUMBNAIL_PLACEHOLDER = "https://asset.booth.pm/assets/thumbnail_placeholder_f_150x150-73e650fbec3b150090cbda36377f1a3402c01e36fa067d01.png"
+
+def init_update_check(item, prefetched=None): # This is the main orchestrator function
     item_data = prepare_item_data(item)
     order_num = item_data["order_num"]
 
     try:
-        download_url_list, product_info_list, download_short_list, thumblist = fetch_booth_data(item_data)
+        download_url_list, product_info_list, download_short_list, thumblist = fetch_booth_data(item_data, prefetched)
     except BoothCrawlError as e:
         logger.debug(f"Crawling failed: {e}")
         return
@@ -431,153 +805,464 @@ def init_update_check(item): # This is the main orchestrator function
     if item_data["name"] is None:
         item_data["name"] = product_name
 
-    version_file_path, version_json, download_list_changed = load_and_compare_version(order_num, download_short_list, item_data["fbx_only"])
-    if version_file_path is None and version_json is None and not download_list_changed:
+    version_json, download_list_changed = load_and_compare_version(order_num, download_short_list, item_data["fbx_only"])
+    if version_json is None:
         return
 
     local_list = version_json.get('short-list', [])
     local_list_name = version_json.get('name-list', [])
-    
-    item_name_list = process_files_for_changelog(item_data, download_url_list, local_list) # This is a new helper function
 
-    changelog_html_path, s3_object_url, summary_result = None, None, None
-    diff_found = download_list_changed
-    new_fbx_records = None
-
-    if item_data["changelog_show"] or item_data["fbx_only"]:
-        changelog_html_path, s3_object_url, summary_result, calc_diff_found, new_fbx_records = generate_changelog_and_summary(
-            item_data, download_url_list, version_json
+    # 다운로드와 압축 해제는 주문마다 따로 만든 작업 폴더에서 하고, 끝나면 항상 지운다
+    with scratch.workspace(order_num) as workspace:
+        try:
+            item_name_list, download_hashes, cached_trees = process_files_for_changelog(item_data, download_url_list, local_list, workspace, hash_algorithms(version_json))
+        except booth.BoothDownloadError as e:
+            # 버전 파일을 갱신하지 않으므로 다음 주기에 다시 시도한다
+            logger.error(f'Download failed, retrying next cycle: {e}')
+            return
+
+        changelog_html_path, s3_upload, summary_result, diff_found, new_fbx_records = compute_changes(
+            item_data, download_url_list, version_json, download_hashes, cached_trees, download_list_changed, workspace
         )
-        if item_data["fbx_only"]:
-            diff_found = calc_diff_found
-        elif item_data["changelog_show"]:
-            diff_found = calc_diff_found or diff_found
 
     if item_data["fbx_only"] and not diff_found:
         logger.info('FBX contents unchanged. Skipping notification.')
-        update_version_file(version_file_path, version_json, item_name_list, download_short_list, item_data["fbx_only"], new_fbx_records)
+        update_version_file(order_num, version_json, item_name_list, download_short_list, item_data["fbx_only"], new_fbx_records)
         return
 
-    thumb = thumblist[0] if thumblist else "https://asset.booth.pm/assets/thumbnail_placeholder_f_150x150-73e650fbec3b150090cbda36377f1a3402c01e36fa067d01.png"
+    thumb = thumblist[0] if thumblist else THUMBNAIL_PLACEHOLDER
 
-    send_discord_notification(
-        item_data, (product_name, product_url), thumb, local_list_name,
-        item_name_list, changelog_html_path, s3_object_url, summary_result
-    )
+    notify_after_upload(s3_upload, functools.partial(
+        send_discord_notification, item_data, (product_name, product_url), thumb, local_list_name,
+        item_name_list, changelog_html_path, summary_result=summary_result
+    ))
     
-    update_version_file(version_file_path, version_json, item_name_list, download_short_list, item_data["fbx_only"], new_fbx_records)
+    update_version_file(order_num, version_json, item_name_list, download_short_list, item_data["fbx_only"], new_fbx_records)
 
-def generate_path_info(root, saved_prehash):
-    path_list = []
-    _generate_path_info_recursive(root, saved_prehash, path_list)
-    return path_list
+async def init_update_check_async(item, client, prefetched=None):
+    """init_update_check for the asyncio engine: network I/O is awaited, extraction runs on the executor.
 
-def _generate_path_info_recursive(root, saved_prehash, path_list, current_level=0):
-    files = root.get('files')
-    if not files:
+    Returns the coroutine sending the Discord notification (see notify_after_upload_async), or
+    None if there is nothing to send.
+    """
+    item_data = prepare_item_data(item)
+    order_num = item_data["order_num"]
+
+    try:
+        download_url_list, product_info_list, download_short_list, thumblist = await fetch_booth_data_async(item_data, client, prefetched)
+    except BoothCrawlError as e:
+        logger.debug(f"Crawling failed: {e}")
+        return
+    except Exception as e:
+        logger.exception("An unexpected error occurred during fetch_booth_data")
         return
 
-    for file_name, file_node in files.items():
-        file_info = {'line_str': '', 'status': file_node['mark_as']}
+    product_name, product_url = product_info_list[0]
+    if item_data["name"] is None:
+        item_data["name"] = product_name
 
-        file_info['line_str'] += ' ' * 8 * current_level
+    version_json, download_list_changed = await run_blocking(
+        load_and_compare_version, order_num, download_short_list, item_data["fbx_only"]
+    )
+    if version_json is None:
+        return
 
-        symbol = ''
-        if file_info['status'] == 1:
-            symbol = '(Added)'
-        elif file_info['status'] == 2:
-            symbol = '(Deleted)'
-        elif file_info['status'] == 3:
-            symbol = '(Changed)'
+    local_list = version_json.get('short-list', [])
+    local_list_name = version_json.get('name-list', [])
 
-        hash_val = file_node['hash']
-        old_name = saved_prehash.get(hash_val)
+    workspace = await run_blocking(scratch.workspace, order_num)
+    try:
+        try:
+            item_name_list, download_hashes, cached_trees = await process_files_for_changelog_async(item_data, download_url_list, local_list, client, workspace, hash_algorithms(version_json))
+        except booth.BoothDownloadError as e:
+            # 버전 파일을 갱신하지 않으므로 다음 주기에 다시 시도한다
+            logger.error(f'Download failed, retrying next cycle: {e}')
+            return
+
+        changelog_html_path, s3_upload, summary_result, diff_found, new_fbx_records = await run_blocking(
+            compute_changes, item_data, download_url_list, version_json, download_hashes, cached_trees, download_list_changed, workspace
+        )
+    finally:
+        await run_blocking(workspace.cleanup)
 
-        if old_name is not None:
-            if file_info['status'] == 2:
-                continue
-            elif file_name != old_name:
-                file_info['status'] = 0
-                file_info['line_str'] += f'{old_name} → {file_name}'
-            else:
-                file_info['line_str'] += f'{file_name} {symbol}'
+    if item_data["fbx_only"] and not diff_found:
+        logger.info('FBX contents unchanged. Skipping notification.')
+        await run_blocking(update_version_file, order_num, version_json, item_name_list, download_short_list, item_data["fbx_only"], new_fbx_records)
+        return
+
+    thumb = thumblist[0] if thumblist else THUMBNAIL_PLACEHOLDER
+
+    await run_blocking(update_version_file, order_num, version_json, item_name_list, download_short_list, item_data["fbx_only"], new_fbx_records)
+
+    # 업로드를 기다리는 동안 다른 아이템이 자리를 쓰도록 알림은 run_update_check_async가 semaphore 밖에서 보낸다
+    return notify_after_upload_async(s3_upload, functools.partial(
+        send_discord_notification_async, client, item_data, (product_name, product_url), thumb, local_list_name,
+        item_name_list, changelog_html_path, summary_result=summary_result
+    ))
+
+def item_budget():
+    """A new ArchiveBudget for one item, shared by its walks in the archive pool."""
+    budget = archive_budget.ArchiveBudget(**archive_limits)
+    if archive_pool is None or archive_traversal == 'extract':
+        return budget
+    return archive_pool.share(budget)
+
+def start_walks(item_data, download_url_list, download_hashes, cached_trees, workspace, algorithms=None, previous_root=None, budget=None):
+    """Submits an item's downloaded archives to the archive pool at once so they are walked in parallel.
+
+    Returns {download_number: pending walk}; empty when there is no pool or archives are extracted.
+    """
+    if archive_pool is None or archive_traversal == 'extract':
+        return {}
+    return {
+        download_number: archive_pool.submit(
+            workspace.download_path(filename), filename, item_data["encoding"], download_hashes.get(filename), algorithms,
+            previous_trees(previous_root, filename), item_data["file_filter"], budget,
+        )
+        for download_number, filename in download_url_list
+        if download_number not in cached_trees and archive_walker.archive_type(filename)
+    }
+
+def previous_trees(previous_root, filename):
+    """Earlier trees whose zip members a download can be matched against by size and CRC32.
+
+    That is the previous version of the same file, or every zip the item had when the
+    name is new (BOOTH downloads are usually renamed on each release).
+    """
+    if not previous_root:
+        return []
+    files = previous_root.get('files') or {}
+    if filename in files:
+        return [files[filename]]
+    return [node for name, node in files.items() if archive_walker.archive_type(name) == 1]
+
+def fbx_tree(version_json):
+    """The previous FBX records that have zip metadata, shaped like a version tree for previous_trees."""
+    root = {'files': {}}
+    zip_info = version_json.get('fbx-zip-info', {}) or {}
+    for path, file_hash in (version_json.get('fbx-files', {}) or {}).items():
+        if path not in zip_info:
+            continue
+        node = root
+        for part in path.split('/'):
+            node = node.setdefault('files', {}).setdefault(part, {})
+        node['hash'] = file_hash
+        node['size'], node['crc'] = zip_info[path]
+    return root
+
+def process_download(workspace, filename, version_json, encoding, fbx_records=None, filehash=None, pending=None, algorithms=None, previous=(), budget=None, truncated=None, file_filter=None):
+    """Records a file downloaded into workspace into version_json (or fbx_records) using the configured archive traversal.
+
+    "stream" hashes archive members straight from the archive; "extract" unpacks them under the workspace first.
+    ``pending`` is the file's walk already submitted to the archive pool.
+    ``algorithms`` are the hash algorithms to use (see hash_algorithms); fbx_records values are file nodes.
+    In "stream" mode, zip members matching ``previous`` (see previous_trees) are not decompressed.
+    Archives are read within ``budget``; the paths of those cut short are appended to ``truncated``.
+    Only files ``file_filter`` tracks are hashed and recorded (see path_filter.PathFilter).
+    Returns False if anything inside the download could not be read.
+    """
+    download_path = workspace.download_path(filename)
+    if archive_traversal == 'extract':
+        return process_file_tree(
+            workspace, download_path, filename, version_json, encoding, [], fbx_records=fbx_records,
+            filehash=filehash, algorithms=algorithms, budget=budget, truncated=truncated, file_filter=file_filter,
+        )
+
+    try:
+        if pending is not None:
+            node, complete = pending.result()
         else:
-            file_info['line_str'] += f'{file_name} {symbol}'
+            node, complete = archive_walker.walk_file(download_path, filename, encoding, filehash, algorithms, previous, file_filter, budget)
+    finally:
+        os.remove(download_path)
+    if node is None:
+        return False
+
+    if truncated is not None:
+        find_truncated(filename, node, [], truncated)
+    if fbx_records is None:
+        set_merkle(node)
+        apply_cached_tree(version_json, filename, node, [])
+    else:
+        collect_fbx(filename, node, [], fbx_records, file_filter or path_filter.PathFilter())
+    return complete
+
+def find_truncated(filename, node, current_path, truncated):
+    """Appends the paths of archives below node that the walker did not read completely."""
+    current_path.append(filename)
+    if node.get('truncated'):
+        truncated.append('/'.join(current_path))
+    for child_name, child_node in node.get('files', {}).items():
+        find_truncated(child_name, child_node, current_path, truncated)
+    current_path.pop()
+
+def node_at(version_json, parts):
+    """The node at the path ``parts`` of version_json, or None."""
+    node = version_json
+    for part in parts:
+        node = node.get('files', {}).get(part)
+        if node is None:
+            return None
+    return node
+
+def keep_unvisited(version_json, path):
+    """Keeps the previous nodes below a truncated archive as unchanged instead of letting mark_deleted remove them.
+
+    They were not read this time, so whether they still exist is unknown.
+    """
+    node = node_at(version_json, path.split('/'))
+    if node is not None:
+        _keep_unvisited(node)
+
+def _keep_unvisited(node):
+    for child in node.get('files', {}).values():
+        if 'mark_as' not in child:
+            child['mark_as'] = 0
+            child[UNCHANGED_SUBTREE] = True
+        elif not child.get(UNCHANGED_SUBTREE):
+            _keep_unvisited(child)
+
+def mark_deleted(root, saved_prehash):
+    """Marks the previous nodes this run did not record as deleted, collecting their hashes into saved_prehash.
+
+    Nodes recorded in this run carry 'mark_as'; subtrees kept as a whole are not entered.
+    """
+    for name, node in root.get('files', {}).items():
+        if 'mark_as' not in node:
+            element_mark(node, 2, name, saved_prehash)
+        elif not node.get(UNCHANGED_SUBTREE):
+            mark_deleted(node, saved_prehash)
 
-        path_list.append(file_info)
-        _generate_path_info_recursive(file_node, saved_prehash, path_list, current_level + 1)
+def charge_archive(budget, path, zip_type, encoding):
+    """Charges an archive's members to budget before it is extracted.
 
-def process_file_tree(input_path, filename, version_json, encoding, current_path, fbx_only=False, fbx_records=None):
+    Zips are charged from their central directory. A unitypackage has no index, so its
+    tar headers are read (decompressing it once) until it runs out of budget.
+    """
+    if zip_type == 1:
+        with zipfile.ZipFile(path, 'r', metadata_encoding=encoding) as zip_file:
+            infos = zip_file.infolist()
+        return budget.charge(sum(info.file_size for info in infos), len(infos))
+    if zip_type == 2:
+        # archive_walker처럼 tar 멤버마다 차감한다
+        with tarfile.open(path, mode='r|*') as package:
+            for info in package:
+                if not budget.charge(info.size):
+                    return False
+    return budget.check()
+
+def collect_fbx(filename, node, current_path, fbx_records, file_filter):
+    """Adds every file below node that file_filter tracks to fbx_records, keyed like process_file_tree does."""
+    current_path.append(filename)
+    pathstr = '/'.join(current_path)
+    if node['hash'] != archive_walker.DIRECTORY_HASH and file_filter.matches(pathstr):
+        fbx_records[pathstr] = node
+    for child_name, child_node in node.get('files', {}).items():
+        collect_fbx(child_name, child_node, current_path, fbx_records, file_filter)
+    current_path.pop()
+
+def process_file_tree(workspace, input_path, filename, version_json, encoding, current_path, fbx_records=None, filehash=None, algorithms=None, budget=None, truncated=None, depth=1, file_filter=None):
+    """Records input_path (and everything extracted from it) into version_json, or into fbx_records when given.
+
+    ``filehash`` lets the caller pass a hash it already computed, e.g. while downloading;
+    it is ignored when hashing with more than one algorithm.
+    Archives are charged to ``budget`` before they are extracted (see charge_archive). An archive
+    that does not fit, or is nested deeper than ``depth`` allows, is recorded without its
+    contents and its path appended to ``truncated``.
+    Files ``file_filter`` does not track are removed without being hashed, and archives that
+    cannot hold tracked files are not extracted. With an active filter, folders and untracked
+    archives are only recorded once something below them is.
+    Returns False if anything below input_path could not be extracted.
+    """
     current_path.append(filename)
     
     pathstr = '/'.join(current_path)
     
+    algorithms = tuple(algorithms or (hashing.ALGORITHM,))
     isdir = os.path.isdir(input_path)
-    filehash = ""
-    if not isdir:
-        filehash = calc_file_hash(input_path)
+    filtering = file_filter is not None and file_filter.active
+    tracked = not isdir and (not filtering or file_filter.matches(pathstr))
+    opens = isdir or is_compressed(input_path) > 0
+    if filtering and not tracked and len(current_path) > 1 and not (opens and file_filter.may_contain(pathstr)):
+        current_path.pop()
+        if isdir:
+            shutil.rmtree(input_path)
+        else:
+            os.remove(input_path)
+        return True
+
+    if isdir:
+        digests = ("DIRECTORY",)
+    elif filehash is not None and len(algorithms) == 1:
+        digests = (filehash,)
     else:
-        filehash = "DIRECTORY"
+        digests = calc_file_hash(input_path, algorithms)
         
-    process_path = f'./process/{pathstr}'
+    process_path = workspace.process_path(pathstr)
+    cut = False
     try:
-        zip_type = try_extract(input_path, filename, process_path, encoding)
+        zip_type = 0 if isdir else is_compressed(input_path)
+        if zip_type > 0 and budget is not None and (not budget.allows_depth(depth) or not charge_archive(budget, input_path, zip_type, encoding)):
+            cut = True
+        extract = not cut and (not filtering or file_filter.may_contain(pathstr))
+        zip_type = try_extract(workspace, input_path, process_path, encoding, extract=extract)
     except Exception as e:
         logger.error(f'error occured on extracting {filename}: {e}')
         logger.debug(traceback.format_exc())
         current_path.pop()
         end_file_process(0, process_path)
-        return
+        return False
     
-    if not fbx_only:
-        node = version_json
-        for part in current_path[:-1]:
-            node = node.setdefault('files', {}).setdefault(part, {})
-        parent_dict = node.setdefault('files', {})
-        file_node = parent_dict.get(filename)
-
-        if file_node is None:
-            parent_dict[filename] = {'hash': filehash, 'mark_as': 1}
-        else:
-            if file_node['hash'] == filehash:
-                file_node['mark_as'] = 0
-            else:
-                file_node['hash'] = filehash
-                file_node['mark_as'] = 3
-    else:
-        if not isdir and filename.lower().endswith('.fbx'):
-            if fbx_records is not None:
-                fbx_records[pathstr] = filehash
+    legacy_hash = digests[1] if len(digests) > 1 else None
+    # 필터가 있으면 폴더와 추적하지 않는 압축 파일은 하위 항목을 기록한 뒤에 기록한다
+    recorded = fbx_records is None and (not filtering or tracked or len(current_path) == 1)
+    if recorded:
+        record_node(version_json, current_path, digests[0], legacy_hash)
+    elif fbx_records is not None and tracked:
+        fbx_records[pathstr] = {'hash': digests[0], 'legacy-hash': legacy_hash} if legacy_hash else {'hash': digests[0]}
         
-    if zip_type > 0 or os.path.isdir(process_path):
+    complete = True
+    if (zip_type > 0 or os.path.isdir(process_path)) and not cut:
+        child_depth = depth + 1 if zip_type > 0 else depth
         for new_filename in os.listdir(process_path):
+            if budget is not None and not budget.check():
+                cut = True
+                break
             new_process_path = os.path.join(process_path, new_filename)
-            process_file_tree(new_process_path, new_filename, version_json, encoding, current_path, fbx_only=fbx_only, fbx_records=fbx_records)
+            if not process_file_tree(
+                workspace, new_process_path, new_filename, version_json, encoding, current_path, fbx_records=fbx_records,
+                algorithms=algorithms, budget=budget, truncated=truncated, depth=child_depth, file_filter=file_filter,
+            ):
+                complete = False
+
+    if cut:
+        logger.warning(f'stopped extracting {pathstr}: {budget.exceeded or f"archives nested deeper than {budget.max_depth}"}')
+        if truncated is not None:
+            truncated.append(pathstr)
+        complete = False
+
+    if fbx_records is None and not recorded and (cut or has_recorded_children(version_json, current_path)):
+        record_node(version_json, current_path, digests[0], legacy_hash)
 
     current_path.pop()
     end_file_process(zip_type, process_path)
-    
+    return complete
+
+def has_recorded_children(version_json, current_path):
+    """True if a node below current_path was recorded in this run."""
+    node = node_at(version_json, current_path)
+    if node is None:
+        return False
+    return any(child.get('mark_as') in (0, 1, 3) for child in node.get('files', {}).values())
+
+def record_node(version_json, current_path, filehash, legacy_hash=None, zip_info=None):
+    """Marks the node at current_path as added, changed or unchanged against the previous tree.
+
+    ``legacy_hash`` is the same file hashed with the previous tree's algorithm; when given it is
+    used for the comparison, and the node is rewritten with ``filehash`` either way.
+    ``zip_info`` is the zip member's (size, crc), kept on the node for the next walk.
+    """
+    filename = current_path[-1]
+    node = version_json
+    for part in current_path[:-1]:
+        node = node.setdefault('files', {}).setdefault(part, {})
+    parent_dict = node.setdefault('files', {})
+    # 하위 항목이 먼저 기록된 폴더는 해시 없이 만들어져 있다
+    file_node = parent_dict.setdefault(filename, {})
+
+    if 'hash' not in file_node:
+        file_node.update({'hash': filehash, 'mark_as': 1})
+    else:
+        file_node['mark_as'] = 0 if file_node['hash'] == (legacy_hash or filehash) else 3
+        file_node['hash'] = filehash
+    if legacy_hash is not None:
+        file_node['legacy-hash'] = legacy_hash
+    for key in archive_walker.ZIP_INFO_KEYS:
+        file_node.pop(key, None)
+    if zip_info is not None:
+        file_node['size'], file_node['crc'] = zip_info
+
+def apply_cached_tree(version_json, filename, cached_node, current_path):
+    """Replays a cached subtree through record_node as if it had just been extracted.
+
+    A subtree whose hash and Merkle hash (see set_merkle) equal the previous version's is
+    kept as a whole: only its root is marked and nothing below it is visited.
+    """
+    current_path.append(filename)
+    previous = node_at(version_json, current_path)
+    if previous is not None and same_subtree(previous, cached_node):
+        previous['mark_as'] = 0
+        previous[UNCHANGED_SUBTREE] = True
+        if 'file-count' in cached_node:
+            previous['file-count'] = cached_node['file-count']
+    else:
+        zip_info = (cached_node['size'], cached_node['crc']) if 'crc' in cached_node else None
+        record_node(version_json, current_path, cached_node['hash'], cached_node.get('legacy-hash'), zip_info)
+        for child_name, child_node in cached_node.get('files', {}).items():
+            apply_cached_tree(version_json, child_name, child_node, current_path)
+    current_path.pop()
+
+def same_subtree(previous, node):
+    """True if the not yet recorded previous node and node have the same hash and the same children."""
+    return (
+        'mark_as' not in previous and 'legacy-hash' not in node
+        and previous.get('merkle') is not None and previous.get('merkle') == node.get('merkle')
+        and previous['hash'] == node['hash']
+    )
+
+def set_merkle(node):
+    """Stores the Merkle hash and the file count of its children on node and on every folder or archive below it."""
+    files = node.get('files')
+    if not files:
+        node.pop('merkle', None)
+        node.pop('file-count', None)
+        return
+    for child in files.values():
+        set_merkle(child)
+    node['merkle'] = hashing.merkle(files)
+    node['file-count'] = diff_tree.count_files({'files': files})
+
+def snapshot_tree(node, unchanged=False):
+    """Copies a freshly processed subtree without marks or nodes left over from the previous version."""
+    snapshot = {'hash': node['hash']}
+    for key in archive_walker.ZIP_INFO_KEYS:
+        if key in node:
+            snapshot[key] = node[key]
+    # 통째로 유지한 하위 트리에는 표시가 없다
+    unchanged = unchanged or node.get(UNCHANGED_SUBTREE, False)
+    children = {
+        name: snapshot_tree(child, unchanged)
+        for name, child in node.get('files', {}).items()
+        if unchanged or child.get('mark_as') in (0, 1, 3)
+    }
+    if children:
+        snapshot['files'] = children
+        snapshot['merkle'] = hashing.merkle(children)
+        snapshot['file-count'] = diff_tree.count_files(snapshot)
+    return snapshot
         
 def end_file_process(zip_type, process_path):
-    if zip_type > 0:
+    # 한도에 걸리면 폴더 안에 처리하지 않은 파일이 남아 있을 수 있다
+    if zip_type > 0 or os.path.isdir(process_path):
         shutil.rmtree(process_path)
-    elif os.path.isdir(process_path):
-        os.rmdir(process_path)
     else:
         os.remove(process_path)
     
 # NOTE: Currently, @encoding only applies on zip_type == 1
-def try_extract(input_path, input_filename, output_path, encoding):
-    """Extracts a file if it's a zip or unitypackage, otherwise just moves it."""
-    zip_type = is_compressed(input_path)
+def try_extract(workspace, input_path, output_path, encoding, extract=True):
+    """Extracts a file if it's a zip or unitypackage, otherwise (or with ``extract`` False) just moves it.
+
+    Both paths are inside workspace, so moving is a rename on the same filesystem.
+    """
+    zip_type = is_compressed(input_path) if extract else 0
     
     if zip_type == 0:
-        shutil.move(input_path, output_path)
+        os.replace(input_path, output_path)
         return zip_type
 
-    # For compressed files, move to a temporary location for extraction
-    temp_output = f'./{input_filename}'
-    shutil.move(input_path, temp_output)
+    # 중첩 압축 파일은 자기 경로에 풀리므로 작업 폴더 안의 임시 경로로 옮겨 두고 푼다
+    temp_output = workspace.staging_path(os.path.basename(input_path))
+    os.replace(input_path, temp_output)
     os.makedirs(output_path, exist_ok=True)
 
     try:
@@ -585,6 +1270,7 @@ def try_extract(input_path, input_filename, output_path, encoding):
             with zipfile.ZipFile(temp_output, 'r', metadata_encoding=encoding) as zip_file:
                 zip_file.extractall(output_path)
         elif zip_type == 2:  # unitypackage
+            from unitypackage_extractor.extractor import extractPackage
             extractPackage(temp_output, outputPath=output_path)
     finally:
         os.remove(temp_output)
@@ -606,11 +1292,9 @@ def is_compressed(path):
     
     return 0
 
-def calc_file_hash(path):
-    with open(path, 'rb') as f:
-        data = f.read()
-        hash = hashlib.md5(data).hexdigest()
-    return hash
+def calc_file_hash(path, algorithms=None):
+    """Hex digests of the file, one per algorithm (the configured one by default)."""
+    return hashing.hash_file(path, algorithms or (hashing.ALGORITHM,))
 
 
 def element_mark(root, mark_as, current_filename, prehash_dict): 
@@ -629,7 +1313,11 @@ def element_mark(root, mark_as, current_filename, prehash_dict):
         element_mark(root['files'][file], mark_as, file, prehash_dict)
 
 def cleanup_version_json(files_root):
-    """Recursively removes 'mark_as' and deletes nodes marked for deletion."""
+    """Recursively removes 'mark_as' and deletes nodes marked for deletion.
+
+    Folders and archives get the Merkle hash and file count of their remaining children;
+    subtrees kept as a whole keep theirs and are not entered.
+    """
     keys_to_delete = []
     for key, node in files_root.items():
         if node.get('mark_as') == 2:
@@ -638,121 +1326,25 @@ def cleanup_version_json(files_root):
         
         if 'mark_as' in node:
             del node['mark_as']
+        node.pop('legacy-hash', None)
+        if node.pop(UNCHANGED_SUBTREE, False):
+            # 파일 수 없이 저장된 이전 버전의 노드에는 한 번 세어 둔다
+            if node.get('files') and 'file-count' not in node:
+                node['file-count'] = diff_tree.count_files(node)
+            continue
         
         if 'files' in node and node['files']:
             cleanup_version_json(node['files'])
+        if node.get('files'):
+            node['merkle'] = hashing.merkle(node['files'])
+            node['file-count'] = diff_tree.count_files({'files': node['files']})
+        else:
+            node.pop('merkle', None)
+            node.pop('file-count', None)
             
     for key in keys_to_delete:
         del files_root[key]
 
-def build_tree(paths):
-    tree = {}
-    path_stack = []
-    for item in paths:
-        line_str = item.get('line_str', '')
-        status = item.get('status', 0)
-
-        # 후행 공백만 제거하여 선행 공백을 보존
-        line_str = line_str.rstrip()
-
-        # 선행 공백의 수를 계산하여 들여쓰기 수준 결정
-        indent_match = re.match(r'^(\s*)(.*)', line_str)
-        if indent_match:
-            leading_spaces = indent_match.group(1)
-            indent = len(leading_spaces)
-            content = indent_match.group(2)
-        else:
-            indent = 0
-            content = line_str
-
-        # content에서 상태 문자열 제거
-        content = re.sub(r'\s*\(.*\)$', '', content)
-
-        # 깊이 계산 (들여쓰기 수준에 따라)
-        depth = indent // 4  # 공백 4칸당 한 레벨로 설정 (필요에 따라 조정)
-
-        # 현재 깊이에 맞게 경로 스택 조정
-        path_stack = path_stack[:depth]
-        path_stack.append(content)
-
-        # 트리 빌드
-        node = tree
-        for part in path_stack[:-1]:
-            node = node.setdefault(part, {})
-        # 현재 노드에 상태 정보 저장
-        current_node = node.setdefault(path_stack[-1], {})
-        current_node['_status'] = status
-    return tree
-
-def tree_to_html(tree):
-    html = '<ul>\n'  # 시작 태그에 줄바꿈 추가
-    for key, subtree in tree.items():
-        if key == '_status':
-            continue  # 상태 정보는 별도로 처리
-        status = subtree.get('_status', 0)
-
-        # 상태에 따른 컬러 지정
-        line_color = 'rgb(255, 255, 255)'  # 기본 색상 (흰색)
-        if status == 1:
-            line_color = 'rgb(125, 164, 68)'  # Added (녹색 계열)
-        elif status == 2:
-            line_color = 'rgb(252, 101, 89)'  # Deleted (빨간색 계열)
-        elif status == 3:
-            line_color = 'rgb(128, 161, 209)'  # Changed (파란색 계열)
-
-        # 상태 문자열 추가
-        status_str = ''
-        if status == 1:
-            status_str = ' (Added)'
-        elif status == 2:
-            status_str = ' (Deleted)'
-        elif status == 3:
-            status_str = ' (Changed)'
-
-        # '_status' 키를 제외한 나머지로 재귀 호출
-        child_subtree = {k: v for k, v in subtree.items() if k != '_status'}
-
-        if child_subtree:
-            # 자식이 있는 경우
-            html += f'<li><span style="color:{line_color}">{key}{status_str}</span>\n'
-            html += tree_to_html(child_subtree)
-            html += '</li>\n'
-        else:
-            # 자식이 없는 경우
-            html += f'<li><span style="color:{line_color}">{key}{status_str}</span></li>\n'
-    html += '</ul>\n'  # 마지막 태그에 줄바꿈 추가
-    return html
-
-def files_list(tree):
-    raw_data = ''
-
-    for key, subtree in tree.items():
-        if key == '_status':
-            continue  # 상태 정보는 별도로 처리
-        status = subtree.get('_status', 0)
-        # 자식 노드들 처리
-        child_subtree = {k: v for k, v in subtree.items() if k != '_status'}
-        child_data = files_list(child_subtree) if child_subtree else ''
-
-        if status != 0:
-            # 상태 문자열 결정
-            if status == 1:
-                status_str = ' (Added)'
-            elif status == 2:
-                status_str = ' (Deleted)'
-            elif status == 3:
-                status_str = ' (Changed)'
-            else:
-                status_str = ''
-
-            raw_data += f'{key}{status_str}\n'
-            raw_data += child_data
-        else:
-            # 현재 노드의 status가 0이면 출력 안 하고 자식 노드들만 처리
-            raw_data += child_data
-
-    return raw_data
-
 def send_error_message(discord_channel_id, discord_user_id):
     if DRY_RUN:
         logger.info('Dry run: Skipping Discord error notification.')
@@ -766,23 +1358,23 @@ def send_error_message(discord_channel_id, discord_user_id):
     }
 
     response = requests.post(api_url, json=data)
+    log_api_response('send_error_message', response.status_code, response.text)
 
-    if response.status_code == 200:
-        logger.info('send_error_message API 요청 성공')
-    else:
-        logger.error(f'send_error_message API 요청 실패: {response.text}')
-    return
+async def send_error_message_async(client, discord_channel_id, discord_user_id):
+    if DRY_RUN:
+        logger.info('Dry run: Skipping Discord error notification.')
+        return
 
-def recreate_folder(path):
-    """Deletes a folder and all its contents, then recreates it."""
-    if os.path.exists(path):
-        shutil.rmtree(path)
-    os.makedirs(path)
+    data = {
+        'channel_id': discord_channel_id,
+        'user_id': discord_user_id
+    }
+    log_api_response('send_error_message', *await client.post_json(f'{discord_api_url}/send_error_message', data))
 
-def run_update_check_safely(item):
+def run_update_check_safely(item, prefetched=None):
     thread_local.order_num = item[0]
     try:
-        init_update_check(item)
+        init_update_check(item, prefetched)
     except PermissionError:
         logger.error('PermissionError occured')
     except Exception as e:
@@ -791,6 +1383,32 @@ def run_update_check_safely(item):
         if hasattr(thread_local, 'order_num'):
             del thread_local.order_num
 
+async def run_update_check_async(item, client, semaphore, prefetched=None):
+    notification = None
+    async with semaphore:
+        # gather()가 태스크마다 컨텍스트를 복사하므로 다른 주문의 로그 컨텍스트와 섞이지 않는다
+        order_context.set(item[0])
+        try:
+            notification = await init_update_check_async(item, client, prefetched)
+        except PermissionError:
+            logger.error('PermissionError occured')
+        except Exception as e:
+            logger.exception('An unexpected error occurred while checking item.')
+    if notification is not None:
+        await notification
+
+async def run_blocking(func, *args):
+    """Runs blocking or CPU-heavy work on the loop's executor, keeping the caller's log context."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, func, *args))
+
+async def run_async_cycle(booth_items, executor, prefetched=None):
+    """Checks every item as a coroutine; at most ``concurrency`` items are in progress at once."""
+    asyncio.get_running_loop().set_default_executor(executor)
+    async with async_engine.AsyncBoothClient(governor=governor, **async_client_options) as client:
+        semaphore = asyncio.Semaphore(async_client_options['concurrency'])
+        await asyncio.gather(*(run_update_check_async(item, client, semaphore, prefetched) for item in booth_items))
+
 def strftime_now():
     return datetime.now().strftime('%Y%m%d-%H%M%S')
 
@@ -813,6 +1431,8 @@ if __name__ == "__main__":
     discord_api_url = config_json['discord_api_url']
     gemini_api_key = config_json.get('gemini_api_key')
     if gemini_api_key:
+        import llm_summary
+
         summary = llm_summary.google_gemini_api(gemini_api_key)
     else:
         summary = None
@@ -821,37 +1441,165 @@ if __name__ == "__main__":
     refresh_interval = int(config_json['refresh_interval'])
     
     DRY_RUN = config_json.get('dry_run', False)
+    library_crawl = bool(config_json.get('library_crawl', False))
+    library_max_pages = int(config_json.get('library_max_pages', booth.LIBRARY_MAX_PAGES))
+    booth.set_parser_backend(config_json.get('html_parser', booth.PARSER_BACKEND))
+    logger.info(f"Using {booth.PARSER_BACKEND} to parse BOOTH pages.")
     logger.info(f"Dry run is {'enabled' if DRY_RUN else 'disabled'}.")
 
     # Calculate default workers based on CPU count
-    # https://booth.pm/announcements/863 공지로 인한 수정
-    # cpu_cores = os.cpu_count()
-    # default_workers = (cpu_cores + 4) if cpu_cores is not None else 8
-    default_workers = 2
+    # https://booth.pm/announcements/863 공지에 따른 요청 제한은 워커 수가 아니라 RateGovernor가 담당
+    cpu_cores = os.cpu_count()
+    default_workers = min(32, cpu_cores + 4) if cpu_cores is not None else 8
     max_workers = int(config_json.get('max_workers', default_workers))
     logger.info(f"Using {max_workers} worker threads for parallel processing.")
+
+    rate_limit_config = config_json.get('booth_rate_limit', {})
+    governor = rate_limit.RateGovernor(
+        requests_per_second=float(rate_limit_config.get('requests_per_second', 1.0)),
+        max_in_flight=int(rate_limit_config.get('max_in_flight', 2)),
+        slow_response=float(rate_limit_config.get('slow_response', 5.0)),
+    )
+    logger.info(f"BOOTH requests limited to {governor.max_rate} req/s, {governor.max_in_flight} in flight.")
+
+    download_config = config_json.get('download', {})
+    download_retries = int(download_config.get('retries', booth.DOWNLOAD_RETRIES))
+    download_backoff = float(download_config.get('backoff_factor', booth.DOWNLOAD_BACKOFF))
+
+    http_config = config_json.get('http', {})
+    booth_session = http_session.init_session(
+        pool_size=max_workers,
+        timeout=http_config.get('timeout', http_session.DEFAULT_TIMEOUT),
+        retries=int(http_config.get('retries', http_session.DEFAULT_RETRIES)),
+        backoff_factor=float(http_config.get('backoff_factor', http_session.DEFAULT_BACKOFF)),
+        governor=governor,
+    )
+
+    engine = config_json.get('engine', 'thread')
+    if engine == 'async':
+        import async_engine
+
+        async_config = config_json.get('async', {})
+        http_timeout = http_config.get('timeout', http_session.DEFAULT_TIMEOUT)
+        async_client_options = {
+            'concurrency': int(async_config.get('concurrency', 64)),
+            'connections_per_host': int(async_config.get('connections_per_host', 8)),
+            # (connect, read) 형식이면 read 타임아웃만 사용
+            'timeout': float(http_timeout[-1] if isinstance(http_timeout, (list, tuple)) else http_timeout),
+            'retries': int(http_config.get('retries', http_session.DEFAULT_RETRIES)),
+            'backoff_factor': float(http_config.get('backoff_factor', http_session.DEFAULT_BACKOFF)),
+        }
+        logger.info(f"Using asyncio engine with {async_client_options['concurrency']} concurrent items.")
     
-    s3_uploader = None
+    upload_queue = None
     s3 = config_json.get('s3')
     if s3:
+        upload_workers = int(s3.get('upload_workers', upload_queue_module.DEFAULT_WORKERS))
         try:
-            s3_uploader = cloudflare.S3Uploader(s3['endpoint_url'], s3['access_key_id'], s3['secret_access_key'])
+            import cloudflare
+
+            s3_uploader = cloudflare.S3Uploader(
+                s3['endpoint_url'], s3['access_key_id'], s3['secret_access_key'], max_connections=upload_workers
+            )
+            upload_queue = upload_queue_module.UploadQueue(
+                s3_uploader, s3['bucket_name'],
+                workers=upload_workers,
+                retries=int(s3.get('upload_retries', upload_queue_module.DEFAULT_RETRIES)),
+            )
         except Exception as e:
             logger.error(f"Failed to initialize S3 uploader: {e}")
     else:
         s3 = None
 
+    changelog_config = config_json.get('changelog', {})
+    changelog_compact = bool(changelog_config.get('compact', False))
+    changelog_node_budget = int(changelog_config.get('node_budget', 0)) or None
+    changelog_encoding = changelog_config.get('precompress')
+    changelog_keep_local = bool(changelog_config.get('keep_local', True))
+    if changelog_encoding not in (None, *CHANGELOG_ENCODINGS):
+        raise ValueError(f"changelog.precompress must be one of {', '.join(CHANGELOG_ENCODINGS)}, got {changelog_encoding!r}")
+    if changelog_encoding == 'br' and brotli is None:
+        logger.warning("brotli is not installed; precompressing changelogs with gzip instead.")
+        changelog_encoding = 'gzip'
+
     createFolder("./version")
     createFolder("./version/db")
     createFolder("./version/json")
     createFolder("./archive")
     createFolder("./changelog")
-    createFolder("./download")
-    createFolder("./process")
+
+    scratch_config = config_json.get('scratch', {})
+    scratch = workspace_module.ScratchSpace(
+        scratch_config.get('path', './scratch'),
+        size_limit=int(scratch_config['size_limit_mb']) * 1024 * 1024 if scratch_config.get('size_limit_mb') else None,
+        overflow_path=scratch_config.get('overflow_path', './scratch'),
+    )
+    # 이전 실행에서 남은 작업 폴더는 시작할 때 한 번만 지운다
+    scratch.clear()
+    # extractPackage의 임시 폴더도 같은 파일시스템에 두어 작업 폴더로 옮길 때 복사하지 않게 한다
+    tempfile.tempdir = scratch.temp_dir
+    logger.info(f"Scratch space: {scratch.path}")
+
+    product_cache_config = config_json.get('product_cache', {})
+    author_cache = product_cache.ProductCache(
+        './version/db/product_cache.sqlite3',
+        ttl=int(product_cache_config.get('ttl', 86400)),
+        max_entries=int(product_cache_config.get('max_entries', 2000)),
+    )
+
+    tree_cache = None
+    tree_cache_config = config_json.get('tree_cache', {})
+    if tree_cache_config.get('enabled', True):
+        tree_cache = tree_cache_module.TreeCache(
+            './version/db/tree_cache.sqlite3',
+            max_entries=int(tree_cache_config.get('max_entries', 5000)),
+        )
+
+    archive_traversal = config_json.get('archive_traversal', 'stream')
+    logger.info(f"Archive traversal mode: {archive_traversal}")
+
+    archive_budget_config = config_json.get('archive_budget', {})
+    archive_limits = {
+        'max_bytes': int(archive_budget_config['max_mb']) * 1024 * 1024 if archive_budget_config.get('max_mb') else None,
+        'max_entries': int(archive_budget_config['max_entries']) if archive_budget_config.get('max_entries') else None,
+        'max_depth': int(archive_budget_config['max_depth']) if archive_budget_config.get('max_depth') else None,
+        'max_seconds': float(archive_budget_config['max_seconds']) if archive_budget_config.get('max_seconds') else None,
+    }
+
+    hashing.set_algorithm(config_json.get('hash_algorithm', hashing.LEGACY_ALGORITHM))
+    logger.info(f"Hashing files with {hashing.ALGORITHM}.")
+
+    archive_pool = None
+    archive_pool_config = config_json.get('archive_pool', {})
+    if archive_pool_config.get('enabled', False) and archive_traversal != 'extract':
+        archive_pool = archive_pool_module.ArchivePool(
+            workers=int(archive_pool_config['workers']) if archive_pool_config.get('workers') else None,
+            worker_memory=int(archive_pool_config.get('worker_memory_mb', 1024)) * 1024 * 1024,
+            max_tasks_per_child=int(archive_pool_config.get('max_tasks_per_child', archive_pool_module.DEFAULT_MAX_TASKS_PER_CHILD)),
+        )
+        logger.info(f"Walking archives in {archive_pool.workers} worker processes.")
+
+    order_index = None
+    if config_json.get('version_index', True):
+        order_index = version_index.VersionIndex('./version/db/version_index.sqlite3')
 
     postgres_config = dict(config_json['postgres'])
     booth_db = booth_sql.BoothPostgres(postgres_config)
 
+    version_json_store = version_store_module.JsonVersionStore('./version/json')
+    if config_json.get('version_store', 'json') == 'postgres':
+        version_store = version_store_module.PostgresVersionStore(postgres_config)
+        # 처음 한 번은 기존 버전 파일을 옮겨 오고, 이후에는 아직 없는 주문만 가져온다
+        if DRY_RUN:
+            logger.info("Dry run: Skipping import of version files into PostgreSQL.")
+        else:
+            imported = version_store.import_json(version_json_store)
+            if imported:
+                logger.info(f"Imported {imported} version files into PostgreSQL.")
+        logger.info("Storing versions in PostgreSQL.")
+    else:
+        version_store = version_json_store
+
     if not DRY_RUN:
         # booth_discord 컨테이너 시작 대기
         logger.info("Waiting for booth_discord container to start...")
@@ -871,29 +1619,52 @@ if __name__ == "__main__":
     else:
         logger.info("Dry run enabled, skipping booth_discord container check.")
 
-    while True:
-        logger.info("BoothChecker cycle started")
+    logger.info(
+        f"Startup: imports took {IMPORTED_AT - STARTED_AT:.2f}s, "
+        f"ready for the first cycle after {perf_counter() - STARTED_AT:.2f}s"
+    )
 
-        # BOOTH Heartbeat check once per cycle
-        try:
-            logger.info('Checking BOOTH heartbeat')
-            requests.get("https://booth.pm", timeout=10)
-        except requests.RequestException as e:
-            logger.error(f'BOOTH heartbeat failed: {e}. Skipping this cycle.')
-            sleep(refresh_interval)
-            continue
+    try:
+        while True:
+            logger.info("BoothChecker cycle started")
 
-        # Recreate temporary folders
-        recreate_folder("./download")
-        recreate_folder("./process")
+            # BOOTH Heartbeat check once per cycle
+            try:
+                logger.info('Checking BOOTH heartbeat')
+                booth_session.get("https://booth.pm", timeout=10)
+            except requests.RequestException as e:
+                logger.error(f'BOOTH heartbeat failed: {e}. Skipping this cycle.')
+                sleep(refresh_interval)
+                continue
 
-        booth_items = booth_db.get_booth_items()
-        logger.info(f"Found {len(booth_items)} items to check.")
+            booth_items = booth_db.get_booth_items()
+            logger.info(f"Found {len(booth_items)} items to check.")
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            executor.map(run_update_check_safely, booth_items)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                prefetched = prefetch_library_data(booth_items, executor) if library_crawl else None
+                if engine == 'async':
+                    asyncio.run(run_async_cycle(booth_items, executor, prefetched))
+                else:
+                    executor.map(lambda item: run_update_check_safely(item, prefetched), booth_items)
             
-        # 갱신 대기
-        logger.info("BoothChecker cycle finished")
-        logger.info(f"Next check will be at {datetime.now() + timedelta(seconds=refresh_interval)}")
-        sleep(refresh_interval)
+            session_stats = booth_session.stats()
+            logger.info(
+                f"HTTP connections: {session_stats['connections_opened']} opened, "
+                f"{session_stats['connections_reused']} reused ({session_stats['requests']} requests)"
+            )
+            logger.info(f"BOOTH request rate at end of cycle: {governor.stats()['rate']:.2f} req/s")
+            download_stats = booth.pop_download_stats()
+            logger.info(
+                f"Downloads: {download_stats['bytes_downloaded']} bytes transferred, "
+                f"{download_stats['bytes_resumed']} bytes resumed in {download_stats['resumed']} transfers, "
+                f"{download_stats['rejected']} rejected"
+            )
+
+            # 갱신 대기
+            logger.info("BoothChecker cycle finished")
+            logger.info(f"Next check will be at {datetime.now() + timedelta(seconds=refresh_interval)}")
+            sleep(refresh_interval)
+    finally:
+        # 대기 중인 changelog 업로드를 마치고 종료한다
+        if upload_queue:
+            upload_queue.close(wait=True)
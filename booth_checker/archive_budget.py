@@ -0,0 +1,42 @@
+import time
+
+
+class ArchiveBudget:
+    """Limits on the archive content processed for one item; None means unlimited.
+
+    ``max_bytes`` counts decompressed bytes, ``max_entries`` archive members, ``max_depth``
+    how deeply archives may be nested (the downloaded file is depth 1) and ``max_seconds``
+    the wall time since the budget was created. Once bytes, entries or time run out the
+    budget stays exceeded; ``exceeded`` then names the limit that was hit.
+    """
+
+    def __init__(self, max_bytes=None, max_entries=None, max_depth=None, max_seconds=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_depth = max_depth
+        self.max_seconds = max_seconds
+        # 워커 프로세스로 복사되어도 같은 기준을 쓰도록 time.time()으로 기록한다
+        self.deadline = time.time() + max_seconds if max_seconds is not None else None
+        self.bytes = 0
+        self.entries = 0
+        self.exceeded = None
+
+    def charge(self, size=0, entries=1):
+        """Counts ``entries`` members holding ``size`` decompressed bytes; False if that runs over a budget."""
+        self.bytes += size
+        self.entries += entries
+        return self.check()
+
+    def check(self):
+        """False once bytes, entries or wall time have run out."""
+        if self.exceeded is None:
+            if self.max_bytes is not None and self.bytes > self.max_bytes:
+                self.exceeded = f'more than {self.max_bytes} bytes'
+            elif self.max_entries is not None and self.entries > self.max_entries:
+                self.exceeded = f'more than {self.max_entries} entries'
+            elif self.deadline is not None and time.time() > self.deadline:
+                self.exceeded = f'more than {self.max_seconds} seconds'
+        return self.exceeded is None
+
+    def allows_depth(self, depth):
+        return self.max_depth is None or depth <= self.max_depth
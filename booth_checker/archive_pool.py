@@ -0,0 +1,306 @@
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import archive_budget
+import archive_walker
+import hashing
+
+
+logger = logging.getLogger('BoothChecker')
+
+DEFAULT_WORKER_MEMORY = 1024 * 1024 * 1024
+DEFAULT_MAX_TASKS_PER_CHILD = 20
+# 동시에 처리하는 아이템 수보다 넉넉하게 둔다
+BUDGET_SLOTS = 64
+
+
+class ArchiveWorkerError(Exception):
+    """An archive worker died while walking a file on its own."""
+    pass
+
+
+def _read_first_line(path):
+    with open(path) as f:
+        return f.readline().strip()
+
+
+def cgroup_cpu_limit():
+    """CPUs this process may use: affinity mask capped by the cgroup v2 cpu.max or v1 CFS quota."""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        value, period = _read_first_line('/sys/fs/cgroup/cpu.max').split()
+        if value != 'max':
+            quota = int(value) / int(period)
+    except (OSError, ValueError):
+        try:
+            value = int(_read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'))
+            period = int(_read_first_line('/sys/fs/cgroup/cpu/cpu.cfs_period_us'))
+            if value > 0:
+                quota = value / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def cgroup_memory_limit():
+    """Memory limit of the cgroup in bytes, or physical memory when unlimited or unknown."""
+    physical = None
+    try:
+        physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        pass
+
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            value = _read_first_line(path)
+        except OSError:
+            continue
+        if value == 'max':
+            break
+        try:
+            limit = int(value)
+        except ValueError:
+            continue
+        # cgroup v1은 제한이 없으면 매우 큰 값을 돌려준다
+        if physical is None or limit < physical:
+            return limit
+        break
+    return physical
+
+
+def default_workers(worker_memory=DEFAULT_WORKER_MEMORY):
+    """One worker per available CPU, as long as each gets ``worker_memory`` with one share left for the checker."""
+    workers = cgroup_cpu_limit()
+    memory = cgroup_memory_limit()
+    if memory is not None:
+        workers = min(workers, memory // worker_memory - 1)
+    return max(1, workers)
+
+
+def _limit_memory(limit):
+    if not limit:
+        return
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f'Could not limit archive worker memory: {e}')
+
+
+# 워커 프로세스가 시작한 작업의 번호를 보내는 파이프
+# 잠금 없이 쓰므로 워커가 쓰는 도중 종료되어도 다른 워커가 멈추지 않는다 (작은 메시지는 한 번에 쓰인다)
+_started = None
+# 아이템마다 한 슬롯씩 쓰는 (bytes, entries) 공유 카운터
+_counters = None
+
+
+def _init_worker(limit, started, counters):
+    global _started, _counters
+    _started = started
+    _counters = counters
+    _limit_memory(limit)
+
+
+class SharedBudget(archive_budget.ArchiveBudget):
+    """An ArchiveBudget whose byte and entry counts live in the pool's shared memory.
+
+    Every walk of an item charges the same counters, whichever worker it runs in.
+    """
+
+    def __init__(self, budget, counters, slot):
+        self.max_bytes = budget.max_bytes
+        self.max_entries = budget.max_entries
+        self.max_depth = budget.max_depth
+        self.max_seconds = budget.max_seconds
+        self.deadline = budget.deadline
+        self.exceeded = budget.exceeded
+        self.counters = counters
+        self.slot = slot
+        with counters.get_lock():
+            counters[2 * slot] = budget.bytes
+            counters[2 * slot + 1] = budget.entries
+
+    @property
+    def bytes(self):
+        return self.counters[2 * self.slot]
+
+    @property
+    def entries(self):
+        return self.counters[2 * self.slot + 1]
+
+    def charge(self, size=0, entries=1):
+        with self.counters.get_lock():
+            self.counters[2 * self.slot] += size
+            self.counters[2 * self.slot + 1] += entries
+        return self.check()
+
+    def __getstate__(self):
+        # 공유 배열은 워커를 만들 때 넘겨 두었으므로 슬롯 번호만 보낸다
+        state = self.__dict__.copy()
+        del state['counters']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.counters = _counters
+
+
+def _run(task_id, function, *args):
+    if _started is not None:
+        _started.send(task_id)
+    return function(*args)
+
+
+class ArchivePool:
+    """Walks downloaded archives (archive_walker.walk_file) on other cores.
+
+    Each worker is capped at ``worker_memory`` bytes of address space and replaced after
+    ``max_tasks_per_child`` files. If a worker dies, the pool is rebuilt: files that were
+    still queued are resubmitted, and files a worker had started are retried one at a time
+    in a worker of their own, so a crash or memory spike only fails the file that caused it.
+    """
+
+    def __init__(self, workers=None, worker_memory=DEFAULT_WORKER_MEMORY, max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD):
+        self.worker_memory = worker_memory
+        self.workers = workers or default_workers(worker_memory)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.restarts = 0
+        self.lock = threading.Lock()
+        # 의심 파일은 하나씩만 따로 다시 돌려 메모리 사용량이 워커 하나만큼만 늘게 한다
+        self.isolation_lock = threading.Lock()
+        # fork는 스레드가 도는 프로세스에서 안전하지 않고 max_tasks_per_child와 함께 쓸 수 없다
+        self.context = multiprocessing.get_context('forkserver')
+        self.context.set_forkserver_preload(['archive_walker'])
+        self.started_reader, self.started_writer = self.context.Pipe(duplex=False)
+        self.started = set()
+        self.task_ids = itertools.count()
+        self.counters = self.context.Array('q', 2 * BUDGET_SLOTS)
+        self.free_slots = list(range(BUDGET_SLOTS))
+        self.executor = self._create()
+
+    def _create(self, workers=None, track=True):
+        return ProcessPoolExecutor(
+            max_workers=workers or self.workers,
+            mp_context=self.context,
+            initializer=_init_worker,
+            initargs=(self.worker_memory, self.started_writer if track else None, self.counters),
+            max_tasks_per_child=self.max_tasks_per_child,
+        )
+
+    def _drain(self):
+        while self.started_reader.poll():
+            self.started.add(self.started_reader.recv())
+
+    def _was_started(self, task_id):
+        """Whether a worker picked up the task; the pipe is drained so it never fills up."""
+        with self.lock:
+            self._drain()
+            return task_id in self.started
+
+    def _finished(self, task_id):
+        with self.lock:
+            self._drain()
+            self.started.discard(task_id)
+
+    def _restart(self, broken):
+        with self.lock:
+            if self.executor is not broken:
+                return
+            logger.error('An archive worker died; restarting the archive pool.')
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._create()
+            self.restarts += 1
+
+    def share(self, budget):
+        """A SharedBudget with the limits and usage of ``budget`` for all walks of one item.
+
+        Its slot is freed once the returned budget is garbage collected. When every slot is
+        taken, ``budget`` itself is returned and each walk counts bytes and entries alone.
+        """
+        with self.lock:
+            if not self.free_slots:
+                logger.warning('No shared archive budget slot left; limits apply per file.')
+                return budget
+            slot = self.free_slots.pop()
+        shared = SharedBudget(budget, self.counters, slot)
+        weakref.finalize(shared, self._free_slot, slot)
+        return shared
+
+    def _free_slot(self, slot):
+        with self.lock:
+            self.free_slots.append(slot)
+
+    def submit(self, path, name, encoding, filehash=None, algorithms=None, previous=(), file_filter=None, budget=None):
+        """Starts walking ``path``; call result() on the returned object for (node, complete).
+
+        The worker gets a copy of ``budget``: its deadline still applies, and bytes and entries
+        are counted together with the other walks only if it is a SharedBudget (see share).
+        """
+        # 워커 프로세스에는 설정된 알고리즘이 없으므로 항상 명시해서 넘긴다
+        return _PendingWalk(self, archive_walker.walk_file, (path, name, encoding, filehash, tuple(algorithms or (hashing.ALGORITHM,)), previous, file_filter, budget))
+
+    def walk(self, path, name, encoding, filehash=None, algorithms=None, previous=(), file_filter=None, budget=None):
+        return self.submit(path, name, encoding, filehash, algorithms, previous, file_filter, budget).result()
+
+    def shutdown(self):
+        with self.lock:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _PendingWalk:
+    def __init__(self, pool, function, args):
+        self.pool = pool
+        self.function = function
+        self.args = args
+        self.executor, self.future = self._submit()
+
+    def _submit(self):
+        while True:
+            with self.pool.lock:
+                executor = self.pool.executor
+            self.task_id = next(self.pool.task_ids)
+            try:
+                return executor, executor.submit(_run, self.task_id, self.function, *self.args)
+            except BrokenProcessPool:
+                self.pool._restart(executor)
+
+    def result(self):
+        while True:
+            task_id = self.task_id
+            try:
+                return self.future.result()
+            except BrokenProcessPool:
+                self.pool._restart(self.executor)
+                if self.pool._was_started(task_id):
+                    return self._isolated()
+                # 아직 시작하지 않은 파일은 다른 파일 때문에 실패했으므로 재시도로 치지 않고 새 풀에 다시 넣는다
+                self.executor, self.future = self._submit()
+            finally:
+                self.pool._finished(task_id)
+
+    def _isolated(self):
+        """Retries a file that was being walked when its pool broke in a worker of its own."""
+        logger.warning(f'retrying {self.args[1]} alone after an archive worker died')
+        with self.pool.isolation_lock:
+            executor = self.pool._create(workers=1, track=False)
+            try:
+                return executor.submit(_run, self.task_id, self.function, *self.args).result()
+            except BrokenProcessPool as e:
+                raise ArchiveWorkerError(f'archive worker died while walking {self.args[1]}') from e
+            finally:
+                executor.shutdown(wait=True)
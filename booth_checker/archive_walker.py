@@ -0,0 +1,410 @@
+import logging
+import ntpath
+import os
+import tarfile
+import tempfile
+import zipfile
+
+import archive_budget
+import hashing
+import path_filter
+
+
+logger = logging.getLogger('BoothChecker')
+
+DIRECTORY_HASH = 'DIRECTORY'
+# 중첩 압축 파일은 이 크기까지 메모리에 두고, 넘으면 임시 파일로 넘긴다
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+# zip, gzip, bzip2, xz
+ARCHIVE_MAGIC = (b'PK', b'\x1f\x8b', b'BZh', b'\xfd7zXZ')
+# zip 멤버 노드에 central directory의 크기와 CRC32를 함께 기록한다
+ZIP_INFO_KEYS = ('size', 'crc')
+
+
+def archive_type(name):
+    """Same rule as is_compressed(): 0 normal, 1 zip, 2 unitypackage."""
+    if name.endswith('.zip'):
+        return 1
+    elif name.endswith('.unitypackage'):
+        return 2
+    return 0
+
+
+def walk_file(path, name, encoding, filehash=None, algorithms=None, previous=(), file_filter=None, budget=None):
+    """Hashes the file at ``path`` and, for archives, everything inside it without extracting to disk.
+
+    ``algorithms`` defaults to the configured one; a second algorithm is stored as
+    'legacy-hash' on every file node. ``filehash`` is only reused for a single algorithm.
+
+    Zip members get the 'size' and 'crc' of their central directory entry. ``previous``
+    lists earlier trees of this file; a member whose path, size and CRC32 match one of
+    them reuses its hash (and subtree) without being decompressed.
+
+    Members that ``file_filter`` (a PathFilter) does not track are neither decompressed nor
+    hashed, and nested archives are only opened if they may contain tracked files. With an
+    active filter, folders and untracked archives only appear as parents of tracked files.
+
+    Members are charged to ``budget`` (an ArchiveBudget) by their declared size before they
+    are read. An archive that runs out of budget, or is nested deeper than it allows, keeps
+    the members read so far and gets 'truncated': True.
+
+    Returns (node, complete). node has the version-tree shape ({'hash', 'files'}) and is
+    None when ``path`` is an archive that could not be read; complete is False if any
+    archive below it could not be read.
+    """
+    algorithms = tuple(algorithms or (hashing.ALGORITHM,))
+    if filehash is not None and len(algorithms) == 1:
+        digests = (filehash,)
+    else:
+        digests = hashing.hash_file(path, algorithms)
+    # 이전 해시를 재사용하면 두 번째 알고리즘의 해시를 만들 수 없다
+    if len(algorithms) > 1:
+        previous = ()
+    if budget is None:
+        budget = archive_budget.ArchiveBudget()
+    if file_filter is None:
+        file_filter = path_filter.PathFilter()
+    with open(path, 'rb') as f:
+        return _archive_node(f, name, name, encoding, algorithms, digests, previous, file_filter, budget, 1)
+
+
+def _file_node(digests):
+    node = {'hash': digests[0]}
+    if len(digests) > 1:
+        node['legacy-hash'] = digests[1]
+    return node
+
+
+def _archive_node(f, name, path, encoding, algorithms, digests, previous, file_filter, budget, depth):
+    node = _file_node(digests)
+    kind = archive_type(name)
+    if kind == 0 or not file_filter.may_contain(path):
+        return node, True
+    if not budget.allows_depth(depth):
+        logger.warning(f'not opening {name}: archives nested deeper than {budget.max_depth}')
+        node['truncated'] = True
+        return node, False
+
+    try:
+        if kind == 1:
+            children, complete, truncated = _zip_children(f, path, encoding, algorithms, previous, file_filter, budget, depth)
+        else:
+            children, complete, truncated = _unitypackage_children(f, path, encoding, algorithms, file_filter, budget, depth)
+    except Exception as e:
+        logger.error(f'error occured on extracting {name}: {e}')
+        return None, False
+
+    if children:
+        node['files'] = children
+    if truncated:
+        logger.warning(f'stopped reading {name}: {budget.exceeded}')
+        node['truncated'] = True
+    return node, complete and not truncated
+
+
+def _parent(children, parts):
+    """Returns the children dict that holds ``parts``, creating parent directories like ZipFile.extractall does."""
+    for part in parts[:-1]:
+        child = children.get(part)
+        if child is None:
+            child = children[part] = {'hash': DIRECTORY_HASH}
+        elif child['hash'] != DIRECTORY_HASH:
+            raise NotADirectoryError('/'.join(parts))
+        children = child.setdefault('files', {})
+    return children
+
+
+def _insert(children, parts, node):
+    children = _parent(children, parts)
+    existing = children.get(parts[-1])
+    if existing is not None and (existing['hash'] == DIRECTORY_HASH) != (node['hash'] == DIRECTORY_HASH):
+        raise FileExistsError('/'.join(parts))
+    if existing is None or node['hash'] != DIRECTORY_HASH:
+        children[parts[-1]] = node
+
+
+def _previous_nodes(previous, parts):
+    """Nodes found at ``parts`` in each of the previous trees."""
+    found = []
+    for tree in previous:
+        node = tree
+        for part in parts:
+            node = node.get('files', {}).get(part)
+            if node is None:
+                break
+        else:
+            found.append(node)
+    return found
+
+
+def _reusable(candidates, info):
+    for node in candidates:
+        if node.get('hash') != DIRECTORY_HASH and node.get('size') == info.file_size and node.get('crc') == info.CRC:
+            return _copy_node(node)
+    return None
+
+
+def _copy_node(node):
+    """Copies a previous node without marks or other per-run keys."""
+    copy = {'hash': node['hash']}
+    for key in ZIP_INFO_KEYS:
+        if key in node:
+            copy[key] = node[key]
+    if node.get('files'):
+        copy['files'] = {name: _copy_node(child) for name, child in node['files'].items()}
+    return copy
+
+
+def _kept(node, tracked):
+    """Whether a walked member goes into the tree: tracked, or an archive holding tracked (or unread) files."""
+    return tracked or bool(node.get('files')) or bool(node.get('truncated'))
+
+
+def _zip_children(f, path, encoding, algorithms, previous, file_filter, budget, depth):
+    children = {}
+    complete = True
+    truncated = False
+    reused = 0
+    filtering = file_filter.active
+    with zipfile.ZipFile(f, 'r', metadata_encoding=encoding) as zip_file:
+        for info in zip_file.infolist():
+            if not budget.check():
+                truncated = True
+                break
+
+            # extractall과 같이 빈 경로, '.', '..'는 버린다
+            parts = [part for part in info.filename.split('/') if part not in ('', os.path.curdir, os.path.pardir)]
+            if not parts:
+                if info.is_dir():
+                    continue
+                raise IsADirectoryError(info.filename)
+
+            if info.is_dir():
+                if not filtering:
+                    _insert(children, parts, {'hash': DIRECTORY_HASH})
+                continue
+
+            # 추적하지 않는 파일과 추적할 파일이 없는 압축 파일은 압축을 풀지 않는다
+            member_path = f'{path}/{"/".join(parts)}'
+            is_archive = archive_type(parts[-1])
+            tracked = not filtering or file_filter.matches(member_path)
+            if not tracked and not (is_archive and file_filter.may_contain(member_path)):
+                continue
+
+            candidates = _previous_nodes(previous, parts) if previous else []
+            node = _reusable(candidates, info)
+            if node is not None:
+                reused += 1
+                _insert(children, parts, node)
+                continue
+
+            # ZipExtFile은 file_size보다 많이 풀지 않으므로 읽기 전에 선언된 크기로 차감한다
+            if not budget.charge(info.file_size):
+                truncated = True
+                break
+
+            with zip_file.open(info) as member:
+                if is_archive:
+                    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+                        digests = hashing.hash_stream(member, algorithms, copy_to=spool)
+                        spool.seek(0)
+                        node, node_complete = _archive_node(
+                            spool, parts[-1], member_path, encoding, algorithms, digests, candidates, file_filter, budget, depth + 1,
+                        )
+                else:
+                    node, node_complete = _file_node(hashing.hash_stream(member, algorithms)), True
+
+            complete = complete and node_complete
+            if node is not None:
+                if not _kept(node, tracked):
+                    continue
+                # 일부를 읽지 못한 중첩 압축 파일은 다음에 다시 읽도록 CRC를 남기지 않는다
+                if node_complete:
+                    node['size'], node['crc'] = info.file_size, info.CRC
+                _insert(children, parts, node)
+            elif not filtering:
+                # 읽지 못한 중첩 압축 파일도 상위 폴더는 만들어진다
+                _parent(children, parts)
+    if reused:
+        logger.debug(f'reused {reused} unchanged zip members by size and CRC32')
+    return children, complete, truncated
+
+
+def _unitypackage_children(f, path, encoding, algorithms, file_filter, budget, depth):
+    """Reads a .unitypackage (gzip'd tar of ``<guid>/pathname`` + ``<guid>/asset``) in one pass.
+
+    Mirrors unitypackage_extractor.extractPackage: GUIDs without an asset are skipped,
+    the first line of ``pathname`` is the output path, paths escaping the package root
+    are ignored and folders only exist as parents of assets.
+
+    Assets ``file_filter`` does not track are not hashed when their pathname comes first;
+    Unity usually writes it after the asset, so those are hashed and dropped afterwards.
+    """
+    children = {}
+    complete = True
+    truncated = False
+    pathnames = {}
+    assets = {}
+    try:
+        # extractPackage는 아이템 인코딩과 관계없이 UTF-8로 읽는다
+        with tarfile.open(fileobj=f, mode='r|*', encoding='utf-8') as package:
+            for info in package:
+                # 읽지 않는 멤버도 다음 헤더까지 압축을 풀어야 하므로 모든 멤버를 차감한다
+                if not budget.charge(info.size):
+                    truncated = True
+                    break
+                _check_member(info)
+                parts = os.path.normpath(info.name).split('/')
+                if len(parts) != 2 or not info.isfile():
+                    continue
+                guid, entry = parts
+
+                if entry == 'pathname':
+                    pathnames[guid] = _read_pathname(package.extractfile(info))
+                    if guid not in assets:
+                        continue
+                elif entry == 'asset':
+                    _close_spool(assets.pop(guid, None))
+                    assets[guid] = _read_asset(package.extractfile(info), pathnames.get(guid), algorithms, path, file_filter)
+                    if guid not in pathnames:
+                        continue
+                else:
+                    continue
+
+                digests, spool = assets.pop(guid)
+                try:
+                    complete = _place_asset(
+                        children, path, pathnames.pop(guid), digests, spool, encoding, algorithms, file_filter, budget, depth,
+                    ) and complete
+                finally:
+                    _close_spool((digests, spool))
+    finally:
+        for asset in assets.values():
+            _close_spool(asset)
+    return children, complete, truncated
+
+
+def _check_member(info):
+    """Rejects the members tarsafe refuses to extract."""
+    root = os.path.abspath(os.sep + 'package')
+
+    def contained(name):
+        resolved = os.path.abspath(os.path.join(root, name))
+        return os.path.commonpath([root, resolved]) == root
+
+    name = info.name
+    if (name.startswith(('/', '\\')) or '..' in name or ntpath.splitdrive(name)[0]) and not contained(name):
+        raise tarfile.TarError(f'Attempted directory traversal for member: {name}')
+    if (info.issym() or info.islnk()) and not contained(info.linkname):
+        raise tarfile.TarError(f'Attempted directory traversal via link for member: {info.linkname}')
+    if info.ischr() or info.isblk():
+        raise tarfile.TarError(f'device member: {name}')
+
+
+def _read_pathname(f):
+    text = f.read().decode('utf-8')
+    if not text:
+        raise ValueError('empty pathname')
+    # extractPackage는 텍스트 모드 readline()으로 첫 줄만 읽는다 (\r, \n, \r\n 모두 줄바꿈)
+    end = len(text)
+    for newline in ('\r', '\n'):
+        index = text.find(newline)
+        if index != -1:
+            end = min(end, index)
+    return text[:end]
+
+
+def _read_asset(f, pathname, algorithms, path, file_filter):
+    """Hashes an asset while it streams by. Returns (digests, spool or None).
+
+    The bytes are only kept when the asset is, or may turn out to be, an archive: if its
+    pathname has not been read yet, that is guessed from the leading magic bytes. An asset
+    whose pathname shows it is not needed is skipped with digests None.
+    """
+    if pathname is not None and not _wanted_asset(path, pathname, file_filter):
+        return None, None
+    head = f.read(hashing.CHUNK_SIZE)
+    if pathname is not None:
+        keep = bool(archive_type(pathname))
+    else:
+        keep = head.startswith(ARCHIVE_MAGIC) or head[257:262] == b'ustar'
+
+    if not keep:
+        return hashing.hash_stream(f, algorithms, head=head), None
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    return hashing.hash_stream(f, algorithms, copy_to=spool, head=head), spool
+
+
+def _close_spool(asset):
+    if asset is not None and asset[1] is not None:
+        asset[1].close()
+
+
+def _asset_parts(pathname):
+    """Path components of an asset, or None when extractPackage would skip it as outside the output folder."""
+    if os.path.isabs(pathname):
+        return None
+    normalized = os.path.normpath(pathname)
+    if normalized in (os.path.curdir, os.path.pardir) or normalized.startswith(os.path.pardir + '/'):
+        return None
+    return normalized.split('/')
+
+
+def _wanted_asset(path, pathname, file_filter):
+    """False if the asset at pathname is neither tracked nor an archive that may hold tracked files."""
+    if not file_filter.active:
+        return True
+    parts = _asset_parts(pathname)
+    if parts is None:
+        return False
+    asset_path = f'{path}/{"/".join(parts)}'
+    return file_filter.matches(asset_path) or (bool(archive_type(parts[-1])) and file_filter.may_contain(asset_path))
+
+
+def _make_dirs(children, pathname):
+    """Creates the folders os.makedirs(dirname(pathname)) leaves behind, including ones a later '..' steps out of."""
+    current = []
+    for part in os.path.dirname(pathname).split('/'):
+        if part in ('', os.path.curdir):
+            continue
+        if part == os.path.pardir:
+            if current:
+                current.pop()
+            continue
+        current.append(part)
+        _parent(children, current + [None])
+
+
+def _place_asset(children, path, pathname, digests, spool, encoding, algorithms, file_filter, budget, depth):
+    """Inserts one asset into children; returns False if it is an archive that could not be read."""
+    parts = _asset_parts(pathname)
+    if parts is None:
+        logger.debug(f'skipping unitypackage asset outside the package: {pathname}')
+        return True
+    if digests is None or not _wanted_asset(path, pathname, file_filter):
+        return True
+
+    filtering = file_filter.active
+    if os.path.pardir in pathname.split('/') and not filtering:
+        _make_dirs(children, pathname)
+
+    name = parts[-1]
+    asset_path = f'{path}/{"/".join(parts)}'
+    tracked = not filtering or file_filter.matches(asset_path)
+    if not archive_type(name):
+        _insert(children, parts, _file_node(digests))
+        return True
+
+    if spool is None:
+        logger.error(f'error occured on extracting {name}: not a zip or unitypackage')
+        node, complete = None, False
+    else:
+        spool.seek(0)
+        node, complete = _archive_node(spool, name, asset_path, encoding, algorithms, digests, (), file_filter, budget, depth + 1)
+
+    if node is not None:
+        if _kept(node, tracked):
+            _insert(children, parts, node)
+    elif not filtering:
+        _parent(children, parts)
+    return complete
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+import booth
+from http_session import is_booth_url
+from rate_limit import THROTTLE_STATUS, parse_retry_after
+
+
+logger = logging.getLogger('BoothChecker')
+
+RETRY_STATUS = THROTTLE_STATUS + (500, 502, 504)
+# 다시 보내도 결과가 같은 메서드
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class AsyncBoothClient:
+    """aiohttp counterpart of BoothSession for the asyncio engine.
+
+    One connection pool is shared by every coroutine of a cycle. booth.pm requests
+    pass through the same RateGovernor as the threaded engine.
+    """
+
+    def __init__(self, governor=None, concurrency=64, connections_per_host=8, timeout=60, retries=3, backoff_factor=0.5):
+        self.governor = governor
+        self.concurrency = concurrency
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.connections_per_host),
+            # 계정별 쿠키는 요청마다 넘기므로 응답 쿠키는 저장하지 않는다
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    @asynccontextmanager
+    async def request(self, method, url, **kwargs):
+        """Yields the response; booth.pm requests hold their governor slot until the body is read.
+
+        Connection errors, timeouts and RETRY_STATUS are retried for idempotent methods.
+        Other methods (POST) may already have been delivered, so they are only retried
+        after a throttled response that carries Retry-After.
+        """
+        governed = self.governor is not None and is_booth_url(url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.retries + 1):
+            if governed:
+                await self.governor.acquire_async()
+            started = time.monotonic()
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if governed:
+                    self.governor.release()
+                if not idempotent or attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                continue
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            outcome = (response.status, time.monotonic() - started, retry_after)
+            retryable = response.status in RETRY_STATUS if idempotent else response.status in THROTTLE_STATUS and retry_after is not None
+            if retryable and attempt < self.retries:
+                response.release()
+                if governed:
+                    self.governor.release(*outcome)
+                else:
+                    await asyncio.sleep(retry_after if retry_after is not None else self.backoff_factor * (2 ** attempt))
+                logger.info(f'{response.status} from {url}, retrying ({attempt + 1}/{self.retries})')
+                continue
+
+            try:
+                yield response
+            finally:
+                response.release()
+                # 본문을 다 읽은 뒤에 슬롯을 돌려줘야 다운로드도 max_in_flight 안에서 진행된다
+                if governed:
+                    self.governor.release(*outcome)
+            return
+
+    async def get_bytes(self, url, cookies=None, headers=None):
+        """Returns (status, headers, body)."""
+        async with self.request('GET', url, cookies=cookies, headers=headers) as response:
+            return response.status, response.headers, await response.read()
+
+    async def post_json(self, url, data):
+        """Returns (status, text)."""
+        async with self.request('POST', url, json=data) as response:
+            return response.status, await response.text()
+
+    async def fetch_product(self, url, etag=None, last_modified=None, run_blocking=None):
+        """Async booth.fetch_product; parsing runs through ``run_blocking`` when given."""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        status, response_headers, body = await self.get_bytes(url, headers=headers)
+        etag = response_headers.get('ETag', etag)
+        last_modified = response_headers.get('Last-Modified', last_modified)
+        if status != 200:
+            return status, None, etag, last_modified
+        if run_blocking is not None:
+            return status, await run_blocking(booth.parse_product, body), etag, last_modified
+        return status, booth.parse_product(body), etag, last_modified
+
+    async def download_item(self, download_number, filepath, cookie, retries=booth.DOWNLOAD_RETRIES, backoff_factor=booth.DOWNLOAD_BACKOFF, run_blocking=None):
+        """Async booth.download_item with the same resume and validation rules.
+
+        File writes and hashing run through ``run_blocking`` (asyncio.to_thread by default)
+        so a large download does not stall the event loop.
+        """
+        run_blocking = run_blocking or asyncio.to_thread
+        url = f'https://booth.pm/downloadables/{download_number}'
+        part_path = f'{filepath}.part'
+
+        for attempt in range(retries + 1):
+            try:
+                return await self._download_once(url, filepath, part_path, cookie, run_blocking)
+            except booth.BoothDownloadError as e:
+                if e.discard_partial or not e.retryable or attempt == retries:
+                    booth.remove_partial(part_path)
+                if not e.retryable or attempt == retries:
+                    booth.count_download(rejected=1)
+                    raise
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                if attempt == retries:
+                    raise booth.BoothDownloadError(f'{download_number}: {e}') from e
+                error = e
+            delay = backoff_factor * (2 ** attempt)
+            logger.warning(f'download {download_number} failed ({error}), retrying in {delay:.0f}s ({attempt + 1}/{retries})')
+            await asyncio.sleep(delay)
+
+    async def _download_once(self, url, filepath, part_path, cookie, run_blocking):
+        offset = booth.partial_size(part_path)
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        async with self.request('GET', url, cookies=cookie, headers=headers) as response:
+            offset, expected = booth.check_download_response(response.status, response.headers, offset)
+            # 이어받을 때 기존 .part를 다시 해시하므로 이것도 이벤트 루프 밖에서 한다
+            file_hash, f = await run_blocking(booth.start_partial, part_path, offset)
+            written = offset
+            try:
+                async for chunk in response.content.iter_chunked(booth.DOWNLOAD_CHUNK_SIZE):
+                    await run_blocking(_write_chunk, f, file_hash, chunk)
+                    written += len(chunk)
+                    booth.count_download(bytes_downloaded=len(chunk))
+            finally:
+                await run_blocking(f.close)
+
+        await run_blocking(booth.finish_partial, filepath, part_path, written, expected)
+        return file_hash.hexdigest()
+
+
+def _write_chunk(f, file_hash, chunk):
+    f.write(chunk)
+    file_hash.update(chunk)
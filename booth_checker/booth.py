@@ -1,109 +1,409 @@
-import requests
+import hashlib
+import logging
+import os
 import re
-from bs4 import BeautifulSoup
+import threading
+import time
+from functools import lru_cache
+
+import requests
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+
+import hashing
+from http_session import get_session
+
+try:
+    import lxml  # noqa: F401
+    PARSER_BACKEND = "lxml"
+except ImportError:
+    PARSER_BACKEND = "html.parser"
+
+logger = logging.getLogger('BoothChecker')
+
+# {cache_key: (region fingerprint, parsed products)}
+_region_cache = {}
+_region_cache_lock = threading.Lock()
+
+PARSER_BACKENDS = ("lxml", "html.parser")
+
+def set_parser_backend(backend):
+    global PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"html_parser must be one of {', '.join(PARSER_BACKENDS)}, got {backend!r}")
+    if backend == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError as e:
+            raise ValueError("html_parser 'lxml' is not installed") from e
+    PARSER_BACKEND = backend
+
+@lru_cache(maxsize=None)
+def _compiled(selector):
+    return soupsieve.compile(selector)
+
+_DOWNLOADABLE_HREF = re.compile(r'/downloadables/(\d+)')
 
 def _extract_download_info(div, link_selector, filename_selector):
-    download_link = div.select_one(link_selector)
-    filename_div = div.select_one(filename_selector)
+    download_link = _compiled(link_selector).select_one(div)
+    filename_div = _compiled(filename_selector).select_one(div)
     
     if not download_link or not filename_div:
         return None
 
-    href = download_link.get("data-href")
     filename = filename_div.get_text()
+    href = download_link.get("data-href")
+    if href:
+        return [re.sub(r'[^0-9]', '', href), filename]
 
-    if not href:
+    # 라이브러리 페이지는 다운로드 링크가 a[href]이다. 다른 링크가 다운로드 번호로 읽히지 않도록 경로를 확인한다
+    match = _DOWNLOADABLE_HREF.search(download_link.get("href") or '')
+    if not match:
         return None
+    return [match.group(1), filename]
 
-    href = re.sub(r'[^0-9]', '', href)
-    return [href, filename]
+def _product_region(html, selectors):
+    """Returns the slice of the page from the first product container up to the footer, or None."""
+    marker = f'class="{selectors["product_div_class"]}"'.encode()
+    start = html.find(marker)
+    if start < 0:
+        return None
+    start = html.rfind(b'<', 0, start)
+    end = html.rfind(b'<footer')
+    if end <= start:
+        end = len(html)
+    return html[start:end]
 
-def _crawling_base(url, cookie, selectors, shortlist, thumblist, product_only_filter=None):
-    response = requests.get(url=url, cookies=cookie)
-    html = response.content
-    
-    download_url_list = []
-    product_info_list = []
-    soup = BeautifulSoup(html, "html.parser")
+def _parse_products(html, selectors, cache_key=None):
+    """Returns one dict per product container: name, url, thumb and its [download_number, filename] list.
+
+    Only the product region of the page is parsed, and when ``cache_key`` is given an
+    unchanged region (same fingerprint as last time) is not parsed at all.
+    """
+    region = _product_region(html, selectors)
+    fingerprint = None
+    if region is not None:
+        fingerprint = hashlib.blake2b(region, digest_size=16).hexdigest()
+        if cache_key is not None:
+            with _region_cache_lock:
+                cached = _region_cache.get(cache_key)
+            if cached is not None and cached[0] == fingerprint:
+                return [dict(product, downloads=[list(info) for info in product['downloads']]) for product in cached[1]]
+        markup = region
+    else:
+        markup = html
+
+    strainer = SoupStrainer(selectors['product_div_tag'], class_=selectors['product_div_class'])
+    soup = BeautifulSoup(markup, PARSER_BACKEND, parse_only=strainer, from_encoding='utf-8')
     
     product_divs = soup.find_all(selectors['product_div_tag'], class_=selectors['product_div_class'])
-    
+    info_selector = _compiled(selectors['product_info_selector'])
+    thumb_selector = _compiled(selectors['thumb_selector'])
+    download_item_selector = _compiled(selectors['download_item_selector'])
+
+    products = []
     for product_div in product_divs:
         if 'product_info_index' in selectors:
-            product_info_elements = product_div.select(selectors['product_info_selector'])
+            product_info_elements = info_selector.select(product_div)
             if len(product_info_elements) <= selectors['product_info_index']:
                 continue
             product_info = product_info_elements[selectors['product_info_index']]
         else:
-            product_info = product_div.select_one(selectors['product_info_selector'])
+            product_info = info_selector.select_one(product_div)
 
         if not product_info:
             continue
-            
-        product_name = product_info.get_text()
-        product_url = product_info.get("href")
-        
+
+        thumb_link = thumb_selector.select_one(product_div)
+
+        downloads = []
+        for div in download_item_selector.select(product_div):
+            info = _extract_download_info(div, selectors['download_link_selector'], selectors['filename_selector'])
+            if info:
+                downloads.append(info)
+
+        products.append({
+            'name': product_info.get_text(),
+            'url': product_info.get("href"),
+            'thumb': thumb_link.get("src") if thumb_link else None,
+            'downloads': downloads,
+        })
+
+    if cache_key is not None and fingerprint is not None:
+        with _region_cache_lock:
+            _region_cache[cache_key] = (fingerprint, [dict(product, downloads=[list(info) for info in product['downloads']]) for product in products])
+    return products
+
+def _item_number_from_url(product_url):
+    match = re.search(r'/items/(\d+)', product_url or '')
+    return match.group(1) if match else None
+
+def _cookie_key(cookie):
+    return tuple(sorted((cookie or {}).items()))
+
+def parse_order_page(html, url, cookie, selectors, shortlist=None, thumblist=None, product_only_filter=None):
+    """Turns a fetched order/gift page into (download_url_list, product_info_list)."""
+    download_url_list = []
+    product_info_list = []
+
+    for product in _parse_products(html, selectors, cache_key=(url, _cookie_key(cookie))):
         if product_only_filter:
-            match = re.search(r'/items/(\d+)', product_url)
-            if not match or match.group(1) not in product_only_filter:
+            item_number = _item_number_from_url(product['url'])
+            if not item_number or item_number not in product_only_filter:
                 continue
         
-        product_info_list.append([product_name, product_url])
+        product_info_list.append([product['name'], product['url']])
 
-        thumb_link = product_div.select_one(selectors['thumb_selector'])
-        if thumb_link and thumblist is not None:
-            thumblist.append(thumb_link.get("src"))
+        if product['thumb'] and thumblist is not None:
+            thumblist.append(product['thumb'])
         
-        download_item_divs = product_div.select(selectors['download_item_selector'])
-        for div in download_item_divs:
-            info = _extract_download_info(div, selectors['download_link_selector'], selectors['filename_selector'])
-            if info:
-                download_url_list.append(info)
-                if shortlist is not None:
-                    shortlist.append(info[0])
+        for info in product['downloads']:
+            download_url_list.append(info)
+            if shortlist is not None:
+                shortlist.append(info[0])
             
     return download_url_list, product_info_list
 
+def _crawling_base(url, cookie, selectors, shortlist, thumblist, product_only_filter=None):
+    response = get_session().get(url, cookies=cookie)
+    return parse_order_page(response.content, url, cookie, selectors, shortlist, thumblist, product_only_filter)
+
+ORDER_SELECTORS = {
+    'product_div_tag': 'div',
+    'product_div_class': 'sheet sheet--p400 mobile:pt-[13px] mobile:px-16 mobile:pb-8',
+    'product_info_selector': 'a',
+    'product_info_index': 1,
+    'thumb_selector': 'img',
+    'download_item_selector': 'div.legacy-list-item__center, div[data-test="downloadable"]',
+    'download_link_selector': 'a.nav-reverse, div.js-download-button',
+    'filename_selector': 'div.flex-\\[1\\] b'
+}
+
+GIFT_SELECTORS = {
+    'product_div_tag': 'div',
+    'product_div_class': 'rounded-16 bg-white p-40 mobile:px-16 mobile:pt-24 mobile:pb-40 mobile:rounded-none',
+    'product_info_selector': 'div.mt-24.text-left a',
+    'thumb_selector': 'img',
+    'download_item_selector': 'div.w-full.text-left, div[data-test="downloadable"]',
+    'download_link_selector': 'a.no-underline.flex.items-center.flex.gap-4, div.js-download-button',
+    'filename_selector': "div[class='min-w-0 break-words whitespace-pre-line']"
+}
+
+LIBRARY_SELECTORS = {
+    'product_div_tag': 'div',
+    'product_div_class': 'mb-16 bg-white p-16 desktop:rounded-8 desktop:py-24 desktop:px-40',
+    'product_info_selector': 'a[href*="/items/"]:not(:has(img))',
+    'thumb_selector': 'img',
+    'download_item_selector': 'div.desktop\\:flex.justify-between.items-center, div[data-test="downloadable"]',
+    'download_link_selector': 'a[href*="/downloadables/"], div.js-download-button',
+    'filename_selector': 'div.typography-14.\\!preserve-half-leading, div.flex-\\[1\\] b'
+}
+
+def order_page(order_num, gift):
+    """Returns (url, selectors) of an order or gift page."""
+    if gift:
+        return f'https://booth.pm/gifts/{order_num}', GIFT_SELECTORS
+    return f'https://accounts.booth.pm/orders/{order_num}', ORDER_SELECTORS
+
 def crawling(order_num, product_only, cookie, shortlist=None, thumblist=None):
-    url = f'https://accounts.booth.pm/orders/{order_num}'
-    selectors = {
-        'product_div_tag': 'div',
-        'product_div_class': 'sheet sheet--p400 mobile:pt-[13px] mobile:px-16 mobile:pb-8',
-        'product_info_selector': 'a',
-        'product_info_index': 1,
-        'thumb_selector': 'img',
-        'download_item_selector': 'div.legacy-list-item__center, div[data-test="downloadable"]',
-        'download_link_selector': 'a.nav-reverse, div.js-download-button',
-        'filename_selector': 'div.flex-\\[1\\] b'
-    }
+    url, selectors = order_page(order_num, gift=False)
     return _crawling_base(url, cookie, selectors, shortlist, thumblist, product_only_filter=product_only)
 
 def crawling_gift(order_num, cookie, shortlist=None, thumblist=None):
-    url = f'https://booth.pm/gifts/{order_num}'
-    selectors = {
-        'product_div_tag': 'div',
-        'product_div_class': 'rounded-16 bg-white p-40 mobile:px-16 mobile:pt-24 mobile:pb-40 mobile:rounded-none',
-        'product_info_selector': 'div.mt-24.text-left a',
-        'thumb_selector': 'img',
-        'download_item_selector': 'div.w-full.text-left, div[data-test="downloadable"]',
-        'download_link_selector': 'a.no-underline.flex.items-center.flex.gap-4, div.js-download-button',
-        'filename_selector': "div[class='min-w-0 break-words whitespace-pre-line']"
-    }
+    url, selectors = order_page(order_num, gift=True)
     return _crawling_base(url, cookie, selectors, shortlist, thumblist)
 
-def download_item(download_number, filepath, cookie):
+LIBRARY_MAX_PAGES = 50
+
+def crawling_library(cookie, item_numbers, max_pages=LIBRARY_MAX_PAGES):
+    """Crawls the account's order library once for several tracked items.
+
+    Returns {item_number: (download_url_list, product_info_list, thumblist)} only for
+    items that appear exactly once with at least one downloadable; anything else is
+    ambiguous and has to be fetched from its order page. Every page is read, since an
+    item bought in several orders can show up again on any later page. A library with
+    more than ``max_pages`` pages returns nothing, as duplicates past the limit would go unnoticed.
+    """
+    wanted = set(item_numbers)
+    found = {}
+    seen_twice = set()
+    for page in range(1, max_pages + 2):
+        url = f'https://accounts.booth.pm/library?page={page}'
+        response = get_session().get(url, cookies=cookie)
+        products = _parse_products(response.content, LIBRARY_SELECTORS, cache_key=(url, _cookie_key(cookie)))
+        if not products:
+            break
+        if page > max_pages:
+            logger.warning(f'Order library has more than {max_pages} pages; fetching every item from its order page.')
+            return {}
+
+        for product in products:
+            item_number = _item_number_from_url(product['url'])
+            if item_number not in wanted:
+                continue
+            if item_number in found:
+                seen_twice.add(item_number)
+                continue
+            found[item_number] = product
+
+    result = {}
+    for item_number, product in found.items():
+        if item_number in seen_twice or not product['downloads']:
+            continue
+        download_url_list = [list(info) for info in product['downloads']]
+        product_info_list = [[product['name'], product['url']]]
+        thumblist = [product['thumb']] if product['thumb'] else []
+        result[item_number] = (download_url_list, product_info_list, thumblist)
+    return result
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF = 2.0
+
+_download_stats = {'bytes_downloaded': 0, 'bytes_resumed': 0, 'resumed': 0, 'rejected': 0}
+_download_stats_lock = threading.Lock()
+
+class BoothDownloadError(Exception):
+    """Raised when a downloadable could not be fetched intact."""
+    def __init__(self, message, retryable=True, discard_partial=False):
+        super().__init__(message)
+        self.retryable = retryable
+        self.discard_partial = discard_partial
+
+def count_download(**counters):
+    with _download_stats_lock:
+        for key, value in counters.items():
+            _download_stats[key] += value
+
+def pop_download_stats():
+    """Returns the download counters accumulated since the last call and resets them."""
+    with _download_stats_lock:
+        stats = dict(_download_stats)
+        for key in _download_stats:
+            _download_stats[key] = 0
+    return stats
+
+def _hash_existing(path, file_hash):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+
+def check_download_response(status, headers, offset):
+    """Validates a downloadable response before any byte is written.
+
+    Returns (offset, expected_total): offset is reset to 0 when the server ignored
+    the Range request, expected_total is None when the length is unknown.
+    """
+    if status == 416:
+        raise BoothDownloadError('partial file no longer matches the remote file', discard_partial=True)
+    if status == 206 and offset:
+        content_range = headers.get('Content-Range', '')
+        if not content_range.startswith(f'bytes {offset}-'):
+            raise BoothDownloadError(f'unexpected Content-Range "{content_range}"', discard_partial=True)
+    elif status == 200:
+        offset = 0  # Range를 무시한 서버: 처음부터 다시 받는다
+    else:
+        raise BoothDownloadError(f'HTTP {status}', retryable=status >= 500 or status == 429)
+
+    content_type = headers.get('Content-Type', '')
+    if content_type.startswith('text/html'):
+        # 세션 만료 시 로그인 페이지가 200으로 내려온다
+        raise BoothDownloadError(f'received {content_type} instead of a file', retryable=False)
+
+    expected = None
+    if 'Content-Length' in headers and 'Content-Encoding' not in headers:
+        expected = offset + int(headers['Content-Length'])
+    return offset, expected
+
+def partial_size(part_path):
+    return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+def remove_partial(part_path):
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+def start_partial(part_path, offset):
+    """Returns (hash of the configured algorithm seeded with the bytes already on disk, file opened for writing)."""
+    file_hash = hashing.new(hashing.ALGORITHM)
+    if offset:
+        _hash_existing(part_path, file_hash)
+        count_download(bytes_resumed=offset, resumed=1)
+    return file_hash, open(part_path, 'ab' if offset else 'wb')
+
+def finish_partial(filepath, part_path, written, expected):
+    if expected is not None and written != expected:
+        raise BoothDownloadError(f'truncated download ({written}/{expected} bytes)')
+    os.replace(part_path, filepath)
+
+def _download_once(url, filepath, part_path, cookie):
+    offset = partial_size(part_path)
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    with get_session().get(url, cookies=cookie, stream=True, headers=headers) as response:
+        offset, expected = check_download_response(response.status_code, response.headers, offset)
+        file_hash, f = start_partial(part_path, offset)
+        written = offset
+        with f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                file_hash.update(chunk)
+                written += len(chunk)
+                count_download(bytes_downloaded=len(chunk))
+
+    finish_partial(filepath, part_path, written, expected)
+    return file_hash.hexdigest()
+
+def download_item(download_number, filepath, cookie, retries=DOWNLOAD_RETRIES, backoff_factor=DOWNLOAD_BACKOFF):
+    """Streams a downloadable to disk and returns the hash of its bytes (hashing.ALGORITHM).
+
+    Interrupted transfers are resumed from ``filepath + '.part'`` with an HTTP Range
+    request. Error statuses, HTML pages and short bodies raise BoothDownloadError so
+    they never reach extraction.
+    """
     url = f'https://booth.pm/downloadables/{download_number}'
-    
-    response = requests.get(url=url, cookies=cookie)
-    open(filepath, "wb").write(response.content)
+    part_path = f'{filepath}.part'
 
+    for attempt in range(retries + 1):
+        try:
+            return _download_once(url, filepath, part_path, cookie)
+        except BoothDownloadError as e:
+            if e.discard_partial or not e.retryable or attempt == retries:
+                remove_partial(part_path)
+            if not e.retryable or attempt == retries:
+                count_download(rejected=1)
+                raise
+            error = e
+        except (requests.RequestException, OSError) as e:
+            if attempt == retries:
+                raise BoothDownloadError(f'{download_number}: {e}') from e
+            error = e
+        delay = backoff_factor * (2 ** attempt)
+        logger.warning(f'download {download_number} failed ({error}), retrying in {delay:.0f}s ({attempt + 1}/{retries})')
+        time.sleep(delay)
 
-def crawling_product(url):
-    response = requests.get(url)
-    html = response.content
-    
-    soup = BeautifulSoup(html, "html.parser")
-    author_div = soup.find("a", class_="flex gap-4 items-center no-underline preserve-half-leading !text-current typography-16 w-fit")
+def fetch_product(url, etag=None, last_modified=None):
+    """Fetches author info of a product page, revalidating with ETag/Last-Modified when given.
+
+    Returns (status_code, author_info, etag, last_modified); author_info is None on 304 or a private store.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    response = get_session().get(url, headers=headers)
+    etag = response.headers.get('ETag', etag)
+    last_modified = response.headers.get('Last-Modified', last_modified)
+    if response.status_code != 200:
+        return response.status_code, None, etag, last_modified
+    return response.status_code, parse_product(response.content), etag, last_modified
+
+def parse_product(html):
+    """Returns [author_image_url, author_name] from a product page, or None for a private store."""
+    author_class = "flex gap-4 items-center no-underline preserve-half-leading !text-current typography-16 w-fit"
+    soup = BeautifulSoup(html, PARSER_BACKEND, parse_only=SoupStrainer("a", class_=author_class), from_encoding='utf-8')
+    author_div = soup.find("a", class_=author_class)
     # None: private store
     if author_div is None:
         return None
@@ -113,3 +413,6 @@ def crawling_product(url):
     author_name = author_image.get("alt")
     
     return [author_image_url, author_name]
+
+def crawling_product(url):
+    return fetch_product(url)[1]
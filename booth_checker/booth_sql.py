@@ -6,11 +6,34 @@ import psycopg
 logger = logging.getLogger('BoothChecker')
 
 
+def connect_with_retry(conn_params, retries=5, delay=2):
+    for attempt in range(1, retries + 1):
+        try:
+            return psycopg.connect(**conn_params)
+        except psycopg.OperationalError as exc:
+            if attempt == retries:
+                logger.error("PostgreSQL 연결에 실패했습니다. 설정을 확인해주세요.")
+                raise
+            logger.warning(
+                "PostgreSQL 연결 재시도 %s/%s: %s",
+                attempt,
+                retries,
+                exc,
+            )
+            time.sleep(delay)
+
+
 class BoothPostgres:
     def __init__(self, conn_params, retries=5, delay=2):
-        self.conn = self._connect_with_retry(conn_params, retries, delay)
+        self.conn = connect_with_retry(conn_params, retries, delay)
         self.conn.autocommit = True
         self.cursor = self.conn.cursor()
+        # 이전 버전의 봇이 만든 테이블에도 get_booth_items가 읽는 경로 필터 컬럼을 추가한다
+        self.cursor.execute('''
+            ALTER TABLE IF EXISTS booth_items
+                ADD COLUMN IF NOT EXISTS include_globs TEXT[],
+                ADD COLUMN IF NOT EXISTS exclude_globs TEXT[]
+        ''')
 
     def __del__(self):
         try:
@@ -36,7 +59,9 @@ class BoothPostgres:
                     items.fbx_only,
                     accounts.session_cookie,
                     accounts.discord_user_id,
-                    channels.discord_channel_id
+                    channels.discord_channel_id,
+                    items.include_globs,
+                    items.exclude_globs
             FROM booth_items items
             INNER JOIN booth_accounts accounts
                 ON items.discord_user_id = accounts.discord_user_id
@@ -44,19 +69,3 @@ class BoothPostgres:
                 ON items.booth_order_number = channels.booth_order_number
         ''')
         return self.cursor.fetchall()
-
-    def _connect_with_retry(self, conn_params, retries=5, delay=2):
-        for attempt in range(1, retries + 1):
-            try:
-                return psycopg.connect(**conn_params)
-            except psycopg.OperationalError as exc:
-                if attempt == retries:
-                    logger.error("PostgreSQL 연결에 실패했습니다. 설정을 확인해주세요.")
-                    raise
-                logger.warning(
-                    "PostgreSQL 연결 재시도 %s/%s: %s",
-                    attempt,
-                    retries,
-                    exc,
-                )
-                time.sleep(delay)
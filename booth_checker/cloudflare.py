@@ -1,19 +1,39 @@
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 class S3Uploader:
-    def __init__(self, endpoint_url, access_key_id, secret_access_key):
+    """One boto3 client shared by every upload thread; boto3 clients are thread-safe."""
+
+    def __init__(self, endpoint_url, access_key_id, secret_access_key, max_connections=10):
         self.s3 = boto3.client(
             service_name="s3",
             endpoint_url=endpoint_url,
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
             region_name="apac",
+            config=Config(max_pool_connections=max_connections, retries={'mode': 'standard'}),
         )
 
-    def upload(self, file_path, bucket_name, object_name):
-        self.s3.upload_file(
-            file_path,
-            bucket_name,
-            object_name,
-            ExtraArgs={'ContentType': 'text/html'}
-        )
\ No newline at end of file
+    def exists(self, bucket_name, object_name):
+        """True if the object is already in the bucket (HEAD request)."""
+        try:
+            self.s3.head_object(Bucket=bucket_name, Key=object_name)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def upload(self, body, bucket_name, object_name, content_encoding=None):
+        """Uploads an HTML page from a file path or a seekable binary file object."""
+        extra_args = {'ContentType': 'text/html'}
+        if content_encoding:
+            # 미리 압축한 파일: 브라우저가 Content-Encoding을 보고 풀어서 보여준다
+            extra_args['ContentEncoding'] = content_encoding
+        if isinstance(body, str):
+            self.s3.upload_file(body, bucket_name, object_name, ExtraArgs=extra_args)
+            return
+        # 재시도할 때도 처음부터 읽는다
+        body.seek(0)
+        self.s3.upload_fileobj(body, bucket_name, object_name, ExtraArgs=extra_args)
@@ -0,0 +1,222 @@
+import html
+
+
+# mark_as와 같은 값, RENAMED는 이전 버전에서 지워진 파일과 해시가 같은 추가된 파일
+UNCHANGED = 0
+ADDED = 1
+DELETED = 2
+CHANGED = 3
+RENAMED = 4
+
+# 이전과 같은 하위 트리의 루트에 붙는 표시 (아래 노드에는 mark_as가 없다)
+UNCHANGED_SUBTREE = 'unchanged-subtree'
+
+STATUS_LABELS = {ADDED: 'Added', DELETED: 'Deleted', CHANGED: 'Changed'}
+STATUS_COLORS = {
+    UNCHANGED: 'rgb(255, 255, 255)',
+    ADDED: 'rgb(125, 164, 68)',
+    DELETED: 'rgb(252, 101, 89)',
+    CHANGED: 'rgb(128, 161, 209)',
+    RENAMED: 'rgb(255, 255, 255)',
+}
+
+
+class DiffNode:
+    """One entry of a changelog: a file, folder or archive, how it changed and what is below it."""
+
+    __slots__ = ('name', 'status', 'old_name', 'parent', 'children', 'folded', 'pruned')
+
+    def __init__(self, name, status=UNCHANGED, old_name=None, parent=None):
+        self.name = name
+        self.status = status
+        self.old_name = old_name
+        self.parent = parent
+        self.children = {}
+        # compact()가 접어 넣은 변경 없는 파일 수
+        self.folded = 0
+        # from_version_tree가 내용을 펼치지 않은 변경 없는 폴더나 압축 파일 아래의 파일 수
+        self.pruned = 0
+        if parent is not None:
+            parent.children[name] = self
+
+    def detach(self):
+        del self.parent.children[self.name]
+        self.parent = None
+
+    def path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return '/'.join(reversed(parts))
+
+    def size(self):
+        """Number of entries in this subtree, this one included."""
+        count = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children.values())
+        return count
+
+    def label(self):
+        if self.folded:
+            if not self.name:
+                return f'… {self.folded} unchanged'
+            return f'{self.name} ({self.folded} unchanged)'
+        if self.pruned:
+            return f'{self.name} (unchanged)'
+        if self.status == RENAMED:
+            return f'{self.old_name} → {self.name}'
+        if self.status in STATUS_LABELS:
+            return f'{self.name} ({STATUS_LABELS[self.status]})'
+        return self.name
+
+
+def from_version_tree(version_json, deleted_hashes):
+    """Builds the diff of a version tree marked by record_node and mark_deleted.
+
+    ``deleted_hashes`` maps the hash of each deleted file to its name. An added file with
+    one of those hashes was moved (same name) or renamed, and the deleted file it came
+    from is left out of the diff. A folder or archive marked UNCHANGED_SUBTREE becomes a
+    single pruned entry holding its file count (see count_files), so the work depends on
+    the changed part of the tree only.
+    """
+    root = DiffNode(None)
+    deleted = []
+    moved = set()
+    stack = [(version_json, root)]
+    while stack:
+        node, parent = stack.pop()
+        for name, child in node.get('files', {}).items():
+            status = child.get('mark_as', UNCHANGED)
+            # 알고리즘을 옮기는 중에는 이전 버전과 같은 알고리즘의 해시로 비교한다
+            file_hash = child.get('legacy-hash', child['hash'])
+            old_name = None
+            if status == ADDED and file_hash in deleted_hashes:
+                moved.add(file_hash)
+                if deleted_hashes[file_hash] != name:
+                    status, old_name = RENAMED, deleted_hashes[file_hash]
+            diff_node = DiffNode(name, status, old_name, parent)
+            if status == DELETED:
+                deleted.append((diff_node, file_hash))
+            if child.get(UNCHANGED_SUBTREE) and child.get('files'):
+                diff_node.pruned = count_files(child)
+            else:
+                stack.append((child, diff_node))
+
+    for diff_node, file_hash in deleted:
+        if file_hash in moved and diff_node.parent is not None:
+            diff_node.detach()
+    return root
+
+
+def count_files(node):
+    """Number of files below a version-tree node, from the 'file-count' stored on its folders and archives where there is one."""
+    if 'file-count' in node:
+        return node['file-count']
+    count = 0
+    stack = [node.get('files', {})]
+    while stack:
+        for child in stack.pop().values():
+            if not child.get('files'):
+                count += 1
+            elif 'file-count' in child:
+                count += child['file-count']
+            else:
+                stack.append(child['files'])
+    return count
+
+
+def from_paths(entries):
+    """A flat diff of (path, status) entries, as used for FBX-only items."""
+    root = DiffNode(None)
+    for path, status in entries:
+        DiffNode(path, status, parent=root)
+    return root
+
+
+def compact(root, node_budget=None):
+    """Shrinks the diff for a compact changelog; returns how many entries the budget dropped.
+
+    A folder or archive with nothing changed below it becomes one entry with its file
+    count, and the unchanged files next to changed ones are counted in one entry per
+    folder; a pruned subtree stays one entry with the file count it was built with. Past ``node_budget`` entries (in page
+    order) the rest is dropped.
+    """
+    _fold(root)
+    if not node_budget:
+        return 0
+    kept = dropped = 0
+    stack = [iter(list(root.children.values()))]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+        elif kept < node_budget:
+            kept += 1
+            stack.append(iter(list(child.children.values())))
+        else:
+            dropped += child.size()
+            child.detach()
+    return dropped
+
+
+def _fold(node):
+    """Number of files below node if neither it nor anything below it changed; otherwise folds its unchanged children and returns None."""
+    counts = {name: _fold(child) for name, child in node.children.items()}
+    if node.parent is not None and node.status == UNCHANGED and None not in counts.values():
+        return sum(counts.values()) if counts else node.pruned or 1
+
+    unchanged_files = 0
+    for name, count in counts.items():
+        if count is None:
+            continue
+        child = node.children[name]
+        if child.children or child.pruned:
+            child.folded, child.children = count, {}
+        else:
+            unchanged_files += 1
+            del node.children[name]
+    if unchanged_files:
+        DiffNode('', parent=node).folded = unchanged_files
+    return None
+
+
+def iter_html(root):
+    """Nested <ul> list of the diff, colored by status, as chunks to stream into a page."""
+    yield '<ul>\n'
+    # 형제 노드의 iterator를 쌓아 재귀 없이 한 번씩만 방문한다
+    stack = [iter(root.children.values())]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            yield '</ul>\n</li>\n' if stack else '</ul>\n'
+            continue
+        yield f'<li><span style="color:{STATUS_COLORS[child.status]}">{html.escape(child.label(), quote=False)}</span>'
+        if child.children:
+            yield '\n<ul>\n'
+            stack.append(iter(child.children.values()))
+        else:
+            yield '</li>\n'
+
+
+def to_html(root):
+    return ''.join(iter_html(root))
+
+
+def to_text(root):
+    """One line per added, deleted or changed entry, for the summary prompt."""
+    lines = []
+    _text(root, lines)
+    return ''.join(lines)
+
+
+def _text(node, lines):
+    for child in node.children.values():
+        if child.status in STATUS_LABELS:
+            lines.append(f'{child.label()}\n')
+        _text(child, lines)
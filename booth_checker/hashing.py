@@ -0,0 +1,100 @@
+import hashlib
+import mmap
+import os
+
+
+# 버전 파일에 'hash-algorithm'이 없으면 이 알고리즘으로 기록된 것으로 본다
+LEGACY_ALGORITHM = 'md5'
+ALGORITHM = LEGACY_ALGORITHM
+CHUNK_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+
+def new(algorithm):
+    """Returns a hash object with update()/hexdigest() for hashlib names, 'blake3' or 'xxh3'."""
+    if algorithm == 'blake3':
+        from blake3 import blake3
+        return blake3()
+    if algorithm == 'xxh3':
+        import xxhash
+        return xxhash.xxh3_128()
+    return hashlib.new(algorithm)
+
+
+def set_algorithm(algorithm):
+    global ALGORITHM
+    try:
+        new(algorithm)
+    except (ImportError, ValueError) as e:
+        raise ValueError(f'hash algorithm {algorithm!r} is not available: {e}') from e
+    ALGORITHM = algorithm
+
+
+class MultiHash:
+    """Feeds the same bytes to one hash object per algorithm."""
+
+    def __init__(self, algorithms):
+        self.hashers = [new(algorithm) for algorithm in algorithms]
+
+    def update(self, data):
+        for hasher in self.hashers:
+            hasher.update(data)
+
+    def hexdigests(self):
+        return tuple(hasher.hexdigest() for hasher in self.hashers)
+
+
+def merkle(files):
+    """Hash of a folder's or archive's children ({name: node}) from their names, hashes and own Merkle hashes."""
+    digest = new(ALGORITHM)
+    for name in sorted(files):
+        child = files[name]
+        digest.update(f'{len(name)}:{name}\0{child["hash"]}\0{child.get("merkle", "")}\n'.encode())
+    return digest.hexdigest()
+
+
+def hash_stream(f, algorithms, copy_to=None, head=b''):
+    """Hex digests of ``head`` plus everything left in ``f``, optionally copying the bytes to ``copy_to``."""
+    file_hash = MultiHash(algorithms)
+    file_hash.update(head)
+    if copy_to is not None:
+        copy_to.write(head)
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        file_hash.update(chunk)
+        if copy_to is not None:
+            copy_to.write(chunk)
+    return file_hash.hexdigests()
+
+
+def hash_file(path, algorithms):
+    """Hex digests of a file; large files are hashed through mmap instead of read() copies.
+
+    When the file cannot be mapped, e.g. in an archive worker whose address space is
+    limited below the file size, it is read in chunks instead.
+    """
+    file_hash = MultiHash(algorithms)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        mapped = None
+        if size >= MMAP_THRESHOLD:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except OSError:
+                mapped = None
+        if mapped is None:
+            _hash_chunks(f, file_hash)
+        else:
+            with mapped, memoryview(mapped) as view:
+                for offset in range(0, size, CHUNK_SIZE):
+                    file_hash.update(view[offset:offset + CHUNK_SIZE])
+    return file_hash.hexdigests()
+
+
+def _hash_chunks(f, file_hash):
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        read = f.readinto(buffer)
+        if not read:
+            break
+        file_hash.update(view[:read])
@@ -0,0 +1,166 @@
+import functools
+import logging
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limit import THROTTLE_STATUS, parse_retry_after
+
+
+logger = logging.getLogger('BoothChecker')
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# booth.pm, accounts.booth.pm, 다운로드 리다이렉트 대상 등 호스트별 풀 개수
+DEFAULT_POOL_HOSTS = 16
+GOVERNED_DOMAIN = 'booth.pm'
+
+
+def is_booth_url(url):
+    host = urlsplit(url).hostname or ''
+    return host == GOVERNED_DOMAIN or host.endswith('.' + GOVERNED_DOMAIN)
+
+
+class BoothSession:
+    """Thread-safe keep-alive session shared by every BOOTH request."""
+
+    def __init__(self, pool_size=2, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, governor=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.governor = governor
+        self.session = requests.Session()
+        # 계정별 쿠키는 요청마다 넘기므로, 응답 쿠키가 공유 세션에 남아 다른 계정 요청에 섞이지 않도록 막는다
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            # 429/503은 request()에서 governor를 거쳐 재시도한다
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=DEFAULT_POOL_HOSTS,
+            pool_maxsize=max(int(pool_size), 1),
+            max_retries=retry,
+        )
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        governed = self.governor is not None and is_booth_url(url)
+
+        for attempt in range(self.retries + 1):
+            if governed:
+                self.governor.acquire()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except BaseException:
+                    self.governor.release()
+                    raise
+                release = functools.partial(
+                    self.governor.release,
+                    response.status_code,
+                    response.elapsed.total_seconds(),
+                    parse_retry_after(response.headers.get('Retry-After')),
+                )
+                if kwargs.get('stream'):
+                    # 본문은 요청이 끝난 뒤에 받으므로 응답을 닫을 때까지 슬롯을 잡아 둔다
+                    _release_on_close(response, release)
+                else:
+                    release()
+            else:
+                response = self.session.request(method, url, **kwargs)
+
+            if response.status_code not in THROTTLE_STATUS or attempt == self.retries:
+                return response
+
+            response.close()
+            if not governed:
+                # governor가 없으면 Retry-After 또는 지수 백오프만큼 직접 대기
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                time.sleep(delay if delay is not None else self.backoff_factor * (2 ** attempt))
+            logger.info(f'{response.status_code} from {url}, retrying ({attempt + 1}/{self.retries})')
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Returns connection counters summed over the live per-host pools."""
+        opened = 0
+        requested = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requested += pool.num_requests
+        return {
+            'connections_opened': opened,
+            'connections_reused': max(requested - opened, 0),
+            'requests': requested,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+def _release_on_close(response, release):
+    """Calls release once, when the streamed response is closed."""
+    close = response.close
+    released = False
+
+    def close_and_release():
+        nonlocal released
+        try:
+            close()
+        finally:
+            if not released:
+                released = True
+                release()
+
+    response.close = close_and_release
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def init_session(pool_size=2, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, governor=None):
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = BoothSession(pool_size, timeout, retries, backoff_factor, governor)
+    return _session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = BoothSession()
+    return _session
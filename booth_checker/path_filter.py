@@ -0,0 +1,87 @@
+import fnmatch
+import re
+
+
+# 와일드카드가 시작되는 문자
+_WILDCARDS = ('*', '?', '[')
+
+
+def _literal_prefix(pattern):
+    indexes = [pattern.find(char) for char in _WILDCARDS if char in pattern]
+    return pattern[:min(indexes)] if indexes else pattern
+
+
+class PathFilter:
+    """Decides which files inside a download are tracked.
+
+    Paths start with the download's file name and use '/' between folders and archive
+    members, e.g. ``Avatar.zip/Assets/Body.fbx``. A glob without '/' is matched against
+    the file name, one with '/' against the whole path; ``*`` also matches '/' and
+    matching ignores case. A file is tracked when its name ends with one of ``suffixes``
+    (if any), it matches one of ``include`` (if any) and it matches none of ``exclude``.
+    Everything below an excluded folder or archive is excluded as well.
+    """
+
+    def __init__(self, include=(), exclude=(), suffixes=()):
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ())
+        self.suffixes = tuple(suffix.lower() for suffix in suffixes or ())
+        self._include = [self._compile(pattern) for pattern in self.include]
+        self._exclude = [self._compile(pattern) for pattern in self.exclude]
+        self._prefixes = [_literal_prefix(pattern.lower()) for pattern in self.include if '/' in pattern]
+
+    @staticmethod
+    def _compile(pattern):
+        return '/' in pattern, re.compile(fnmatch.translate(pattern), re.IGNORECASE)
+
+    @staticmethod
+    def _hit(patterns, path, name):
+        return any(regex.match(path if by_path else name) for by_path, regex in patterns)
+
+    @property
+    def active(self):
+        """False when every file is tracked."""
+        return bool(self.include or self.exclude or self.suffixes)
+
+    def key(self):
+        """Stable text describing the filter, for cache keys."""
+        if not self.active:
+            return ''
+        return repr((self.suffixes, self.include, self.exclude))
+
+    def excluded(self, path):
+        """True if path or one of the folders/archives it is in matches an exclude glob."""
+        if not self._exclude:
+            return False
+        parts = path.split('/')
+        for end in range(1, len(parts) + 1):
+            if self._hit(self._exclude, '/'.join(parts[:end]), parts[end - 1]):
+                return True
+        return False
+
+    def matches(self, path):
+        """True if the file at path is tracked."""
+        name = path.rsplit('/', 1)[-1]
+        if self.suffixes and not name.lower().endswith(self.suffixes):
+            return False
+        if self._include and not self._hit(self._include, path, name):
+            return False
+        return not self.excluded(path)
+
+    def may_contain(self, path):
+        """True if a tracked file could be below the folder or archive at path.
+
+        Only path globs can rule a folder out, by their text before the first wildcard.
+        """
+        if self.excluded(path):
+            return False
+        # 파일 이름 glob은 어느 폴더에서든 맞을 수 있다
+        if len(self._prefixes) < len(self.include) or not self.include:
+            return True
+        folder = path.lower() + '/'
+        return any(folder.startswith(prefix) or prefix.startswith(folder) for prefix in self._prefixes)
+
+
+def item_filter(include=None, exclude=None, fbx_only=False):
+    """The filter of one item: its globs, narrowed to .fbx files for fbx_only items."""
+    return PathFilter(include, exclude, ('.fbx',) if fbx_only else ())
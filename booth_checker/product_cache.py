@@ -0,0 +1,118 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import booth
+
+
+logger = logging.getLogger('BoothChecker')
+
+
+class ProductCache:
+    """Persistent TTL + LRU cache of author info keyed by product URL.
+
+    Entries older than ``ttl`` seconds are revalidated with ETag/Last-Modified, and the
+    least recently used rows beyond ``max_entries`` are evicted.
+    """
+
+    def __init__(self, path, ttl=86400, max_entries=2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS product_cache (
+                    url TEXT PRIMARY KEY,
+                    author_info TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL,
+                    accessed_at REAL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS product_cache_accessed_at ON product_cache (accessed_at)')
+
+    def __del__(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def get(self, url):
+        row, fresh = self._lookup(url)
+        if fresh:
+            return json.loads(row[0])
+
+        etag, last_modified = (row[1], row[2]) if row is not None else (None, None)
+        try:
+            result = booth.fetch_product(url, etag, last_modified)
+        except Exception as e:
+            logger.warning(f'Failed to fetch product page {url}: {e}')
+            return json.loads(row[0]) if row is not None else None
+        return self._resolve(url, row, *result)
+
+    async def get_async(self, url, fetch):
+        """Same as get(), with ``fetch(url, etag, last_modified)`` as a coroutine returning fetch_product's tuple."""
+        row, fresh = self._lookup(url)
+        if fresh:
+            return json.loads(row[0])
+
+        etag, last_modified = (row[1], row[2]) if row is not None else (None, None)
+        try:
+            result = await fetch(url, etag, last_modified)
+        except Exception as e:
+            logger.warning(f'Failed to fetch product page {url}: {e}')
+            return json.loads(row[0]) if row is not None else None
+        return self._resolve(url, row, *result)
+
+    def _lookup(self, url):
+        """Returns (row, fresh); row is None when the URL was never cached."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT author_info, etag, last_modified, fetched_at FROM product_cache WHERE url = ?', (url,)
+            ).fetchone()
+        if row is not None and now - row[3] < self.ttl:
+            self._touch(url, now, refreshed=False)
+            return row, True
+        return row, False
+
+    def _resolve(self, url, row, status, author_info, etag, last_modified):
+        now = time.time()
+        if status == 304 and row is not None:
+            self._touch(url, now, refreshed=True)
+            return json.loads(row[0])
+        if status != 200:
+            logger.warning(f'Product page {url} returned {status}')
+            return json.loads(row[0]) if row is not None else None
+
+        self._store(url, author_info, etag, last_modified, now)
+        return author_info
+
+    def _touch(self, url, now, refreshed):
+        with self.lock, self.conn:
+            if refreshed:
+                self.conn.execute('UPDATE product_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+            else:
+                self.conn.execute('UPDATE product_cache SET accessed_at = ? WHERE url = ?', (now, url))
+
+    def _store(self, url, author_info, etag, last_modified, now):
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO product_cache (url, author_info, etag, last_modified, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    author_info = excluded.author_info,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    fetched_at = excluded.fetched_at,
+                    accessed_at = excluded.accessed_at
+            ''', (url, json.dumps(author_info), etag, last_modified, now, now))
+            self.conn.execute('''
+                DELETE FROM product_cache WHERE url IN (
+                    SELECT url FROM product_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
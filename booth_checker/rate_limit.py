@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger('BoothChecker')
+
+THROTTLE_STATUS = (429, 503)
+
+
+class RateGovernor:
+    """Token bucket with AIMD feedback shared by every outbound booth.pm request.
+
+    The bucket refills at ``rate`` tokens per second and never holds more than
+    ``max_in_flight`` tokens. Each success adds ``increase_step`` to the rate up
+    to ``requests_per_second``; a throttled (429/503) or slow response halves it,
+    at most once per ``cooldown`` seconds. A throttled response also empties the
+    bucket and blocks new requests for Retry-After (or one interval at the new rate).
+    """
+
+    def __init__(self, requests_per_second=1.0, max_in_flight=2, min_rate=0.1,
+                 slow_response=5.0, increase_step=0.05, decrease_factor=0.5, cooldown=1.0):
+        if float(requests_per_second) <= 0 or float(min_rate) <= 0:
+            raise ValueError(f'requests_per_second and min_rate must be positive, got {requests_per_second} and {min_rate}')
+        self.max_rate = float(requests_per_second)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.slow_response = float(slow_response)
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.cooldown = float(cooldown)
+
+        self.rate = self.max_rate
+        self.in_flight = 0
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(float(self.max_in_flight), self._tokens + elapsed * self.rate)
+
+    def _try_acquire(self):
+        """Takes a slot if possible. Returns (acquired, seconds to wait or None until a release)."""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self._blocked_until:
+            return False, self._blocked_until - now
+        if self.in_flight >= self.max_in_flight:
+            return False, None
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.in_flight += 1
+            return True, 0.0
+        return False, (1.0 - self._tokens) / self.rate
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                acquired, wait = self._try_acquire()
+                if acquired:
+                    return
+                self._cond.wait(timeout=wait)
+
+    async def acquire_async(self, poll_interval=0.05):
+        """Same as acquire() for coroutines; sleeps on the event loop instead of blocking a thread."""
+        while True:
+            with self._cond:
+                acquired, wait = self._try_acquire()
+            if acquired:
+                return
+            await asyncio.sleep(poll_interval if wait is None else min(wait, 1.0))
+
+    def release(self, status=None, elapsed=None, retry_after=None):
+        with self._cond:
+            self.in_flight = max(self.in_flight - 1, 0)
+            now = time.monotonic()
+            throttled = status in THROTTLE_STATUS
+            slow = elapsed is not None and elapsed > self.slow_response
+
+            if throttled or slow:
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                    logger.warning(
+                        f"BOOTH {'throttled' if throttled else 'slow'} response "
+                        f"(status={status}, elapsed={elapsed}), rate lowered to {self.rate:.2f} req/s"
+                    )
+                if throttled:
+                    # 남은 토큰을 비우고 Retry-After가 없으면 낮춘 속도로 한 칸만큼 기다리게 한다
+                    self._tokens = 0.0
+                    retry_after = retry_after or 1.0 / self.rate
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            elif status is not None and status < 500:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Holds one request slot; the caller reports the outcome through the yielded dict."""
+        self.acquire()
+        outcome = {'status': None, 'elapsed': None, 'retry_after': None}
+        try:
+            yield outcome
+        finally:
+            self.release(outcome['status'], outcome['elapsed'], outcome['retry_after'])
+
+    def stats(self):
+        with self._cond:
+            return {'rate': self.rate, 'in_flight': self.in_flight}
+
+
+def parse_retry_after(value):
+    """Returns Retry-After in seconds; HTTP-date values are ignored."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
@@ -1,15 +1,4 @@
 import os.path
-import simdjson
-
-def createVersionFile(version_file_path):
-    with open(version_file_path, 'w') as f:
-        short_list = {
-            'short-list': [],
-            'files': {},
-            'name-list': [],
-            'fbx-files': {}
-        }
-        simdjson.dump(short_list, fp=f, indent=4)
 
 def createFolder(directory):
     try:
@@ -0,0 +1,67 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger('BoothChecker')
+
+
+class TreeCache:
+    """Persistent cache of the hashed file tree produced for each download number.
+
+    ``variant`` separates results that depend on how the file was processed
+    (full tree vs. FBX-only, zip filename encoding). Least recently used rows
+    beyond ``max_entries`` are evicted.
+    """
+
+    def __init__(self, path, max_entries=5000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS tree_cache (
+                    download_number TEXT,
+                    variant TEXT,
+                    entry TEXT,
+                    accessed_at REAL,
+                    PRIMARY KEY (download_number, variant)
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS tree_cache_accessed_at ON tree_cache (accessed_at)')
+
+    def __del__(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def get(self, download_number, variant):
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                'SELECT entry FROM tree_cache WHERE download_number = ? AND variant = ?', (download_number, variant)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                'UPDATE tree_cache SET accessed_at = ? WHERE download_number = ? AND variant = ?',
+                (time.time(), download_number, variant)
+            )
+        return json.loads(row[0])
+
+    def put(self, download_number, variant, entry):
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO tree_cache (download_number, variant, entry, accessed_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(download_number, variant) DO UPDATE SET
+                    entry = excluded.entry,
+                    accessed_at = excluded.accessed_at
+            ''', (download_number, variant, json.dumps(entry, ensure_ascii=False), time.time()))
+            self.conn.execute('''
+                DELETE FROM tree_cache WHERE rowid IN (
+                    SELECT rowid FROM tree_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger('BoothChecker')
+
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+
+class UploadQueue:
+    """Uploads changelog pages to S3 in the background.
+
+    Keys are derived from the page content, so an object that is already in the bucket
+    (checked with a HEAD request) or already queued is not uploaded again. Failed uploads
+    are retried with exponential backoff; at most ``workers`` run at the same time.
+    """
+
+    def __init__(self, uploader, bucket_name, workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF):
+        self.uploader = uploader
+        self.bucket_name = bucket_name
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-upload')
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def submit(self, key, body, content_encoding=None):
+        """Queues body for upload under key; returns a future that resolves to True if it was uploaded.
+
+        body is a file path or a seekable binary file object (see S3Uploader.upload); the file
+        has to stay in place, or the file object open, until the future is done.
+        """
+        with self.lock:
+            future = self.pending.get(key)
+            queued = future is None
+            if queued:
+                future = self.executor.submit(self._upload, key, body, content_encoding)
+                self.pending[key] = future
+        # 이미 끝난 future는 콜백을 바로 부르므로 잠금 밖에서 등록한다
+        if queued:
+            future.add_done_callback(lambda done: self._done(key, done))
+        return future
+
+    def _done(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+    def _upload(self, key, body, content_encoding):
+        for attempt in range(self.retries + 1):
+            try:
+                if self.uploader.exists(self.bucket_name, key):
+                    logger.debug(f'{key} is already in S3; skipping upload')
+                    return False
+                self.uploader.upload(body, self.bucket_name, key, content_encoding=content_encoding)
+                logger.info(f'Changelog uploaded to S3: {key}')
+                return True
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f'Error occurred while uploading {key} to S3: {e}')
+                    raise
+                delay = self.backoff_factor * 2 ** attempt
+                logger.warning(f'Upload of {key} failed ({e}); retrying in {delay:.1f}s')
+                time.sleep(delay)
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait)
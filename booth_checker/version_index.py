@@ -0,0 +1,59 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger('BoothChecker')
+
+
+def fingerprint(download_short_list):
+    """Hash of the whole sorted download-number list."""
+    digest = hashlib.blake2b(digest_size=16)
+    for download_number in sorted(str(number) for number in download_short_list):
+        digest.update(download_number.encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class VersionIndex:
+    """Maps each order to the fingerprint of the download list stored in its version file.
+
+    Lets the cycle decide "unchanged" without opening ./version/json/{order_num}.json.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS version_index (
+                    order_num TEXT PRIMARY KEY,
+                    fingerprint TEXT,
+                    updated_at REAL
+                )
+            ''')
+
+    def __del__(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def get(self, order_num):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT fingerprint FROM version_index WHERE order_num = ?', (str(order_num),)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, order_num, value):
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO version_index (order_num, fingerprint, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(order_num) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    updated_at = excluded.updated_at
+            ''', (str(order_num), value, time.time()))
@@ -0,0 +1,263 @@
+import logging
+import os
+import threading
+
+import simdjson
+from psycopg.types.json import Jsonb
+
+import booth_sql
+
+
+logger = logging.getLogger('BoothChecker')
+
+# version_nodes.kind: 'files' 트리와 fbx_only 아이템의 'fbx-files'
+TREE = 0
+FBX = 1
+
+
+def empty_version():
+    return {'short-list': [], 'name-list': [], 'files': {}, 'fbx-files': {}}
+
+
+def flatten(version_json):
+    """Rows of a saved version: {(kind, path): (hash, size, crc, merkle, file_count)}.
+
+    Tree nodes are keyed by their '/'-joined path below 'files'; fbx-files keep their own
+    keys, with the size and CRC32 from fbx-zip-info.
+    """
+    rows = {}
+
+    def walk(files, prefix):
+        for name, node in files.items():
+            path = f'{prefix}/{name}' if prefix else name
+            rows[(TREE, path)] = (node['hash'], node.get('size'), node.get('crc'), node.get('merkle'), node.get('file-count'))
+            walk(node.get('files') or {}, path)
+
+    walk(version_json.get('files') or {}, '')
+    zip_info = version_json.get('fbx-zip-info') or {}
+    for path, file_hash in (version_json.get('fbx-files') or {}).items():
+        size, crc = zip_info.get(path, (None, None))
+        rows[(FBX, path)] = (file_hash, size, crc, None, None)
+    return rows
+
+
+def unflatten(rows):
+    """Rebuilds 'files', 'fbx-files' and 'fbx-zip-info' from flatten() rows."""
+    version_json = {'files': {}, 'fbx-files': {}, 'fbx-zip-info': {}}
+    nodes = {}
+    # 상위 경로가 항상 먼저 오도록 정렬한다
+    for (kind, path), (file_hash, size, crc, merkle, file_count) in sorted(rows.items()):
+        if kind == FBX:
+            version_json['fbx-files'][path] = file_hash
+            if crc is not None:
+                version_json['fbx-zip-info'][path] = [size, crc]
+            continue
+        node = {'hash': file_hash}
+        if crc is not None:
+            node['size'], node['crc'] = size, crc
+        if merkle is not None:
+            node['merkle'] = merkle
+        if file_count is not None:
+            node['file-count'] = file_count
+        parent, _, name = path.rpartition('/')
+        siblings = nodes[parent].setdefault('files', {}) if parent else version_json['files']
+        siblings[name] = nodes[path] = node
+    if not version_json['fbx-zip-info']:
+        del version_json['fbx-zip-info']
+    return version_json
+
+
+def diff_rows(old, new):
+    """(added, changed, deleted) between two flatten() results; added and changed are dicts, deleted a list of keys."""
+    added = {key: value for key, value in new.items() if key not in old}
+    changed = {key: value for key, value in new.items() if key in old and old[key] != value}
+    deleted = [key for key in old if key not in new]
+    return added, changed, deleted
+
+
+class JsonVersionStore:
+    """Version state in ./version/json/{order_num}.json, rewritten as a whole on every save."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def file_path(self, order_num):
+        return os.path.join(self.path, f'{order_num}.json')
+
+    def exists(self, order_num):
+        return os.path.exists(self.file_path(order_num))
+
+    def load(self, order_num):
+        """The order's version, an empty one if it has none yet or the file is corrupted."""
+        path = self.file_path(order_num)
+        if not os.path.exists(path):
+            logger.info('version file not found, creating one.')
+            return empty_version()
+        try:
+            with open(path, 'r') as f:
+                return simdjson.load(f)
+        except ValueError:
+            logger.warning('version file corrupted, recreating.')
+            return empty_version()
+
+    def save(self, order_num, version_json):
+        with open(self.file_path(order_num), 'w') as f:
+            simdjson.dump(version_json, fp=f, indent=4)
+
+
+class PostgresVersionStore:
+    """Version state in Postgres, shared by every checker replica.
+
+    ``version_orders`` holds one row of metadata per order and ``version_nodes`` one row per
+    tracked file or folder (path, parent, name, hash, Merkle hash, file count and the zip member's size and CRC32).
+    save() only writes the rows that were added, changed or deleted since the stored version.
+    """
+
+    def __init__(self, conn_params):
+        self.lock = threading.Lock()
+        self.conn = booth_sql.connect_with_retry(conn_params)
+        self.conn.autocommit = True
+        with self.lock, self.conn.transaction(), self.conn.cursor() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS version_orders (
+                    booth_order_number TEXT PRIMARY KEY,
+                    short_list JSONB NOT NULL,
+                    name_list JSONB NOT NULL,
+                    hash_algorithm TEXT,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS version_nodes (
+                    booth_order_number TEXT REFERENCES version_orders(booth_order_number) ON DELETE CASCADE,
+                    kind SMALLINT,
+                    path TEXT,
+                    parent TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    size BIGINT,
+                    crc BIGINT,
+                    merkle TEXT,
+                    file_count INTEGER,
+                    PRIMARY KEY (booth_order_number, kind, path)
+                )
+            ''')
+            # 파일 수를 저장하기 전에 만든 테이블에도 컬럼을 추가한다
+            cursor.execute('ALTER TABLE version_nodes ADD COLUMN IF NOT EXISTS file_count INTEGER')
+            cursor.execute('CREATE INDEX IF NOT EXISTS version_nodes_name ON version_nodes (name)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS version_nodes_hash ON version_nodes (hash)')
+
+    def __del__(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def exists(self, order_num):
+        with self.lock, self.conn.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM version_orders WHERE booth_order_number = %s', (str(order_num),))
+            return cursor.fetchone() is not None
+
+    def _rows(self, cursor, order_num):
+        cursor.execute(
+            'SELECT kind, path, hash, size, crc, merkle, file_count FROM version_nodes WHERE booth_order_number = %s', (str(order_num),)
+        )
+        return {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+
+    def load(self, order_num):
+        with self.lock, self.conn.transaction(), self.conn.cursor() as cursor:
+            cursor.execute(
+                'SELECT short_list, name_list, hash_algorithm FROM version_orders WHERE booth_order_number = %s',
+                (str(order_num),)
+            )
+            order = cursor.fetchone()
+            if order is None:
+                logger.info('version not found, creating one.')
+                return empty_version()
+            rows = self._rows(cursor, order_num)
+
+        version_json = unflatten(rows)
+        version_json['short-list'], version_json['name-list'] = order[0], order[1]
+        if order[2] is not None:
+            version_json['hash-algorithm'] = order[2]
+        return version_json
+
+    def save(self, order_num, version_json):
+        order_num = str(order_num)
+        new = flatten(version_json)
+        with self.lock, self.conn.transaction(), self.conn.cursor() as cursor:
+            # 같은 주문을 다른 인스턴스가 동시에 저장하지 않도록 주문 행을 먼저 잠근다
+            cursor.execute('''
+                INSERT INTO version_orders (booth_order_number, short_list, name_list, hash_algorithm)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (booth_order_number) DO UPDATE SET
+                    short_list = excluded.short_list,
+                    name_list = excluded.name_list,
+                    hash_algorithm = excluded.hash_algorithm,
+                    updated_at = now()
+            ''', (order_num, Jsonb(version_json.get('short-list', [])), Jsonb(version_json.get('name-list', [])),
+                  version_json.get('hash-algorithm')))
+            added, changed, deleted = diff_rows(self._rows(cursor, order_num), new)
+
+            if deleted:
+                cursor.executemany(
+                    'DELETE FROM version_nodes WHERE booth_order_number = %s AND kind = %s AND path = %s',
+                    [(order_num, kind, path) for kind, path in deleted]
+                )
+            if added:
+                cursor.executemany('''
+                    INSERT INTO version_nodes (booth_order_number, kind, path, parent, name, hash, size, crc, merkle, file_count)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ''', [(order_num, kind, path, *_parent_and_name(path), *value) for (kind, path), value in added.items()])
+            if changed:
+                cursor.executemany('''
+                    UPDATE version_nodes SET hash = %s, size = %s, crc = %s, merkle = %s, file_count = %s
+                    WHERE booth_order_number = %s AND kind = %s AND path = %s
+                ''', [(*value, order_num, kind, path) for (kind, path), value in changed.items()])
+        logger.debug(f'version of {order_num}: {len(added)} added, {len(changed)} changed, {len(deleted)} deleted rows')
+
+    def orders_with_file(self, name=None, file_hash=None):
+        """(order number, kind, path) of every stored file named ``name`` and/or hashed ``file_hash``."""
+        conditions, params = [], []
+        if name is not None:
+            conditions.append('name = %s')
+            params.append(name)
+        if file_hash is not None:
+            conditions.append('hash = %s')
+            params.append(file_hash)
+        if not conditions:
+            raise ValueError('name or file_hash is required')
+        with self.lock, self.conn.cursor() as cursor:
+            cursor.execute(
+                f'SELECT booth_order_number, kind, path FROM version_nodes WHERE {" AND ".join(conditions)} ORDER BY 1, 3',
+                params
+            )
+            return cursor.fetchall()
+
+    def import_json(self, json_store):
+        """Copies the JSON version files of orders that are not stored yet; returns how many were imported."""
+        if not os.path.isdir(json_store.path):
+            return 0
+        with self.lock, self.conn.cursor() as cursor:
+            cursor.execute('SELECT booth_order_number FROM version_orders')
+            stored = {row[0] for row in cursor.fetchall()}
+
+        imported = 0
+        for entry in sorted(os.listdir(json_store.path)):
+            order_num, ext = os.path.splitext(entry)
+            if ext != '.json' or order_num in stored:
+                continue
+            try:
+                with open(json_store.file_path(order_num), 'r') as f:
+                    version_json = simdjson.load(f)
+            except ValueError:
+                logger.warning(f'skipping corrupted version file {entry}')
+                continue
+            self.save(order_num, version_json)
+            imported += 1
+        return imported
+
+
+def _parent_and_name(path):
+    parent, _, name = path.rpartition('/')
+    return parent, name
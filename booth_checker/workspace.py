@@ -0,0 +1,116 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+
+logger = logging.getLogger('BoothChecker')
+
+# clear()는 이 접두사로 시작하는 폴더만 지운다
+WORKSPACE_PREFIX = 'job-'
+
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class Workspace:
+    """Scratch directory of one item job.
+
+    Downloads go to ``download/``, extracted trees to ``process/`` and archives waiting to
+    be extracted over their own path to ``staging/``. Everything is on one filesystem, so
+    files move between them with os.replace instead of being copied.
+    """
+
+    def __init__(self, space, root):
+        self.space = space
+        self.root = root
+        self.download_dir = os.path.join(root, 'download')
+        self.process_dir = os.path.join(root, 'process')
+        self.staging_dir = os.path.join(root, 'staging')
+        for directory in (self.download_dir, self.process_dir, self.staging_dir):
+            os.makedirs(directory)
+
+    def download_path(self, filename):
+        return os.path.join(self.download_dir, filename)
+
+    def process_path(self, pathstr):
+        return os.path.join(self.process_dir, pathstr)
+
+    def staging_path(self, filename):
+        """A fresh path for moving ``filename`` out of the way while it is extracted."""
+        return os.path.join(self.staging_dir, f'{uuid.uuid4().hex}-{filename}')
+
+    def size(self):
+        return _tree_size(self.root)
+
+    def cleanup(self):
+        self.space._release(self)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+
+class ScratchSpace:
+    """Hands out a private Workspace per item job under ``path``.
+
+    With ``size_limit`` (bytes), jobs started while the live workspaces under ``path``
+    already hold that much are placed under ``overflow_path`` instead, so a small tmpfs
+    can be used without running it out of space. ``temp_dir`` is a spare directory on
+    the same filesystem as ``path``.
+    """
+
+    def __init__(self, path, size_limit=None, overflow_path=None):
+        self.path = os.path.abspath(path)
+        self.size_limit = size_limit
+        self.overflow_path = os.path.abspath(overflow_path) if overflow_path else self.path
+        self.temp_dir = os.path.join(self.path, 'tmp')
+        self.lock = threading.Lock()
+        self.active = []
+        for directory in (self.path, self.overflow_path, self.temp_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def clear(self):
+        """Removes workspaces left behind by a previous run; call once before any job starts."""
+        for directory in {self.path, self.overflow_path}:
+            for entry in os.scandir(directory):
+                if entry.name.startswith(WORKSPACE_PREFIX) and entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def usage(self):
+        """Bytes held by the live workspaces under ``path``."""
+        with self.lock:
+            workspaces = [workspace for workspace in self.active if workspace.root.startswith(self.path + os.sep)]
+        return sum(workspace.size() for workspace in workspaces)
+
+    def workspace(self, name):
+        """Creates the workspace for one job; use it as a context manager so it is always removed."""
+        parent = self.path
+        if self.size_limit is not None and self.overflow_path != self.path and self.usage() >= self.size_limit:
+            logger.info(f'scratch space {self.path} is full; using {self.overflow_path}')
+            parent = self.overflow_path
+
+        workspace = Workspace(self, tempfile.mkdtemp(prefix=f'{WORKSPACE_PREFIX}{name}-', dir=parent))
+        with self.lock:
+            self.active.append(workspace)
+        return workspace
+
+    def _release(self, workspace):
+        with self.lock:
+            if workspace in self.active:
+                self.active.remove(workspace)
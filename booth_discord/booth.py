@@ -1,9 +1,4 @@
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 
 class BoothCrawler():
@@ -11,6 +6,13 @@ class BoothCrawler():
         self.selenium_url = selenium_url
 
     def get_booth_order_info(self, item_number, cookie):
+        # selenium은 무거우므로 /item_add로 주문 정보를 처음 조회할 때 import한다
+        from selenium import webdriver
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--disable-gpu")
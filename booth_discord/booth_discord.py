@@ -6,6 +6,15 @@ from pytz import timezone
 from quart import Quart, request, jsonify
 import asyncio
 
+
+def parse_globs(text):
+    """Splits a comma separated glob list from a command option; None when empty."""
+    if not text:
+        return None
+    globs = [glob.strip() for glob in text.split(',') if glob.strip()]
+    return globs or None
+
+
 class DiscordBot(commands.Bot):
     def __init__(self, booth_db, logger, fbx_only, *args, **kwargs):
         intents = discord.Intents.default()
@@ -50,6 +59,8 @@ class DiscordBot(commands.Bot):
         @app_commands.describe(intent_encoding="아이템 이름의 인코딩 방식을 입력해주세요 (기본값: shift_jis)")
         @app_commands.describe(summary_this="업데이트 내용 요약 (기본값: True)")
         @app_commands.describe(fbx_only=f'FBX 변경점만 확인 (기본값: {str(self.fbx_only)})')
+        @app_commands.describe(include_globs="추적할 파일 패턴, 쉼표로 구분 (예: *.prefab, *.fbx)")
+        @app_commands.describe(exclude_globs="제외할 파일 패턴, 쉼표로 구분 (예: *.png, */Samples/*)")
         async def item_add(
             interaction: discord.Interaction,
             item_number: str,
@@ -57,7 +68,9 @@ class DiscordBot(commands.Bot):
             order_number: str = None,
             intent_encoding: str = "shift_jis",
             summary_this: bool = True,
-            fbx_only: bool = self.fbx_only
+            fbx_only: bool = self.fbx_only,
+            include_globs: str = None,
+            exclude_globs: str = None
         ):
             try:
                 await interaction.response.defer(ephemeral=True)
@@ -70,6 +83,8 @@ class DiscordBot(commands.Bot):
                     intent_encoding,
                     summary_this,
                     fbx_only,
+                    parse_globs(include_globs),
+                    parse_globs(exclude_globs),
                 )
                 self.logger.info(f"User {interaction.user.id} is adding item {item_number}")
                 await interaction.followup.send(f"[{item_number}] 등록 완료", ephemeral=True)
@@ -38,6 +38,13 @@ class BoothPostgres:
                     )
                 ''')
 
+                # 이전 버전에서 만든 테이블에도 경로 필터 컬럼을 추가
+                cursor.execute('''
+                    ALTER TABLE booth_items
+                        ADD COLUMN IF NOT EXISTS include_globs TEXT[],
+                        ADD COLUMN IF NOT EXISTS exclude_globs TEXT[]
+                ''')
+
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS discord_noti_channels (
                         discord_channel_id BIGINT,
@@ -100,7 +107,7 @@ class BoothPostgres:
                 ''', (session_cookie, discord_user_id))
         return self.get_booth_account(discord_user_id)
 
-    def add_booth_item(self, discord_user_id, discord_channel_id, booth_item_number, booth_order_number, item_name, intent_encoding, summary_this, fbx_only):
+    def add_booth_item(self, discord_user_id, discord_channel_id, booth_item_number, booth_order_number, item_name, intent_encoding, summary_this, fbx_only, include_globs=None, exclude_globs=None):
         booth_account = self.get_booth_account(discord_user_id)
         if self.is_item_duplicate(booth_item_number, discord_user_id):
             raise Exception("이미 등록된 아이템입니다.")
@@ -126,9 +133,11 @@ class BoothPostgres:
                                     archive_this,
                                     gift_item,
                                     summary_this,
-                                    fbx_only
+                                    fbx_only,
+                                    include_globs,
+                                    exclude_globs
                                     )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ''', (booth_order_info[1],  # booth_order_number
                       booth_item_number,
                       discord_user_id,
@@ -139,7 +148,9 @@ class BoothPostgres:
                       False,                # archive_this
                       booth_order_info[0],  # gift_item
                       summary_this,
-                      fbx_only))
+                      fbx_only,
+                      include_globs,
+                      exclude_globs))
                 self.add_discord_noti_channel(
                     discord_channel_id,
                     booth_order_info[1],
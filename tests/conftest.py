@@ -0,0 +1,18 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# booth_checker 모듈은 패키지가 아니라 폴더 안에서 서로 이름으로 import한다
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'booth_checker'), ROOT]
+
+
+@pytest.fixture(scope='session')
+def checker():
+    """booth_checker/__main__.py as a module; its config globals keep their defaults."""
+    spec = importlib.util.spec_from_file_location('booth_checker_main', os.path.join(ROOT, 'booth_checker', '__main__.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,93 @@
+import time
+import zipfile
+
+import archive_budget
+import archive_pool
+import archive_walker
+
+
+def test_unlimited():
+    budget = archive_budget.ArchiveBudget()
+    assert budget.charge(10 ** 12, 10 ** 6)
+    assert budget.allows_depth(100)
+    assert budget.exceeded is None
+
+
+def test_bytes_and_entries():
+    budget = archive_budget.ArchiveBudget(max_bytes=100, max_entries=3)
+    assert budget.charge(60)
+    assert budget.charge(40)
+    assert not budget.charge(1)
+    assert budget.exceeded == 'more than 100 bytes'
+
+    budget = archive_budget.ArchiveBudget(max_entries=2)
+    assert budget.charge(entries=2)
+    assert not budget.charge()
+    assert budget.exceeded == 'more than 2 entries'
+
+
+def test_stays_exceeded():
+    budget = archive_budget.ArchiveBudget(max_bytes=10)
+    assert not budget.charge(11)
+    budget.bytes = 0
+    assert not budget.check()
+
+
+def test_deadline():
+    budget = archive_budget.ArchiveBudget(max_seconds=0.01)
+    assert budget.check()
+    time.sleep(0.02)
+    assert not budget.check()
+    assert budget.exceeded == 'more than 0.01 seconds'
+
+
+def test_depth():
+    budget = archive_budget.ArchiveBudget(max_depth=2)
+    assert budget.allows_depth(2)
+    assert not budget.allows_depth(3)
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+
+
+def test_pool_walks_share_one_budget(tmp_path):
+    # 파일 하나는 한도 안이지만 두 파일을 합치면 넘는다
+    for name in ('a.zip', 'b.zip'):
+        write_zip(tmp_path / name, {f'{i}.txt': b'x' * 100 for i in range(3)})
+    pool = archive_pool.ArchivePool(workers=2, worker_memory=0)
+    try:
+        budget = pool.share(archive_budget.ArchiveBudget(max_bytes=500))
+        walks = [pool.submit(str(tmp_path / name), name, 'utf-8', algorithms=('md5',), budget=budget) for name in ('a.zip', 'b.zip')]
+        results = [walk.result() for walk in walks]
+        assert [complete for _, complete in results].count(False) == 1
+        assert budget.bytes > 500
+        assert not budget.check()
+        del walks, budget
+        assert len(pool.free_slots) == archive_pool.BUDGET_SLOTS
+    finally:
+        pool.shutdown()
+
+
+def test_shared_budget_keeps_usage(tmp_path):
+    pool = archive_pool.ArchivePool(workers=1, worker_memory=0)
+    try:
+        budget = archive_budget.ArchiveBudget(max_entries=5)
+        budget.charge(10, 2)
+        shared = pool.share(budget)
+        assert (shared.bytes, shared.entries) == (10, 2)
+        assert shared.charge(5, 3)
+        assert not shared.charge()
+    finally:
+        pool.shutdown()
+
+
+def test_walk_file_charges_members(tmp_path):
+    write_zip(tmp_path / 'a.zip', {'a.txt': b'x' * 10, 'b.txt': b'y' * 20})
+    budget = archive_budget.ArchiveBudget()
+    node, complete = archive_walker.walk_file(str(tmp_path / 'a.zip'), 'a.zip', 'utf-8', algorithms=('md5',), budget=budget)
+    assert complete
+    assert budget.bytes == 30
+    assert budget.entries == 2
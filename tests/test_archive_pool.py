@@ -0,0 +1,43 @@
+import os
+import time
+
+import pytest
+
+import archive_pool
+
+
+def crash(path, name):
+    if name == 'crash':
+        os._exit(1)
+    time.sleep(0.2)
+    return name
+
+
+@pytest.fixture
+def pool():
+    pool = archive_pool.ArchivePool(workers=2, worker_memory=0)
+    yield pool
+    pool.shutdown()
+
+
+def submit(pool, name):
+    return archive_pool._PendingWalk(pool, crash, (name, name))
+
+
+def test_walks_in_workers(pool):
+    assert submit(pool, 'a').result() == 'a'
+
+
+def test_only_the_crashing_file_fails(pool):
+    walks = [submit(pool, name) for name in ('a', 'crash', 'b', 'c', 'd')]
+    results = {}
+    for walk in walks:
+        try:
+            results[walk.args[1]] = walk.result()
+        except archive_pool.ArchiveWorkerError:
+            results[walk.args[1]] = None
+    assert results == {'a': 'a', 'crash': None, 'b': 'b', 'c': 'c', 'd': 'd'}
+    assert pool.restarts == 1
+    assert not pool.started
+    # 다시 만든 풀은 계속 쓸 수 있다
+    assert submit(pool, 'e').result() == 'e'
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import tarfile
+import zipfile
+
+import archive_budget
+import archive_walker
+
+
+def md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    return buffer.getvalue()
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def walk(tmp_path, name, data, **kwargs):
+    return archive_walker.walk_file(write(tmp_path, name, data), name, 'utf-8', algorithms=('md5',), **kwargs)
+
+
+def strip(node):
+    """Hashes and children only, without the zip size/CRC."""
+    result = {'hash': node['hash']}
+    if node.get('files'):
+        result['files'] = {name: strip(child) for name, child in node['files'].items()}
+    return result
+
+
+def test_plain_file_is_hashed_without_children(tmp_path):
+    node, complete = walk(tmp_path, 'readme.txt', b'hello')
+    assert complete and node == {'hash': md5(b'hello')}
+
+
+def test_zip_members_and_parent_folders(tmp_path):
+    data = zip_bytes({'Assets/': b'', 'Assets/Model/Body.fbx': b'fbx', 'readme.txt': b'hi'})
+    node, complete = walk(tmp_path, 'Avatar.zip', data)
+    assert complete
+    assert strip(node) == {'hash': md5(data), 'files': {
+        'Assets': {'hash': 'DIRECTORY', 'files': {
+            'Model': {'hash': 'DIRECTORY', 'files': {'Body.fbx': {'hash': md5(b'fbx')}}},
+        }},
+        'readme.txt': {'hash': md5(b'hi')},
+    }}
+    body = node['files']['Assets']['files']['Model']['files']['Body.fbx']
+    assert body['size'] == 3 and body['crc'] == zipfile.crc32(b'fbx')
+
+
+def test_nested_zip_is_opened_in_memory(tmp_path):
+    inner = zip_bytes({'model.fbx': b'inner'})
+    node, complete = walk(tmp_path, 'Outer.zip', zip_bytes({'Inner.zip': inner}))
+    assert complete
+    assert strip(node['files']['Inner.zip']) == {'hash': md5(inner), 'files': {'model.fbx': {'hash': md5(b'inner')}}}
+
+
+def test_unreadable_nested_zip_is_incomplete(tmp_path):
+    node, complete = walk(tmp_path, 'Outer.zip', zip_bytes({'Broken.zip': b'not a zip'}))
+    assert not complete
+    assert 'Broken.zip' not in node.get('files', {})
+
+
+def test_unsafe_member_paths_are_normalized(tmp_path):
+    node, _ = walk(tmp_path, 'Avatar.zip', zip_bytes({'../evil.txt': b'x', './a/./b.txt': b'y'}))
+    assert set(node['files']) == {'evil.txt', 'a'}
+    assert set(node['files']['a']['files']) == {'b.txt'}
+
+
+
+def test_members_with_same_size_and_crc_are_reused(tmp_path):
+    data = zip_bytes({'same.txt': b'same', 'edit.txt': b'new!'})
+    previous = {'files': {
+        # 해시가 다르게 기록되어 있으면 다시 해시하지 않았다는 뜻이다
+        'same.txt': {'hash': 'previous-same', 'size': 4, 'crc': zipfile.crc32(b'same')},
+        'edit.txt': {'hash': 'previous-edit', 'size': 4, 'crc': zipfile.crc32(b'old!')},
+    }}
+    budget = archive_budget.ArchiveBudget()
+    node, complete = walk(tmp_path, 'Avatar.zip', data, previous=[previous], budget=budget)
+    assert complete
+    assert node['files']['same.txt'] == {'hash': 'previous-same', 'size': 4, 'crc': zipfile.crc32(b'same')}
+    assert node['files']['edit.txt']['hash'] == md5(b'new!')
+    # 재사용한 파일은 풀지 않으므로 예산에서 차감하지 않는다
+    assert budget.bytes == 4
+
+
+def test_folders_are_not_reused(tmp_path):
+    data = zip_bytes({'Assets/a.txt': b'a'})
+    previous = {'files': {'Assets': {'hash': 'DIRECTORY', 'size': 0, 'crc': 0}}}
+    node, _ = walk(tmp_path, 'Avatar.zip', data, previous=[previous])
+    assert strip(node['files']['Assets']) == {'hash': 'DIRECTORY', 'files': {'a.txt': {'hash': md5(b'a')}}}
+
+
+def test_truncated_nested_archive_is_not_reused(tmp_path):
+    inner = zip_bytes({'model.fbx': b'inner'})
+    data = zip_bytes({'Inner.zip': inner})
+    first, complete = walk(tmp_path, 'Outer.zip', data, budget=archive_budget.ArchiveBudget(max_depth=1))
+    assert not complete
+    inner_node = first['files']['Inner.zip']
+    assert inner_node['truncated'] and 'crc' not in inner_node
+
+    second, complete = walk(tmp_path, 'Outer.zip', data, previous=[first])
+    assert complete
+    assert strip(second['files']['Inner.zip']) == {'hash': md5(inner), 'files': {'model.fbx': {'hash': md5(b'inner')}}}
+    assert second['files']['Inner.zip']['crc'] == zipfile.crc32(inner)
+
+    # 끝까지 읽은 중첩 압축 파일은 내용과 함께 재사용한다
+    third, _ = walk(tmp_path, 'Outer.zip', data, previous=[second])
+    assert third['files']['Inner.zip'] == second['files']['Inner.zip']
+
+
+def unitypackage_bytes(assets, pathname_first=False):
+    """assets: {guid: (pathname, data or None)}; data None leaves the GUID without an asset."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as package:
+        def add(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            package.addfile(info, io.BytesIO(data))
+
+        for guid, (pathname, data) in assets.items():
+            entries = [('pathname', pathname.encode() + b'\n00')]
+            if data is not None:
+                entries.append(('asset', data))
+            if not pathname_first:
+                entries.reverse()
+            for entry, content in entries:
+                add(f'{guid}/{entry}', content)
+    return buffer.getvalue()
+
+
+def test_unitypackage_assets_by_pathname(tmp_path):
+    data = unitypackage_bytes({
+        'a1': ('Assets/Avatar/Body.fbx', b'body'),
+        'a2': ('Assets/Avatar/Mat.mat', b'mat'),
+        'a3': ('Assets/Avatar', None),
+    })
+    node, complete = walk(tmp_path, 'Avatar.unitypackage', data)
+    assert complete
+    assert strip(node) == {'hash': md5(data), 'files': {
+        'Assets': {'hash': 'DIRECTORY', 'files': {
+            'Avatar': {'hash': 'DIRECTORY', 'files': {
+                'Body.fbx': {'hash': md5(b'body')},
+                'Mat.mat': {'hash': md5(b'mat')},
+            }},
+        }},
+    }}
+
+
+def test_unitypackage_pathname_order_does_not_matter(tmp_path):
+    assets = {'a1': ('Assets/Body.fbx', b'body')}
+    after, _ = walk(tmp_path, 'A.unitypackage', unitypackage_bytes(assets))
+    before, _ = walk(tmp_path, 'B.unitypackage', unitypackage_bytes(assets, pathname_first=True))
+    assert strip(after)['files'] == strip(before)['files']
+
+
+def test_zip_inside_unitypackage(tmp_path):
+    inner = zip_bytes({'model.fbx': b'inner'})
+    node, complete = walk(tmp_path, 'Avatar.unitypackage', unitypackage_bytes({'a1': ('Assets/Extra.zip', inner)}))
+    assert complete
+    assert strip(node['files']['Assets']['files']['Extra.zip']) == {'hash': md5(inner), 'files': {'model.fbx': {'hash': md5(b'inner')}}}
+
+
+def test_unitypackage_assets_outside_the_package_are_skipped(tmp_path):
+    node, complete = walk(tmp_path, 'Avatar.unitypackage', unitypackage_bytes({'a1': ('../outside.txt', b'x'), 'a2': ('/abs.txt', b'y')}))
+    assert complete and not node.get('files')
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import threading
+
+from aiohttp import web
+
+import async_engine
+import rate_limit
+
+PAYLOAD = bytes(range(256)) * 4096
+
+
+async def serve_payload(request):
+    start = 0
+    if 'Range' in request.headers:
+        start = int(request.headers['Range'].split('=')[1].rstrip('-'))
+        return web.Response(
+            status=206, body=PAYLOAD[start:], content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}'},
+        )
+    return web.Response(body=PAYLOAD, content_type='application/octet-stream')
+
+
+async def download(tmp_path, partial=b''):
+    app = web.Application()
+    app.router.add_get('/file', serve_payload)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    filepath = tmp_path / 'Avatar.zip'
+    part_path = f'{filepath}.part'
+    if partial:
+        with open(part_path, 'wb') as f:
+            f.write(partial)
+
+    loop_thread = threading.get_ident()
+    blocking_threads = []
+
+    async def run_blocking(func, *args):
+        def call():
+            blocking_threads.append(threading.get_ident())
+            return func(*args)
+        return await asyncio.to_thread(call)
+
+    try:
+        async with async_engine.AsyncBoothClient() as client:
+            digest = await client._download_once(f'http://127.0.0.1:{port}/file', str(filepath), part_path, None, run_blocking)
+    finally:
+        await runner.cleanup()
+    return filepath, digest, loop_thread, blocking_threads
+
+
+def test_download_writes_off_the_event_loop(tmp_path):
+    filepath, digest, loop_thread, blocking_threads = asyncio.run(download(tmp_path))
+    assert filepath.read_bytes() == PAYLOAD
+    assert digest == hashlib.md5(PAYLOAD).hexdigest()
+    assert blocking_threads and loop_thread not in blocking_threads
+
+
+def test_resumed_download_hashes_existing_part(tmp_path):
+    filepath, digest, _, _ = asyncio.run(download(tmp_path, PAYLOAD[:1000]))
+    assert filepath.read_bytes() == PAYLOAD
+    assert digest == hashlib.md5(PAYLOAD).hexdigest()
+
+
+async def serve(handlers, scenario):
+    app = web.Application()
+    for method, path, handler in handlers:
+        app.router.add_route(method, path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(f'http://127.0.0.1:{port}')
+    finally:
+        await runner.cleanup()
+
+
+def test_governor_slot_is_held_until_the_body_is_read(monkeypatch):
+    monkeypatch.setattr(async_engine, 'is_booth_url', lambda url: True)
+    governor = rate_limit.RateGovernor(requests_per_second=1000.0, max_in_flight=2)
+
+    async def scenario(base):
+        async with async_engine.AsyncBoothClient(governor=governor) as client:
+            async with client.request('GET', f'{base}/file') as response:
+                in_flight = governor.stats()['in_flight']
+                body = await response.read()
+        return in_flight, body
+
+    in_flight, body = asyncio.run(serve([('GET', '/file', serve_payload)], scenario))
+    assert in_flight == 1
+    assert body == PAYLOAD
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_post_is_not_retried_after_a_server_error():
+    calls = []
+
+    async def fail(request):
+        calls.append(request.method)
+        return web.Response(status=502)
+
+    async def scenario(base):
+        async with async_engine.AsyncBoothClient(backoff_factor=0) as client:
+            return await client.post_json(f'{base}/send', {'a': 1})
+
+    status, _ = asyncio.run(serve([('POST', '/send', fail)], scenario))
+    assert status == 502
+    assert calls == ['POST']
+
+
+def test_post_is_retried_after_throttle_with_retry_after():
+    calls = []
+
+    async def throttle_once(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        return web.Response(text='ok')
+
+    async def scenario(base):
+        async with async_engine.AsyncBoothClient(backoff_factor=0) as client:
+            return await client.post_json(f'{base}/send', {'a': 1})
+
+    assert asyncio.run(serve([('POST', '/send', throttle_once)], scenario)) == (200, 'ok')
+    assert len(calls) == 2
+
+
+def test_get_is_retried_after_a_server_error():
+    calls = []
+
+    async def fail_once(request):
+        calls.append(request.method)
+        return web.Response(status=502 if len(calls) == 1 else 200, text='ok')
+
+    async def scenario(base):
+        async with async_engine.AsyncBoothClient(backoff_factor=0) as client:
+            status, _, body = await client.get_bytes(f'{base}/page')
+            return status, body
+
+    assert asyncio.run(serve([('GET', '/page', fail_once)], scenario)) == (200, b'ok')
+    assert len(calls) == 2
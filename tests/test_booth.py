@@ -0,0 +1,72 @@
+import pytest
+from bs4 import BeautifulSoup
+
+import booth
+
+
+def download_div(html):
+    return BeautifulSoup(f'<div>{html}</div>', 'html.parser').div
+
+
+def extract(html, selectors):
+    return booth._extract_download_info(download_div(html), selectors['download_link_selector'], selectors['filename_selector'])
+
+
+def test_order_page_download_button():
+    div = '<div class="flex-[1]"><b>Avatar.zip</b></div><div class="js-download-button" data-href="https://booth.pm/downloadables/4242"></div>'
+    assert extract(div, booth.ORDER_SELECTORS) == ['4242', 'Avatar.zip']
+
+
+def test_anchor_without_download_path_is_skipped():
+    div = '<div class="flex-[1]"><b>Avatar.zip</b></div><a class="nav-reverse" href="https://booth.pm/ja/items/123">item</a>'
+    assert extract(div, booth.ORDER_SELECTORS) is None
+
+
+def test_library_anchor_href():
+    div = '<div class="typography-14 !preserve-half-leading">Avatar.zip</div><a href="https://booth.pm/downloadables/777">DL</a>'
+    assert extract(div, booth.LIBRARY_SELECTORS) == ['777', 'Avatar.zip']
+
+
+def test_set_parser_backend_rejects_unknown_backend():
+    previous = booth.PARSER_BACKEND
+    try:
+        with pytest.raises(ValueError):
+            booth.set_parser_backend('lxlm')
+        booth.set_parser_backend('html.parser')
+        assert booth.PARSER_BACKEND == 'html.parser'
+    finally:
+        booth.PARSER_BACKEND = previous
+
+
+def library(monkeypatch, pages):
+    requested = []
+
+    class Session:
+        def get(self, url, cookies=None):
+            requested.append(url)
+            return type('Response', (), {'content': url})()
+
+    def parse_products(url, selectors, cache_key=None):
+        page = int(url.rsplit('=', 1)[1])
+        return [
+            {'url': f'https://booth.pm/ja/items/{number}', 'name': f'item {number}', 'thumb': None, 'downloads': [('1', f'{number}.zip')]}
+            for number in (pages[page - 1] if page <= len(pages) else [])
+        ]
+
+    monkeypatch.setattr(booth, 'get_session', Session)
+    monkeypatch.setattr(booth, '_parse_products', parse_products)
+    return requested
+
+
+def test_library_duplicate_on_later_page_is_ambiguous(monkeypatch):
+    requested = library(monkeypatch, [['1', '2'], ['3'], ['1']])
+    result = booth.crawling_library({}, ['1', '2'])
+    assert set(result) == {'2'}
+    assert result['2'][0] == [['1', '2.zip']]
+    assert len(requested) == 4
+
+
+def test_library_past_max_pages_is_not_used(monkeypatch):
+    library(monkeypatch, [['1'], ['2'], ['3']])
+    assert booth.crawling_library({}, ['1'], max_pages=2) == {}
+    assert set(booth.crawling_library({}, ['1'], max_pages=3)) == {'1'}
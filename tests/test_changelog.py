@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import diff_tree
+import upload_queue
+
+
+class FakeUploader:
+    def __init__(self, fail=False):
+        self.objects = {}
+        self.fail = fail
+        self.release = threading.Event()
+
+    def exists(self, bucket_name, key):
+        return key in self.objects
+
+    def upload(self, body, bucket_name, key, content_encoding=None):
+        self.release.wait()
+        if self.fail:
+            raise RuntimeError('boom')
+        if isinstance(body, str):
+            with open(body, 'rb') as f:
+                self.objects[key] = (f.read(), content_encoding)
+        else:
+            body.seek(0)
+            self.objects[key] = (body.read(), content_encoding)
+
+
+@pytest.fixture
+def publish(checker, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.symlink(os.path.join(os.path.dirname(__file__), '..', 'templates'), 'templates')
+    os.mkdir('changelog')
+    uploader = FakeUploader()
+    queue = upload_queue.UploadQueue(uploader, 'bucket', retries=0)
+    for name, value in {
+        'DRY_RUN': False, 'upload_queue': queue, 's3': {'bucket_access_url': 'cdn.example'},
+        'changelog_compact': False, 'changelog_node_budget': None,
+        'changelog_encoding': 'gzip', 'changelog_keep_local': False,
+    }.items():
+        monkeypatch.setattr(checker, name, value, raising=False)
+    yield uploader
+    uploader.release.set()
+    queue.close()
+
+
+def diff():
+    return diff_tree.from_paths([('Body.fbx', diff_tree.CHANGED)])
+
+
+def test_publish_does_not_wait_for_upload(checker, publish):
+    path, s3_upload = checker.publish_changelog(diff(), [])
+    assert path is None and not s3_upload.done()
+    # keep_local이 꺼져 있으면 changelog/에 쓰지 않는다
+    assert os.listdir('changelog') == []
+
+    publish.release.set()
+    url = s3_upload.result(timeout=5)
+    [(key, (body, encoding))] = publish.objects.items()
+    assert url == f'https://cdn.example/{key}'
+    assert encoding == 'gzip'
+    assert key == f'changelog/{hashlib.sha256(gzip.decompress(body)).hexdigest()}.html'
+
+
+def test_publish_keeps_local_copy(checker, publish, monkeypatch):
+    monkeypatch.setattr(checker, 'changelog_keep_local', True)
+    path, s3_upload = checker.publish_changelog(diff(), [])
+    publish.release.set()
+    assert s3_upload.result(timeout=5) == f'https://cdn.example/{path}'
+    assert sorted(os.listdir('changelog')) == [os.path.basename(path), os.path.basename(path) + '.gz']
+    with open(path + '.gz', 'rb') as f:
+        assert publish.objects[path] == (f.read(), 'gzip')
+
+
+def test_failed_upload_resolves_without_url(checker, publish):
+    publish.fail = True
+    publish.release.set()
+    _, s3_upload = checker.publish_changelog(diff(), [])
+    assert s3_upload.result(timeout=5) is None
+
+
+def test_notify_after_upload(checker):
+    sent = []
+    checker.notify_after_upload(None, sent.append)
+    assert sent == [None]
+
+    s3_upload = Future()
+    checker.notify_after_upload(s3_upload, sent.append)
+    assert sent == [None]
+    s3_upload.set_result('https://cdn.example/changelog/a.html')
+    assert sent == [None, 'https://cdn.example/changelog/a.html']
+
+
+def test_notify_after_upload_logs_failures(checker, caplog):
+    def notify(s3_object_url):
+        raise RuntimeError('discord is down')
+
+    s3_upload = Future()
+    checker.notify_after_upload(s3_upload, notify)
+    s3_upload.set_result(None)
+    assert 'Failed to send the Discord notification' in caplog.text
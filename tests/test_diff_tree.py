@@ -0,0 +1,159 @@
+import diff_tree
+
+
+def node(file_hash, mark=None, files=None, **extra):
+    result = {'hash': file_hash, **extra}
+    if mark is not None:
+        result['mark_as'] = mark
+    if files is not None:
+        result['files'] = files
+    return result
+
+
+def names(diff):
+    return {child.name: (child.status, child.old_name) for child in diff.children.values()}
+
+
+def test_statuses():
+    version = node('DIRECTORY', files={
+        'same.txt': node('a', 0),
+        'new.txt': node('b', 1),
+        'old.txt': node('c', 2),
+        'edit.txt': node('d', 3),
+    })
+    diff = diff_tree.from_version_tree(version, {'c': 'old.txt'})
+    assert names(diff) == {
+        'same.txt': (diff_tree.UNCHANGED, None),
+        'new.txt': (diff_tree.ADDED, None),
+        'old.txt': (diff_tree.DELETED, None),
+        'edit.txt': (diff_tree.CHANGED, None),
+    }
+
+
+def test_rename_detaches_deleted_file():
+    version = node('DIRECTORY', files={
+        'Body_v2.fbx': node('h', 1),
+        'Body.fbx': node('h', 2),
+    })
+    diff = diff_tree.from_version_tree(version, {'h': 'Body.fbx'})
+    assert names(diff) == {'Body_v2.fbx': (diff_tree.RENAMED, 'Body.fbx')}
+    assert diff.children['Body_v2.fbx'].label() == 'Body.fbx → Body_v2.fbx'
+
+
+def test_move_keeps_name_and_detaches_old_place():
+    version = node('DIRECTORY', files={
+        'A': node('DIRECTORY', 0, {'Body.fbx': node('h', 2)}),
+        'B': node('DIRECTORY', 1, {'Body.fbx': node('h', 1)}),
+    })
+    diff = diff_tree.from_version_tree(version, {'h': 'Body.fbx'})
+    assert diff.children['A'].children == {}
+    assert names(diff.children['B']) == {'Body.fbx': (diff_tree.ADDED, None)}
+
+
+def test_legacy_hash_is_compared():
+    version = node('DIRECTORY', files={
+        'new.txt': node('new-algo', 1, **{'legacy-hash': 'md5'}),
+        'old.txt': node('md5', 2),
+    })
+    diff = diff_tree.from_version_tree(version, {'md5': 'old.txt'})
+    assert names(diff) == {'new.txt': (diff_tree.RENAMED, 'old.txt')}
+
+
+def test_unchanged_subtree_is_pruned():
+    version = node('DIRECTORY', files={
+        'Same.zip': node('z', 0, {'a.txt': node('a'), 'b.txt': node('b')}, **{diff_tree.UNCHANGED_SUBTREE: True}),
+        'Same.txt': node('t', 0, **{diff_tree.UNCHANGED_SUBTREE: True}),
+        'New.zip': node('n', 1, {'c.txt': node('c', 1)}),
+    })
+    diff = diff_tree.from_version_tree(version, {})
+    same = diff.children['Same.zip']
+    assert same.pruned and same.children == {}
+    assert same.label() == 'Same.zip (unchanged)'
+    assert not diff.children['Same.txt'].pruned
+    assert names(diff.children['New.zip']) == {'c.txt': (diff_tree.ADDED, None)}
+    assert diff.size() == 5
+
+
+def test_compact_folds_unchanged():
+    version = node('DIRECTORY', files={
+        'Same': node('DIRECTORY', 0, {'a.txt': node('a', 0), 'b.txt': node('b', 0)}),
+        'Mixed': node('DIRECTORY', 0, {'c.txt': node('c', 0), 'd.txt': node('d', 0), 'e.txt': node('e', 3)}),
+    })
+    diff = diff_tree.from_version_tree(version, {})
+    assert diff_tree.compact(diff) == 0
+    assert diff.children['Same'].label() == 'Same (2 unchanged)'
+    assert diff.children['Same'].children == {}
+    mixed = diff.children['Mixed']
+    assert sorted(child.label() for child in mixed.children.values()) == ['e.txt (Changed)', '… 2 unchanged']
+
+
+def test_count_files_uses_stored_counts():
+    assert diff_tree.count_files(node('a')) == 0
+    tree = node('z', files={
+        'Old': node('DIRECTORY', files={'a.txt': node('a'), 'b.txt': node('b'), 'Empty': node('DIRECTORY')}),
+        'Counted': node('DIRECTORY', files={'c.txt': node('c')}, **{'file-count': 7}),
+    })
+    assert diff_tree.count_files(tree) == 10
+    assert diff_tree.count_files(dict(tree, **{'file-count': 4})) == 4
+
+
+def test_compact_counts_pruned_subtrees():
+    kept = {diff_tree.UNCHANGED_SUBTREE: True}
+    version = node('DIRECTORY', files={
+        'Same.zip': node('z', 0, {f'{i}.txt': node(str(i)) for i in range(5)}, **kept),
+        'Stored.zip': node('s', 0, {'a.txt': node('a')}, **kept, **{'file-count': 12}),
+        'Mixed': node('DIRECTORY', 0, {
+            'Inner.zip': node('i', 0, {'b.txt': node('b'), 'c.txt': node('c')}, **kept),
+            'd.txt': node('d', 0),
+            'e.txt': node('e', 3),
+        }),
+    })
+    diff = diff_tree.from_version_tree(version, {})
+    diff_tree.compact(diff)
+    assert diff.children['Same.zip'].label() == 'Same.zip (5 unchanged)'
+    assert diff.children['Stored.zip'].label() == 'Stored.zip (12 unchanged)'
+    mixed = diff.children['Mixed']
+    assert sorted(child.label() for child in mixed.children.values()) == [
+        'Inner.zip (2 unchanged)', 'e.txt (Changed)', '… 1 unchanged',
+    ]
+
+    folded = diff_tree.from_version_tree(node('DIRECTORY', files={'Outer': node('DIRECTORY', 0, {
+        'Inner.zip': node('i', 0, {'b.txt': node('b'), 'c.txt': node('c')}, **kept),
+        'd.txt': node('d', 0),
+    })}), {})
+    diff_tree.compact(folded)
+    assert folded.children['Outer'].label() == 'Outer (3 unchanged)'
+
+
+def test_compact_node_budget_drops_rest():
+    diff = diff_tree.from_paths([(f'{i}.txt', diff_tree.ADDED) for i in range(5)])
+    assert diff_tree.compact(diff, node_budget=2) == 3
+    assert list(diff.children) == ['0.txt', '1.txt']
+
+
+def test_html_and_text():
+    version = node('DIRECTORY', files={
+        'A': node('DIRECTORY', 0, {'<b>.txt': node('b', 1)}),
+        'c.txt': node('c', 0),
+    })
+    diff = diff_tree.from_version_tree(version, {})
+    chunks = list(diff_tree.iter_html(diff))
+    page = ''.join(chunks)
+    assert len(chunks) > 1
+    assert page == diff_tree.to_html(diff)
+    assert '&lt;b&gt;.txt (Added)' in page
+    assert page.count('<ul>') == page.count('</ul>') == 2
+    assert page.count('<li>') == page.count('</li>') == 3
+    assert diff_tree.to_text(diff) == '<b>.txt (Added)\n'
+
+
+def test_deep_tree_does_not_recurse():
+    version = node('DIRECTORY', files={})
+    current = version
+    for _ in range(5000):
+        child = node('DIRECTORY', 1, {})
+        current['files']['d'] = child
+        current = child
+    diff = diff_tree.from_version_tree(version, {})
+    assert diff.size() == 5001
+    assert diff_tree.to_html(diff).count('<ul>') == 5000
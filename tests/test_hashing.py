@@ -0,0 +1,75 @@
+import hashlib
+import mmap
+
+import pytest
+
+import archive_walker
+import hashing
+
+
+@pytest.fixture
+def blake2b():
+    previous = hashing.ALGORITHM
+    hashing.set_algorithm('blake2b')
+    yield
+    hashing.ALGORITHM = previous
+
+
+def test_hash_file_small_and_mapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(hashing, 'MMAP_THRESHOLD', 16)
+    for data in (b'small', bytes(range(256)) * 100):
+        path = tmp_path / 'file'
+        path.write_bytes(data)
+        assert hashing.hash_file(str(path), ('md5', 'sha256')) == (hashlib.md5(data).hexdigest(), hashlib.sha256(data).hexdigest())
+
+
+def test_hash_file_falls_back_when_mmap_fails(tmp_path, monkeypatch):
+    # RLIMIT_AS가 걸린 아카이브 워커에서는 큰 파일을 mmap할 수 없다
+    def no_memory(*args, **kwargs):
+        raise OSError(12, 'Cannot allocate memory')
+
+    monkeypatch.setattr(hashing, 'MMAP_THRESHOLD', 16)
+    monkeypatch.setattr(mmap, 'mmap', no_memory)
+    data = b'x' * (3 * hashing.CHUNK_SIZE + 7)
+    path = tmp_path / 'big.bin'
+    path.write_bytes(data)
+    assert hashing.hash_file(str(path), ('md5',)) == (hashlib.md5(data).hexdigest(),)
+
+
+def test_set_algorithm_rejects_unknown():
+    with pytest.raises(ValueError):
+        hashing.set_algorithm('no-such-hash')
+
+
+def test_hash_algorithms_migrates_from_stored_algorithm(checker, blake2b):
+    # 알고리즘 기록이 없는 예전 버전 파일은 md5로 기록된 것으로 본다
+    assert checker.hash_algorithms({'files': {'a': {'hash': 'h'}}}) == ('blake2b', 'md5')
+    assert checker.hash_algorithms({'files': {}, 'fbx-files': {'a.fbx': 'h'}}) == ('blake2b', 'md5')
+    assert checker.hash_algorithms({'hash-algorithm': 'sha256', 'files': {}}) == ('blake2b', 'sha256')
+    assert checker.hash_algorithms({'hash-algorithm': 'blake2b', 'files': {'a': {'hash': 'h'}}}) == ('blake2b',)
+    assert checker.hash_algorithms(checker.version_store_module.empty_version()) == ('blake2b',)
+
+
+def test_record_node_compares_with_legacy_hash(checker):
+    version = {'files': {'same.txt': {'hash': 'md5-same'}, 'edit.txt': {'hash': 'md5-old'}}}
+    checker.record_node(version, ['same.txt'], 'new-same', 'md5-same')
+    checker.record_node(version, ['edit.txt'], 'new-edit', 'md5-edit')
+    checker.record_node(version, ['added.txt'], 'new-added', 'md5-added')
+    files = version['files']
+    assert files['same.txt'] == {'hash': 'new-same', 'mark_as': 0, 'legacy-hash': 'md5-same'}
+    assert files['edit.txt'] == {'hash': 'new-edit', 'mark_as': 3, 'legacy-hash': 'md5-edit'}
+    assert files['added.txt'] == {'hash': 'new-added', 'mark_as': 1, 'legacy-hash': 'md5-added'}
+
+    checker.cleanup_version_json(files)
+    assert files['same.txt'] == {'hash': 'new-same'}
+
+
+def test_walk_file_records_legacy_hash(tmp_path):
+    path = tmp_path / 'readme.txt'
+    path.write_bytes(b'hello')
+    node, complete = archive_walker.walk_file(str(path), 'readme.txt', 'utf-8', algorithms=('blake2b', 'md5'))
+    assert complete
+    assert node == {'hash': hashlib.blake2b(b'hello').hexdigest(), 'legacy-hash': hashlib.md5(b'hello').hexdigest()}
+    # 알고리즘이 둘이면 다운로드 중 계산한 해시를 쓰지 않는다
+    node, _ = archive_walker.walk_file(str(path), 'readme.txt', 'utf-8', filehash='stale', algorithms=('blake2b', 'md5'))
+    assert node['hash'] == hashlib.blake2b(b'hello').hexdigest()
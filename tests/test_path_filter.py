@@ -0,0 +1,62 @@
+import path_filter
+
+
+def test_empty_filter_tracks_everything():
+    f = path_filter.PathFilter()
+    assert not f.active
+    assert f.key() == ''
+    assert f.matches('a.zip/Assets/Body.fbx')
+    assert f.may_contain('a.zip/Assets')
+
+
+def test_name_glob_matches_any_folder():
+    f = path_filter.PathFilter(include=['*.FBX'])
+    assert f.matches('a.zip/Assets/Body.fbx')
+    assert f.matches('Body.fbx')
+    assert not f.matches('a.zip/Assets/Body.png')
+    # 이름 glob은 어느 폴더에서든 맞을 수 있다
+    assert f.may_contain('a.zip/Textures')
+
+
+def test_path_glob_prunes_folders():
+    f = path_filter.PathFilter(include=['a.zip/Assets/Models/*'])
+    assert f.matches('a.zip/Assets/Models/Body.fbx')
+    # *는 /도 포함한다
+    assert f.matches('a.zip/Assets/Models/Sub/Body.fbx')
+    assert not f.matches('a.zip/Assets/Textures/Body.png')
+    assert f.may_contain('a.zip')
+    assert f.may_contain('a.zip/Assets')
+    assert f.may_contain('a.zip/Assets/Models/Sub')
+    assert not f.may_contain('a.zip/Assets/Textures')
+    assert not f.may_contain('b.zip')
+
+
+def test_exclude_covers_everything_below():
+    f = path_filter.PathFilter(exclude=['Textures', '*.psd'])
+    assert f.active
+    assert f.matches('a.zip/Assets/Body.fbx')
+    assert not f.matches('a.zip/Assets/Body.psd')
+    assert not f.matches('a.zip/Textures/Body.png')
+    assert not f.matches('a.zip/Textures/inner.zip/Body.fbx')
+    assert not f.may_contain('a.zip/Textures')
+
+
+def test_fbx_only_item_filter():
+    f = path_filter.item_filter(None, None, fbx_only=True)
+    assert f.matches('a.zip/Body.FBX')
+    assert not f.matches('a.zip/Body.png')
+
+    f = path_filter.item_filter(['*Body*'], ['*old*'], fbx_only=True)
+    assert f.matches('a.zip/Body.fbx')
+    assert not f.matches('a.zip/Body.png')
+    assert not f.matches('a.zip/Head.fbx')
+    assert not f.matches('a.zip/old/Body.fbx')
+
+
+def test_key_changes_with_globs():
+    keys = {
+        path_filter.PathFilter(include=['*.fbx']).key(),
+        path_filter.PathFilter(exclude=['*.fbx']).key(),
+        path_filter.item_filter(fbx_only=True).key(),
+    }
+    assert len(keys) == 3
@@ -0,0 +1,111 @@
+import datetime
+
+import pytest
+
+import http_session
+import rate_limit
+
+
+def test_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        rate_limit.RateGovernor(requests_per_second=0)
+    with pytest.raises(ValueError):
+        rate_limit.RateGovernor(requests_per_second=1.0, min_rate=0)
+
+
+def test_min_rate_is_capped_by_max_rate():
+    governor = rate_limit.RateGovernor(requests_per_second=0.05)
+    assert governor.min_rate == 0.05
+
+
+def test_throttled_response_halves_rate_and_success_recovers():
+    governor = rate_limit.RateGovernor(requests_per_second=100.0, max_in_flight=2, cooldown=0)
+    governor.acquire()
+    governor.release(status=429)
+    assert governor.rate == 50.0
+    governor.acquire()
+    governor.release(status=200)
+    assert governor.rate == pytest.approx(50.05)
+
+
+def test_throttled_response_without_retry_after_backs_off():
+    governor = rate_limit.RateGovernor(requests_per_second=2.0, max_in_flight=4)
+    governor._tokens = 4.0
+    governor.acquire()
+    governor.release(status=429)
+    # 남은 토큰이 있어도 바로 다시 요청하지 않는다
+    acquired, wait = governor._try_acquire()
+    assert not acquired
+    assert wait == pytest.approx(1.0, abs=0.05)
+    assert governor._tokens < 1.0
+
+
+def test_slow_response_does_not_raise_rate():
+    governor = rate_limit.RateGovernor(requests_per_second=1.0, slow_response=1.0, cooldown=0)
+    governor.acquire()
+    governor.release(status=200, elapsed=2.0)
+    assert governor.rate == 0.5
+
+
+def test_in_flight_cap():
+    governor = rate_limit.RateGovernor(requests_per_second=1000.0, max_in_flight=1)
+    governor.acquire()
+    assert governor._try_acquire() == (False, None)
+    governor.release(status=200)
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_retry_after_blocks_new_slots():
+    governor = rate_limit.RateGovernor(requests_per_second=1000.0, max_in_flight=2)
+    governor.acquire()
+    governor.release(status=503, retry_after=30)
+    acquired, wait = governor._try_acquire()
+    assert not acquired and wait > 29
+
+
+@pytest.mark.parametrize('value, expected', [('3', 3.0), ('-1', 0.0), ('Wed, 21 Oct 2015 07:28:00 GMT', None), (None, None)])
+def test_parse_retry_after(value, expected):
+    assert rate_limit.parse_retry_after(value) == expected
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.elapsed = datetime.timedelta(seconds=0.1)
+        self.headers = {}
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+def governed_session(monkeypatch, responses):
+    governor = rate_limit.RateGovernor(requests_per_second=1000.0, max_in_flight=1)
+    session = http_session.BoothSession(governor=governor, retries=1)
+    monkeypatch.setattr(session.session, 'request', lambda *args, **kwargs: responses.pop(0))
+    return session, governor
+
+
+def test_streamed_response_holds_slot_until_closed(monkeypatch):
+    session, governor = governed_session(monkeypatch, [FakeResponse()])
+    response = session.get('https://booth.pm/downloadables/1', stream=True)
+    assert governor.stats()['in_flight'] == 1
+    response.close()
+    response.close()
+    assert governor.stats()['in_flight'] == 0
+    assert response.closed == 2
+
+
+def test_plain_response_releases_slot_at_once(monkeypatch):
+    session, governor = governed_session(monkeypatch, [FakeResponse()])
+    session.get('https://booth.pm/ja/items/1')
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_throttled_stream_is_released_before_retry(monkeypatch):
+    session, governor = governed_session(monkeypatch, [FakeResponse(429), FakeResponse()])
+    governor.cooldown = 0
+    response = session.get('https://booth.pm/downloadables/1', stream=True)
+    assert response.status_code == 200
+    response.close()
+    assert governor.stats()['in_flight'] == 0
@@ -0,0 +1,98 @@
+import io
+import threading
+
+import pytest
+
+import upload_queue
+
+
+class FakeUploader:
+    def __init__(self, failures=0, stored=()):
+        self.objects = dict.fromkeys(stored, b'')
+        self.failures = failures
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def exists(self, bucket_name, key):
+        self.calls.append(('head', key))
+        return key in self.objects
+
+    def upload(self, body, bucket_name, key, content_encoding=None):
+        self.release.wait()
+        self.calls.append(('put', key, content_encoding))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('boom')
+        if isinstance(body, str):
+            with open(body, 'rb') as f:
+                self.objects[key] = f.read()
+        else:
+            body.seek(0)
+            self.objects[key] = body.read()
+
+
+@pytest.fixture
+def page(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_bytes(b'<html></html>')
+    return str(path)
+
+
+def test_uploads_file(page):
+    uploader = FakeUploader()
+    queue = upload_queue.UploadQueue(uploader, 'bucket')
+    assert queue.submit('changelog/a.html', page, content_encoding='gzip').result() is True
+    queue.close()
+    assert uploader.objects == {'changelog/a.html': b'<html></html>'}
+    assert uploader.calls == [('head', 'changelog/a.html'), ('put', 'changelog/a.html', 'gzip')]
+
+
+def test_uploads_file_object():
+    uploader = FakeUploader(failures=1)
+    queue = upload_queue.UploadQueue(uploader, 'bucket', retries=1, backoff_factor=0)
+    body = io.BytesIO(b'<html></html>')
+    assert queue.submit('changelog/a.html', body).result() is True
+    queue.close()
+    # 재시도해도 처음부터 다시 읽는다
+    assert uploader.objects == {'changelog/a.html': b'<html></html>'}
+
+
+def test_skips_objects_already_in_bucket(page):
+    uploader = FakeUploader(stored=['changelog/a.html'])
+    queue = upload_queue.UploadQueue(uploader, 'bucket')
+    assert queue.submit('changelog/a.html', page).result() is False
+    queue.close()
+    assert uploader.calls == [('head', 'changelog/a.html')]
+
+
+def test_same_key_is_uploaded_once(page):
+    uploader = FakeUploader()
+    uploader.release.clear()
+    queue = upload_queue.UploadQueue(uploader, 'bucket')
+    first = queue.submit('changelog/a.html', page)
+    second = queue.submit('changelog/a.html', page)
+    assert first is second
+    uploader.release.set()
+    assert first.result() is True
+    queue.close()
+    assert [call for call in uploader.calls if call[0] == 'put'] == [('put', 'changelog/a.html', None)]
+    assert not queue.pending
+
+
+def test_retries_with_backoff(page):
+    uploader = FakeUploader(failures=2)
+    queue = upload_queue.UploadQueue(uploader, 'bucket', retries=2, backoff_factor=0)
+    assert queue.submit('changelog/a.html', page).result() is True
+    queue.close()
+    assert [call[0] for call in uploader.calls] == ['head', 'put'] * 3
+
+
+def test_gives_up_after_retries(page):
+    uploader = FakeUploader(failures=5)
+    queue = upload_queue.UploadQueue(uploader, 'bucket', retries=1, backoff_factor=0)
+    future = queue.submit('changelog/a.html', page)
+    with pytest.raises(RuntimeError):
+        future.result()
+    queue.close()
+    assert len(uploader.calls) == 4
@@ -0,0 +1,14 @@
+import version_index
+
+
+def test_fingerprint_ignores_order_and_type():
+    assert version_index.fingerprint([3, '1', 2]) == version_index.fingerprint(['1', '2', '3'])
+    assert version_index.fingerprint(['1', '2']) != version_index.fingerprint(['12'])
+
+
+def test_put_and_get(tmp_path):
+    index = version_index.VersionIndex(str(tmp_path / 'index.sqlite3'))
+    assert index.get(1) is None
+    index.put(1, 'a')
+    index.put('1', 'b')
+    assert index.get(1) == 'b'
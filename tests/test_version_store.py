@@ -0,0 +1,100 @@
+import version_store
+
+
+VERSION = {
+    'short-list': [1],
+    'name-list': ['Avatar.zip'],
+    'files': {
+        'Avatar.zip': {
+            'hash': 'h-zip',
+            'merkle': 'm-zip',
+            'file-count': 3,
+            'files': {
+                'Assets': {
+                    'hash': 'DIRECTORY',
+                    'merkle': 'm-assets',
+                    'file-count': 2,
+                    'files': {
+                        'Body.fbx': {'hash': 'h-body', 'size': 10, 'crc': 1234},
+                        'Body.png': {'hash': 'h-png', 'size': 20, 'crc': 5678},
+                    },
+                },
+                'README.txt': {'hash': 'h-readme', 'size': 5, 'crc': 42},
+            },
+        },
+        'Manual.pdf': {'hash': 'h-pdf'},
+    },
+    'fbx-files': {'Avatar.zip/Assets/Body.fbx': 'h-body', 'Other.fbx': 'h-other'},
+    'fbx-zip-info': {'Avatar.zip/Assets/Body.fbx': [10, 1234]},
+}
+
+
+def test_flatten():
+    rows = version_store.flatten(VERSION)
+    assert rows[(version_store.TREE, 'Avatar.zip')] == ('h-zip', None, None, 'm-zip', 3)
+    assert rows[(version_store.TREE, 'Avatar.zip/Assets/Body.fbx')] == ('h-body', 10, 1234, None, None)
+    assert rows[(version_store.TREE, 'Manual.pdf')] == ('h-pdf', None, None, None, None)
+    assert rows[(version_store.FBX, 'Avatar.zip/Assets/Body.fbx')] == ('h-body', 10, 1234, None, None)
+    assert rows[(version_store.FBX, 'Other.fbx')] == ('h-other', None, None, None, None)
+    assert len(rows) == 8
+
+
+def test_unflatten_round_trip():
+    version_json = version_store.unflatten(version_store.flatten(VERSION))
+    for key in ('files', 'fbx-files', 'fbx-zip-info'):
+        assert version_json[key] == VERSION[key]
+
+
+def test_unflatten_without_zip_info():
+    version_json = version_store.unflatten(version_store.flatten({'files': {'a.txt': {'hash': 'h'}}}))
+    assert version_json == {'files': {'a.txt': {'hash': 'h'}}, 'fbx-files': {}}
+
+
+def test_unflatten_orders_parents_first():
+    rows = {
+        (version_store.TREE, 'a/b/c'): ('h-c', None, None, None, None),
+        (version_store.TREE, 'a'): ('DIRECTORY', None, None, None, None),
+        (version_store.TREE, 'a/b'): ('DIRECTORY', None, None, None, None),
+        (version_store.TREE, 'a-b'): ('h-ab', None, None, None, None),
+    }
+    files = version_store.unflatten(rows)['files']
+    assert files['a']['files']['b']['files']['c'] == {'hash': 'h-c'}
+    assert files['a-b'] == {'hash': 'h-ab'}
+
+
+def test_diff_rows():
+    old = version_store.flatten(VERSION)
+    new_version = {
+        'files': {
+            'Avatar.zip': {
+                'hash': 'h-zip2',
+                'merkle': 'm-zip2',
+                'file-count': 2,
+                'files': {'README.txt': {'hash': 'h-readme', 'size': 5, 'crc': 42}, 'New.txt': {'hash': 'h-new'}},
+            },
+            'Manual.pdf': {'hash': 'h-pdf'},
+        },
+        'fbx-files': {'Other.fbx': 'h-other'},
+    }
+    added, changed, deleted = version_store.diff_rows(old, version_store.flatten(new_version))
+    assert added == {(version_store.TREE, 'Avatar.zip/New.txt'): ('h-new', None, None, None, None)}
+    assert changed == {(version_store.TREE, 'Avatar.zip'): ('h-zip2', None, None, 'm-zip2', 2)}
+    assert sorted(deleted) == [
+        (version_store.TREE, 'Avatar.zip/Assets'),
+        (version_store.TREE, 'Avatar.zip/Assets/Body.fbx'),
+        (version_store.TREE, 'Avatar.zip/Assets/Body.png'),
+        (version_store.FBX, 'Avatar.zip/Assets/Body.fbx'),
+    ]
+    assert version_store.diff_rows(old, old) == ({}, {}, [])
+
+
+def test_json_store(tmp_path):
+    store = version_store.JsonVersionStore(str(tmp_path))
+    assert not store.exists('o1')
+    assert store.load('o1') == version_store.empty_version()
+    store.save('o1', VERSION)
+    assert store.exists('o1')
+    assert store.load('o1') == VERSION
+
+    (tmp_path / 'o2.json').write_text('{not json')
+    assert store.load('o2') == version_store.empty_version()
@@ -0,0 +1,106 @@
+import copy
+
+import pytest
+
+
+def tree(checker, files):
+    root = {'hash': 'zip-hash', 'files': copy.deepcopy(files)}
+    checker.set_merkle(root)
+    return root
+
+
+FILES = {
+    'Assets': {'hash': 'DIRECTORY', 'files': {'Body.fbx': {'hash': 'h-body'}, 'Body.png': {'hash': 'h-png'}}},
+    'readme.txt': {'hash': 'h-readme'},
+}
+
+
+@pytest.fixture
+def previous(checker):
+    return {'files': {'Avatar.zip': tree(checker, FILES)}}
+
+
+def test_same_subtree(checker, previous):
+    old = previous['files']['Avatar.zip']
+    assert checker.same_subtree(old, tree(checker, FILES))
+
+    changed = copy.deepcopy(FILES)
+    changed['readme.txt']['hash'] = 'h-readme2'
+    assert not checker.same_subtree(old, tree(checker, changed))
+    assert not checker.same_subtree(old, dict(tree(checker, FILES), hash='other-zip'))
+    # 알고리즘을 옮기는 중에는 해시를 다시 비교해야 한다
+    assert not checker.same_subtree(old, dict(tree(checker, FILES), **{'legacy-hash': 'zip-md5'}))
+    assert not checker.same_subtree(dict(old, mark_as=0), tree(checker, FILES))
+    assert not checker.same_subtree({'hash': 'zip-hash'}, {'hash': 'zip-hash'})
+
+
+def test_apply_cached_tree_keeps_unchanged_subtree(checker, previous):
+    checker.apply_cached_tree(previous, 'Avatar.zip', tree(checker, FILES), [])
+    node = previous['files']['Avatar.zip']
+    assert node['mark_as'] == 0 and node[checker.UNCHANGED_SUBTREE]
+    assert node['file-count'] == 3
+    # 하위 노드는 방문하지 않는다
+    assert 'mark_as' not in node['files']['Assets']
+    assert 'mark_as' not in node['files']['Assets']['files']['Body.fbx']
+
+    saved_prehash = {}
+    checker.mark_deleted(previous, saved_prehash)
+    assert saved_prehash == {}
+    diff = checker.diff_tree.from_version_tree(previous, saved_prehash)
+    assert diff.children['Avatar.zip'].pruned
+
+
+def test_apply_cached_tree_records_changes(checker, previous):
+    changed = copy.deepcopy(FILES)
+    changed['Assets']['files']['Body.fbx']['hash'] = 'h-body2'
+    del changed['readme.txt']
+    changed['new.txt'] = {'hash': 'h-new'}
+    cached = dict(tree(checker, changed), hash='zip-hash2')
+    checker.apply_cached_tree(previous, 'Avatar.zip', cached, [])
+
+    saved_prehash = {}
+    checker.mark_deleted(previous, saved_prehash)
+    files = previous['files']['Avatar.zip']['files']
+    assert previous['files']['Avatar.zip']['mark_as'] == 3
+    assert files['Assets']['files']['Body.fbx']['mark_as'] == 3
+    # 내용이 같은 Body.png는 Assets 안에서 변경 없음으로 기록된다
+    assert files['Assets']['files']['Body.png']['mark_as'] == 0
+    assert files['new.txt']['mark_as'] == 1
+    assert files['readme.txt']['mark_as'] == 2
+    assert saved_prehash == {'h-readme': 'readme.txt'}
+
+
+def test_cleanup_leaves_kept_subtrees_alone(checker, previous):
+    kept_before = copy.deepcopy(previous['files']['Avatar.zip'])
+    previous['files']['Other.zip'] = {'hash': 'other', 'files': {'gone.txt': {'hash': 'g'}, 'stay.txt': {'hash': 's'}}}
+    checker.apply_cached_tree(previous, 'Avatar.zip', tree(checker, FILES), [])
+    checker.record_node(previous, ['Other.zip'], 'other')
+    checker.record_node(previous, ['Other.zip', 'stay.txt'], 's')
+    checker.mark_deleted(previous, {})
+
+    checker.cleanup_version_json(previous['files'])
+    assert previous['files']['Avatar.zip'] == kept_before
+    other = previous['files']['Other.zip']
+    assert other['files'] == {'stay.txt': {'hash': 's'}}
+    assert other['merkle'] == checker.hashing.merkle(other['files'])
+    assert other['file-count'] == 1
+
+
+def test_cleanup_counts_files_of_kept_subtrees_saved_without_counts(checker):
+    assets = {'hash': 'DIRECTORY', 'merkle': 'm', 'files': {'a.txt': {'hash': 'a'}, 'b.txt': {'hash': 'b'}}}
+    version = {'files': {'Old.zip': {'hash': 'z', 'files': {'Assets': assets}}}}
+    checker.record_node(version, ['Old.zip'], 'z')
+    checker.keep_unvisited(version, 'Old.zip')
+    checker.cleanup_version_json(version['files'])
+    assert assets['file-count'] == 2 and assets['merkle'] == 'm'
+    assert version['files']['Old.zip']['file-count'] == 2
+
+
+def test_keep_unvisited_protects_truncated_archive(checker, previous):
+    checker.record_node(previous, ['Avatar.zip'], 'zip-hash')
+    checker.record_node(previous, ['Avatar.zip', 'readme.txt'], 'h-readme')
+    checker.keep_unvisited(previous, 'Avatar.zip')
+    saved_prehash = {}
+    checker.mark_deleted(previous, saved_prehash)
+    assert saved_prehash == {}
+    assert previous['files']['Avatar.zip']['files']['Assets'][checker.UNCHANGED_SUBTREE]